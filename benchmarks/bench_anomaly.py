@@ -0,0 +1,164 @@
+"""Anomaly detector benchmark replaying a day of inverter data.
+
+Builds a trace of one poll every 10 seconds over a day of production, with
+faults injected at known times: a derating window, an overheating
+afternoon, an insulation impedance drifting down, a shaded MPPT string and
+an arc fault. Replays it through the detector, reports when each problem
+is raised and cleared, and compares the cost per poll with recomputing the
+mean and variance over a sliding window of samples.
+
+Run from the repository root with Home Assistant installed:
+
+    python -m benchmarks.bench_anomaly --days 1 --window 360
+"""
+from __future__ import annotations
+
+import argparse
+from collections import deque
+from collections.abc import Callable
+from functools import partial
+import math
+import random
+import time
+import tracemalloc
+from typing import Any
+
+from sungrow_websocket import InverterItem
+
+from sungrow.anomaly import WATCHED_POINTS, AnomalyDetector
+from sungrow.client import REQUEST_REAL
+from sungrow.points import Converter, discover_schema
+
+POLL_INTERVAL = 10
+POLLS_PER_DAY = 24 * 3600 // POLL_INTERVAL
+
+# Faults injected in each day, as (start, end) in hours
+DERATING = (13.0, 13.5)
+OVERHEATING = (14.0, 15.0)
+SHADING = (9.0, 10.0)
+ARC_FAULT = (16.0, 16.02)
+INSULATION_DRIFT_START = 11.0
+
+
+def _item(name: str, value: float, unit: str) -> InverterItem:
+    """Return a point as the client parses it."""
+    return InverterItem(name=name, desc=name, value=f"{value:.2f}", unit=unit)
+
+
+def trace(days: int, seed: int = 0) -> list[tuple[float, dict[str, InverterItem]]]:
+    """Return (timestamp, reply) pairs of every poll of the given days."""
+    rnd = random.Random(seed)
+    polls = []
+    for poll in range(days * POLLS_PER_DAY):
+        timestamp = poll * POLL_INTERVAL
+        hour = (timestamp % 86400) / 3600
+        sun = max(math.sin((hour - 6) / 12 * math.pi), 0.0)
+        strings = [2.5 * sun * rnd.uniform(0.97, 1.03) for _ in range(2)]
+        if SHADING[0] <= hour < SHADING[1]:
+            strings[1] *= 0.4
+        running_state = "Run"
+        if DERATING[0] <= hour < DERATING[1]:
+            # The inverter moves off the maximum power point to limit its output
+            running_state = "Derating Run"
+            strings = [power * 0.6 for power in strings]
+        dc_power = sum(strings)
+        efficiency = 0.965 * rnd.uniform(0.99, 1.01)
+        temperature = 30 + 12 * sun + rnd.gauss(0, 0.5)
+        if OVERHEATING[0] <= hour < OVERHEATING[1]:
+            temperature += 35
+        insulation = 1850 + rnd.gauss(0, 20)
+        if hour >= INSULATION_DRIFT_START:
+            insulation *= max(1 - (hour - INSULATION_DRIFT_START) * 0.2, 0.2)
+        arc = 1 if ARC_FAULT[0] <= hour < ARC_FAULT[1] else 0
+        reply = {
+            "total_dcpower": _item("total_dcpower", dc_power, "kW"),
+            "total_active_power": _item("total_active_power", dc_power * efficiency, "kW"),
+            "air_tem_inside_machine": _item("air_tem_inside_machine", temperature, "℃"),
+            "square_array_insulation_impedance": _item(
+                "square_array_insulation_impedance", insulation, "kΩ"
+            ),
+            "measuring_point_afd": _item("measuring_point_afd", arc, ""),
+            "running_state": InverterItem(
+                name="running_state", desc="running_state", value=running_state, unit=""
+            ),
+        }
+        for index, power in enumerate(strings, 1):
+            voltage = 350 + 30 * sun if power else 0
+            reply[f"mppt{index}_voltage"] = _item(f"mppt{index}_voltage", voltage, "V")
+            reply[f"mppt{index}_current"] = _item(
+                f"mppt{index}_current", power * 1000 / voltage if voltage else 0, "A"
+            )
+        polls.append((float(timestamp), reply))
+    return polls
+
+
+class WindowDetector:
+    """Mean and variance recomputed over the last samples of each point."""
+
+    def __init__(self, window: int) -> None:
+        """Initialize the windows."""
+        self.windows = {key: deque(maxlen=window) for key in WATCHED_POINTS}
+
+    def add(self, timestamp: float, response: dict[str, InverterItem]) -> None:
+        """Add the samples of a reply and recompute the statistics."""
+        for key, window in self.windows.items():
+            if (item := response.get(key)) is not None:
+                window.append(float(item.value))
+                mean = sum(window) / len(window)
+                sum((value - mean) ** 2 for value in window) / len(window)
+
+
+def _run(name: str, factory: Callable[[], Any], polls: list) -> None:
+    """Replay the trace through a new detector, timed and then traced."""
+    detector = factory()
+    start = time.perf_counter()
+    for timestamp, reply in polls:
+        detector.add(timestamp, reply)
+    elapsed = time.perf_counter() - start
+    detector = factory()
+    tracemalloc.start()
+    for timestamp, reply in polls:
+        detector.add(timestamp, reply)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"  {name:<22} {elapsed / len(polls) * 1e6:9.2f} us/poll, "
+        f"peak {peak / 1024:7.1f} KiB"
+    )
+
+
+def _detector(converters: dict[str, Converter]) -> AnomalyDetector:
+    """Return a detector of the points of the trace."""
+    detector = AnomalyDetector()
+    detector.set_points(converters)
+    return detector
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="SunGrow anomaly detector benchmark")
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--window", type=int, default=360)
+    args = parser.parse_args()
+
+    polls = trace(args.days)
+    schema = discover_schema("bench", polls[0][1], dict.fromkeys(polls[0][1], REQUEST_REAL))
+    print(f"Replay of {len(polls)} polls ({args.days} days, one every {POLL_INTERVAL}s)")
+
+    detector = _detector(schema.converters)
+    for timestamp, reply in polls:
+        for problem in detector.add(timestamp, reply):
+            state = "raised" if detector.active[problem] else "cleared"
+            day, seconds = divmod(timestamp, 86400)
+            print(
+                f"  day {int(day)} {int(seconds // 3600):02d}:{int(seconds % 3600 // 60):02d} "
+                f"{problem} {state}"
+            )
+
+    print("Cost per poll")
+    _run("rolling statistics", partial(_detector, schema.converters), polls)
+    _run(f"window of {args.window}", partial(WindowDetector, args.window), polls)
+
+
+if __name__ == "__main__":
+    main()
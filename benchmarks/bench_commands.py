@@ -0,0 +1,146 @@
+"""Command queue benchmark: an export-limit automation flooding an inverter.
+
+An automation follows the house load and sends a new export limit every
+--period seconds while the inverter is polled every --poll-interval
+seconds. Compares writing every setpoint at once, on the polling session,
+with the command queue, which merges the setpoints and writes at most once
+per --min-interval in the poll slot. Reports the write requests the dongle
+receives, the poll latency while the automation runs, and how long after
+the last setpoint the inverter holds it (with the queue: and a poll read it
+back).
+
+Run from the repository root with Home Assistant installed:
+
+    python -m benchmarks.bench_commands --duration 20 --period 0.1 --latency 0.05
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+
+from homeassistant.core import HomeAssistant
+
+from sungrow.control import PARAMETER_INDEX
+from sungrow.coordinator import SunGrowDataService
+from sungrow.fleet import SunGrowFleet
+
+from .fake_inverter import FakeInverter, FakeInverterConfig
+
+PARAMETER = "export_power_limitation_value"
+
+
+class UnstaggeredFleet(SunGrowFleet):
+    """Fleet that does not space out the polls, the benchmark sets the pace."""
+
+    @property
+    def stagger(self) -> float:
+        """Return no spacing."""
+        return 0.0
+
+
+async def run(
+    hass: HomeAssistant, args: argparse.Namespace, queued: bool
+) -> None:
+    """Poll the fake inverter while the automation sends setpoints."""
+    fake = FakeInverter(FakeInverterConfig(latency=args.latency, seed=1))
+    await fake.async_start()
+    service = SunGrowDataService(hass, fake.host, control=True)
+    service.connection.client.port = fake.port
+    service.connection.client.http_port = fake.port
+    service.fleet = UnstaggeredFleet()
+    service.scheduled = False
+    service.async_setup()
+    service.coordinator.update_interval = None
+    service.commands.min_interval = args.min_interval
+    await service.coordinator.async_refresh()
+
+    description = PARAMETER_INDEX[PARAMETER]
+    address = description.param_addr
+    latencies: list[float] = []
+    stop = asyncio.Event()
+
+    async def _poll() -> None:
+        """Poll at the poll interval until the automation stops."""
+        while not stop.is_set():
+            begin = time.perf_counter()
+            await service.coordinator.async_refresh()
+            latencies.append(time.perf_counter() - begin)
+            try:
+                await asyncio.wait_for(stop.wait(), args.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _write_now(value: int) -> None:
+        """Write one setpoint on the polling session, between two polls."""
+        async with service._poll_lock:  # pylint: disable=protected-access
+            await service.connection.client.async_params({address: value}, [])
+
+    rnd = random.Random(1)
+    last = 0
+    poller = asyncio.create_task(_poll())
+    writes = fake.param_writes
+    start = time.monotonic()
+    while time.monotonic() - start < args.duration:
+        last = round(rnd.uniform(0, 5000), -1)
+        if queued:
+            await service.async_set_parameter(PARAMETER, last)
+        else:
+            await _write_now(description.to_raw(last))
+        await asyncio.sleep(args.period)
+    sent = time.monotonic()
+    raw = description.to_raw(last)
+
+    # Keep polling until the inverter holds the last setpoint and, with the
+    # queue, until a poll read it back
+    commands = service.commands
+    while fake.config.params.get(address) != raw or (
+        queued and (address in commands.queued or address in commands.unconfirmed)
+    ):
+        await asyncio.sleep(0.05)
+    applied = time.monotonic() - sent
+    stop.set()
+    await poller
+
+    setpoints = int(args.duration / args.period)
+    latencies.sort()
+    print(
+        f"  {'command queue' if queued else 'write every setpoint':<22} "
+        f"{fake.param_writes - writes:5d} writes for ~{setpoints} setpoints, "
+        f"poll latency p50 {statistics.median(latencies) * 1000:6.1f} ms "
+        f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:6.1f} ms, "
+        f"last setpoint reported after {applied:5.2f}s"
+    )
+    await service.async_shutdown()
+    await fake.async_stop()
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    """Run the benchmark."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        print(
+            f"Setpoint every {args.period}s for {args.duration}s, poll every "
+            f"{args.poll_interval}s, round trip {args.latency * 1000:.0f} ms"
+        )
+        await run(hass, args, queued=False)
+        await run(hass, args, queued=True)
+        await hass.async_stop(force=True)
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="SunGrow command queue benchmark")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--period", type=float, default=0.1)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--min-interval", type=float, default=2.0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Entity read benchmark: cost of reading the state of every entity after a poll.
+
+After each poll Home Assistant reads the value, attributes, unique id,
+device info and availability of the entities it writes. Compares the
+snapshot read by slot, with identity fields computed once, against the dict
+lookups and per-read unique id the entities used before, for a fleet of
+inverters that report every point of the payload.
+
+Run from the repository root with Home Assistant installed:
+
+    python -m benchmarks.bench_entities --inverters 10 --extra-points 40
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tempfile
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from sungrow.client import REQUEST_REAL
+from sungrow.coordinator import SunGrowDataService
+from sungrow.sensor import ENERGY_SENSOR_TYPES, SunGrowEnergySensor, SunGrowSensor
+
+from .payloads import response
+
+
+class DictReadSensor(SunGrowSensor):
+    """Sensor reading its state the way the entities used to."""
+
+    _attributes: dict[str, Any] = {}
+
+    @property
+    def unique_id(self) -> str | None:
+        """Return a unique ID."""
+        if not self.data_service.ip_address:
+            return None
+        return f"{self.data_service.ip_address}_{self.entity_description.key}"
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the state attributes."""
+        attributes = self._attributes.get(self.entity_description.json_key)
+        if not self.data_service.stale:
+            return attributes
+        return {**(attributes or {}), **self.data_service.stale_attributes}
+
+    @property
+    def native_value(self) -> str | None:
+        """Return the state of the sensor."""
+        return self.data_service.data.get(self.entity_description.json_key)
+
+
+def _read(entities: list[SunGrowSensor | SunGrowEnergySensor]) -> None:
+    """Read what a state write reads from each entity."""
+    for entity in entities:
+        entity.native_value  # pylint: disable=pointless-statement
+        entity.extra_state_attributes  # pylint: disable=pointless-statement
+        entity.unique_id  # pylint: disable=pointless-statement
+        entity.device_info  # pylint: disable=pointless-statement
+        entity.available  # pylint: disable=pointless-statement
+
+
+def _fleet(
+    hass: HomeAssistant,
+    inverters: int,
+    extra_points: int,
+    sensor_class: type[SunGrowSensor],
+) -> tuple[list[SunGrowDataService], list[Any]]:
+    """Return data services with every point enabled, and their entities."""
+    services = []
+    entities: list[Any] = []
+    reply = response(extra_points, seed=0)
+    for index in range(inverters):
+        service = SunGrowDataService(hass, f"10.0.0.{index + 1}")
+        service.async_setup()
+        # The entities are read as after a successful poll
+        service.refreshed = True
+        service._async_set_schema(  # pylint: disable=protected-access
+            "SG5.0RS", reply, dict.fromkeys(reply, REQUEST_REAL)
+        )
+        for description in service.descriptions:
+            service.async_enable_point(description)
+            entities.append(sensor_class(description, service))
+        entities.extend(
+            SunGrowEnergySensor(description, service)
+            for description in ENERGY_SENSOR_TYPES
+        )
+        services.append(service)
+    return services, entities
+
+
+def _run(
+    hass: HomeAssistant,
+    name: str,
+    sensor_class: type[SunGrowSensor],
+    args: argparse.Namespace,
+) -> None:
+    """Time the reads after each poll."""
+    services, entities = _fleet(hass, args.inverters, args.extra_points, sensor_class)
+    replies = [response(args.extra_points, seed=seed) for seed in range(8)]
+    elapsed = 0.0
+    for poll in range(args.polls):
+        reply = replies[poll % len(replies)]
+        for service in services:
+            service.update(reply)
+        start = time.perf_counter()
+        _read(entities)
+        elapsed += time.perf_counter() - start
+    print(
+        f"  {name:<22} {elapsed / args.polls * 1e6:9.1f} us/poll "
+        f"({len(entities)} entities)"
+    )
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    """Run the benchmark."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        print(
+            f"State reads after each poll, {args.inverters} inverters, "
+            f"{args.polls} polls"
+        )
+        _run(hass, "dict lookups", DictReadSensor, args)
+        _run(hass, "snapshot slots", SunGrowSensor, args)
+        await hass.async_stop(force=True)
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="SunGrow entity read benchmark")
+    parser.add_argument("--inverters", type=int, default=10)
+    parser.add_argument("--extra-points", type=int, default=40)
+    parser.add_argument("--polls", type=int, default=200)
+    asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
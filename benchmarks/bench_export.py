@@ -0,0 +1,206 @@
+"""Export benchmark against a local stand-in InfluxDB and MQTT broker.
+
+Compares sending one line or message per entity per poll, as exporting
+Home Assistant state changes does, with the export pipeline that
+serializes each poll of an inverter once and sends the records in batches.
+Then takes the target down to show that the queue stays bounded and drops
+the oldest records.
+
+Run from the repository root with Home Assistant installed:
+
+    python -m benchmarks.bench_export --inverters 10 --polls 10 --latency 0.002
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable
+import json
+import tempfile
+import time
+from typing import Any
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant
+
+from sungrow.client import REQUEST_REAL
+from sungrow.coordinator import SunGrowDataService
+from sungrow.export import (
+    InfluxSink,
+    JsonSerializer,
+    LineProtocolSerializer,
+    MqttSink,
+    SunGrowExporter,
+)
+
+from .fake_influx import FakeInflux
+from .fake_mqtt import FakeMqtt
+from .payloads import response
+
+Send = Callable[[list[str]], Awaitable[None]]
+Serializer = type[LineProtocolSerializer] | type[JsonSerializer]
+
+
+def _influx_entity(service: SunGrowDataService, key: str, value: Any) -> str:
+    """Return the line of one entity state."""
+    return f'{key},host={service.ip_address} value="{value}" {time.time_ns()}'
+
+
+def _mqtt_entity(service: SunGrowDataService, key: str, value: Any) -> str:
+    """Return the message of one entity state."""
+    return json.dumps({"host": service.ip_address, "key": key, "value": value})
+
+
+def _services(
+    hass: HomeAssistant, inverters: int, extra_points: int
+) -> list[SunGrowDataService]:
+    """Return data services with every point enabled."""
+    services = []
+    reply = response(extra_points, seed=0)
+    for index in range(inverters):
+        service = SunGrowDataService(hass, f"10.0.0.{index + 1}")
+        service.async_setup()
+        service._async_set_schema(  # pylint: disable=protected-access
+            "SG5.0RS", reply, dict.fromkeys(reply, REQUEST_REAL)
+        )
+        for description in service.descriptions:
+            service.async_enable_point(description)
+            service.slot(description.json_key)
+        services.append(service)
+    return services
+
+
+async def bench_per_entity(
+    target: FakeInflux | FakeMqtt,
+    send: Send,
+    entity: Callable[[SunGrowDataService, str, Any], str],
+    services: list[SunGrowDataService],
+    args: argparse.Namespace,
+) -> None:
+    """Send one record per entity per poll."""
+    requests, received = target.requests, target.bytes_received
+    start = time.perf_counter()
+    for poll in range(args.polls):
+        reply = response(args.extra_points, seed=poll)
+        for service in services:
+            service.update(reply)
+            for key, value in zip(service.slot_keys, service.snapshot):
+                if value is not None:
+                    await send([entity(service, key, value)])
+    elapsed = time.perf_counter() - start
+    print(
+        f"  {'one record per entity':<22} {elapsed:7.2f}s "
+        f"{target.requests - requests:7d} requests "
+        f"{(target.bytes_received - received) / 1024:8.1f} KiB"
+    )
+
+
+async def bench_batched(
+    target: FakeInflux | FakeMqtt,
+    send: Send,
+    serializer: Serializer,
+    services: list[SunGrowDataService],
+    args: argparse.Namespace,
+) -> None:
+    """Serialize each poll once and send the records in batches."""
+    requests, received = target.requests, target.bytes_received
+    exporter = SunGrowExporter("export", send, flush_interval=0.05)
+    serializers = [serializer(service) for service in services]
+    task = asyncio.create_task(exporter.async_run())
+    start = time.perf_counter()
+    for poll in range(args.polls):
+        reply = response(args.extra_points, seed=poll)
+        for service, serialize in zip(services, serializers):
+            service.update(reply)
+            if (record := serialize()) is not None:
+                exporter.async_enqueue(record)
+        await asyncio.sleep(0)
+    await exporter.async_stop()
+    await task
+    elapsed = time.perf_counter() - start
+    print(
+        f"  {'batched snapshots':<22} {elapsed:7.2f}s "
+        f"{target.requests - requests:7d} requests "
+        f"{(target.bytes_received - received) / 1024:8.1f} KiB "
+        f"({exporter.sent} records sent)"
+    )
+
+
+async def bench_outage(
+    target: FakeInflux | FakeMqtt,
+    send: Send,
+    serializer: Serializer,
+    services: list[SunGrowDataService],
+    args: argparse.Namespace,
+) -> None:
+    """Keep polling while the target is down."""
+    queue_size = max(len(services) * args.polls // 4, 1)
+    exporter = SunGrowExporter(
+        "export",
+        send,
+        queue_size=queue_size,
+        flush_interval=0.01,
+        retry_delay=0.05,
+    )
+    serializers = [serializer(service) for service in services]
+    task = asyncio.create_task(exporter.async_run())
+    target.down = True
+    for poll in range(args.polls):
+        reply = response(args.extra_points, seed=poll)
+        for service, serialize in zip(services, serializers):
+            service.update(reply)
+            if (record := serialize()) is not None:
+                exporter.async_enqueue(record)
+        await asyncio.sleep(0.01)
+    stats = exporter.stats()
+    target.down = False
+    await asyncio.sleep(0.2)
+    await exporter.async_stop()
+    await task
+    print(
+        f"  {'target down':<22} {stats['queued']} queued, at most {queue_size} pending "
+        f"({stats['pending']}), {stats['dropped']} dropped, "
+        f"{exporter.sent} sent once it was back"
+    )
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    """Run the benchmarks."""
+    influx = FakeInflux(latency=args.latency)
+    await influx.async_start()
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        services = _services(hass, args.inverters, args.extra_points)
+        print(
+            f"Export of {args.polls} polls of {args.inverters} inverters "
+            f"({len(services[0].slot_keys)} values each)"
+        )
+        async with aiohttp.ClientSession() as session:
+            send = InfluxSink(session, influx.url, "org", "bucket", "token").async_send
+            print("InfluxDB")
+            await bench_per_entity(influx, send, _influx_entity, services, args)
+            await bench_batched(influx, send, LineProtocolSerializer, services, args)
+            await bench_outage(influx, send, LineProtocolSerializer, services, args)
+        mqtt = FakeMqtt(latency=args.latency)
+        send = MqttSink(hass, "sungrow/export", mqtt.async_publish).async_send
+        print("MQTT")
+        await bench_per_entity(mqtt, send, _mqtt_entity, services, args)
+        await bench_batched(mqtt, send, JsonSerializer, services, args)
+        await bench_outage(mqtt, send, JsonSerializer, services, args)
+        await hass.async_stop(force=True)
+    await influx.async_stop()
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="SunGrow export benchmark")
+    parser.add_argument("--inverters", type=int, default=10)
+    parser.add_argument("--polls", type=int, default=10)
+    parser.add_argument("--extra-points", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.002)
+    asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Micro-benchmark of the point extraction step of a poll.
+
+Compares the table-driven extract_points, which runs the converters compiled
+once per firmware schema, against the per-key chain of membership checks it
+replaced, and against normalizing each value on every poll by looking up
+its unit and parsing it. Run from the repository root with Home Assistant
+installed:
+
+    python -m benchmarks.bench_extract
+"""
+from __future__ import annotations
+
+import timeit
+
+from sungrow.client import REQUEST_REAL
+from sungrow.coordinator import SENSOR_KEYS, _points, extract_points
+from sungrow.points import SENSOR_INDEX, UNIT_SCALES, discover_schema
+
+from .payloads import response
+
+
+def legacy_extract(response: dict) -> dict:
+    """Extract the points the way the coordinator used to."""
+    data = {}
+    for key in SENSOR_KEYS:
+        if key in response:
+            item = response[key]
+            data[key] = item.value
+    return data
+
+
+def parsing_extract(response: dict) -> dict:
+    """Extract the points, normalizing each value from its unit on every poll."""
+    data = {}
+    for key in SENSOR_KEYS:
+        if key in response:
+            item = response[key]
+            description = SENSOR_INDEX[key]
+            try:
+                value = float(item.value)
+            except (TypeError, ValueError):
+                data[key] = item.value
+                continue
+            unit = description.native_unit_of_measurement
+            if unit is not None and (scale := UNIT_SCALES.get((item.unit, unit), 1)) != 1:
+                value = round(value * scale, 6)
+            data[key] = value
+    return data
+
+
+def main() -> None:
+    """Run the benchmark."""
+    for extra_points in (0, 40, 200):
+        reply = response(extra_points, seed=1)
+        schema = discover_schema("SG5.0RS", reply, dict.fromkeys(reply, REQUEST_REAL))
+        points = _points(list(SENSOR_INDEX.values()), schema.converters)
+        data: dict = {}
+        changed: set = set()
+        extract_points(reply, data, changed, points)
+        assert parsing_extract(reply) == data
+        number = 100_000
+        legacy = min(timeit.repeat(lambda: legacy_extract(reply), number=number, repeat=5))
+        parsing = min(
+            timeit.repeat(lambda: parsing_extract(reply), number=number, repeat=5)
+        )
+        # Clear data so every value is compared and stored, as after a change
+        compiled = min(
+            timeit.repeat(
+                lambda: extract_points(reply, {}, changed, points),
+                number=number,
+                repeat=5,
+            )
+        )
+        print(
+            f"{len(reply):4d} points in reply: "
+            f"raw strings {legacy / number * 1e6:6.2f} us/poll, "
+            f"parse per poll {parsing / number * 1e6:6.2f} us/poll, "
+            f"compiled {compiled / number * 1e6:6.2f} us/poll"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Poll benchmarks against local fake inverters.
+
+Measures, without hardware:
+
+* poll latency of a reconnect-per-poll session against a reused session,
+* one request at a time against one pipelined round when a dongle carries
+  several devices,
+* polling throughput across N simulated inverters, with and without the
+  fleet limits,
+* memory held per inverter by a connected client and its extracted data,
+* entity-update fan-out: state writes per poll with and without change-only
+  publishing.
+
+Run from the repository root with Home Assistant installed:
+
+    python -m benchmarks.bench_poll --inverters 20 --latency 0.02 --jitter 0.01
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import dataclasses
+import time
+import tracemalloc
+
+import aiohttp
+
+from sungrow.client import SunGrowClient, SunGrowError
+from sungrow.coordinator import SENSOR_KEYS, extract_points
+from sungrow.fleet import SunGrowFleet
+from sungrow.stats import RollingWindow
+
+from .fake_inverter import FakeInverter, FakeInverterConfig, fake_devices
+
+
+def _client(session: aiohttp.ClientSession, inverter: FakeInverter) -> SunGrowClient:
+    """Return a client pointed at a fake inverter."""
+    return SunGrowClient(
+        session, inverter.host, port=inverter.port, http_port=inverter.port
+    )
+
+
+def _report(name: str, window: RollingWindow) -> None:
+    """Print the percentiles of a latency window in milliseconds."""
+    summary = window.summary()
+    print(
+        f"  {name:<22} n={summary['count']:<5} "
+        + " ".join(f"{q}={summary[q] * 1000:7.2f}ms" for q in ("p50", "p95", "p99"))
+    )
+
+
+async def bench_latency(
+    session: aiohttp.ClientSession, config: FakeInverterConfig, polls: int
+) -> None:
+    """Compare a new session per poll with a reused session."""
+    print(f"Poll latency over {polls} polls")
+    inverter = FakeInverter(config)
+    await inverter.async_start()
+    try:
+        reconnect = RollingWindow(polls)
+        for _ in range(polls):
+            client = _client(session, inverter)
+            start = time.perf_counter()
+            try:
+                await client.async_get_data()
+            except SunGrowError:
+                continue
+            finally:
+                await client.async_close()
+            reconnect.add(time.perf_counter() - start)
+        _report("reconnect per poll", reconnect)
+
+        reused = RollingWindow(polls)
+        client = _client(session, inverter)
+        connections = inverter.connections
+        for _ in range(polls):
+            start = time.perf_counter()
+            try:
+                await client.async_get_data()
+            except SunGrowError:
+                await client.async_close()
+                continue
+            reused.add(time.perf_counter() - start)
+        await client.async_close()
+        _report("reused session", reused)
+        print(f"  connections opened by the reused session: {inverter.connections - connections}")
+    finally:
+        await inverter.async_stop()
+
+
+async def bench_devices(
+    session: aiohttp.ClientSession,
+    config: FakeInverterConfig,
+    devices: int,
+    polls: int,
+) -> None:
+    """Compare sequential requests with one pipelined round for all devices."""
+    print(f"Poll latency for {devices} devices behind one dongle over {polls} polls")
+    inverter = FakeInverter(dataclasses.replace(config, devices=fake_devices(devices)))
+    await inverter.async_start()
+    client = _client(session, inverter)
+    try:
+        await client.async_connect()
+        requests = client.all_requests
+        sequential = RollingWindow(polls)
+        pipelined = RollingWindow(polls)
+        for _ in range(polls):
+            start = time.perf_counter()
+            for dev_id, service in requests:
+                try:
+                    await client.async_request(
+                        {"service": service, "dev_id": dev_id or client.dev_id}
+                    )
+                except SunGrowError:
+                    pass
+            sequential.add(time.perf_counter() - start)
+            start = time.perf_counter()
+            await client.async_get_data(requests)
+            pipelined.add(time.perf_counter() - start)
+        print(f"  {len(requests)} requests per poll")
+        _report("one at a time", sequential)
+        _report("pipelined", pipelined)
+    finally:
+        await client.async_close()
+        await inverter.async_stop()
+
+
+async def bench_throughput(
+    session: aiohttp.ClientSession,
+    config: FakeInverterConfig,
+    inverters: int,
+    duration: float,
+) -> None:
+    """Poll N inverters back to back and report the polls per second."""
+    print(f"Throughput across {inverters} inverters for {duration:.0f}s")
+    fakes = [FakeInverter(config) for _ in range(inverters)]
+    for fake in fakes:
+        await fake.async_start()
+    try:
+        for use_fleet in (False, True):
+            fleet = SunGrowFleet()
+            clients = [_client(session, fake) for fake in fakes]
+            for client in clients:
+                host = f"{client.host}:{client.port}"
+                fleet.async_register(host, host)
+            polls = 0
+            deadline = time.monotonic() + duration
+
+            async def _run(client: SunGrowClient) -> None:
+                nonlocal polls
+                host = f"{client.host}:{client.port}"
+                while time.monotonic() < deadline:
+                    try:
+                        if use_fleet:
+                            await fleet.async_poll(host, client.async_get_data)
+                        else:
+                            await client.async_get_data()
+                    except SunGrowError:
+                        await client.async_close()
+                        continue
+                    polls += 1
+
+            await asyncio.gather(*(_run(client) for client in clients))
+            for client in clients:
+                await client.async_close()
+            name = "fleet limits" if use_fleet else "unbounded"
+            note = f" (starts spaced {fleet.stagger:.2f}s apart)" if use_fleet else ""
+            print(f"  {name:<22} {polls / duration:8.1f} polls/s{note}")
+    finally:
+        for fake in fakes:
+            await fake.async_stop()
+
+
+async def bench_memory(
+    session: aiohttp.ClientSession, config: FakeInverterConfig, inverters: int
+) -> None:
+    """Measure the memory held per connected inverter."""
+    print(f"Memory per inverter ({inverters} inverters)")
+    fakes = [FakeInverter(config) for _ in range(inverters)]
+    for fake in fakes:
+        await fake.async_start()
+    try:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        clients = [_client(session, fake) for fake in fakes]
+        held = []
+        for client in clients:
+            data: dict = {}
+            extract_points(await client.async_get_data(), data, set())
+            held.append(data)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+        print(f"  {size / inverters / 1024:8.1f} KiB per inverter")
+        for client in clients:
+            await client.async_close()
+    finally:
+        for fake in fakes:
+            await fake.async_stop()
+
+
+async def bench_fanout(
+    session: aiohttp.ClientSession, config: FakeInverterConfig, polls: int
+) -> None:
+    """Count entity state writes per poll."""
+    print(f"Entity-update fan-out over {polls} polls")
+    inverter = FakeInverter(config)
+    await inverter.async_start()
+    client = _client(session, inverter)
+    try:
+        data: dict = {}
+        changed: set[str] = set()
+        written = 0
+        for _ in range(polls):
+            changed.clear()
+            extract_points(await client.async_get_data(), data, changed)
+            written += len(changed)
+        print(f"  {'every entity':<22} {len(SENSOR_KEYS):8.2f} writes/poll")
+        print(f"  {'changed only':<22} {written / polls:8.2f} writes/poll")
+    finally:
+        await client.async_close()
+        await inverter.async_stop()
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    """Run the selected benchmarks."""
+    config = FakeInverterConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        drop_rate=args.drop_rate,
+        extra_points=args.extra_points,
+        variation=args.variation,
+        seed=1,
+    )
+    async with aiohttp.ClientSession() as session:
+        await bench_latency(session, config, args.polls)
+        await bench_devices(session, config, args.devices, args.polls)
+        await bench_throughput(session, config, args.inverters, args.duration)
+        await bench_memory(session, config, args.inverters)
+        await bench_fanout(session, config, args.polls)
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="SunGrow poll benchmarks")
+    parser.add_argument("--inverters", type=int, default=10)
+    parser.add_argument("--devices", type=int, default=3)
+    parser.add_argument("--polls", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--extra-points", type=int, default=40)
+    parser.add_argument("--variation", type=float, default=0.002)
+    asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Record and replay benchmark: a day of polls through the whole pipeline.
+
+Records the traffic of a fake inverter with the capture recorder, one full
+poll after the other, then replays the capture through a data service with
+an entity for every point: the replies are parsed, extracted and
+dispatched to the entities as live ones are. Reports the size of the
+capture against the bytes received, and how long the replay takes against
+the time the polls stand for at the default poll interval.
+
+Run from the repository root with Home Assistant installed:
+
+    python -m benchmarks.bench_replay --polls 5760 --extra-points 40
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from homeassistant.core import HomeAssistant, callback
+
+from sungrow.capture import CaptureRecorder, async_replay, read_capture
+from sungrow.client import SunGrowError
+from sungrow.const import INVERTER_UPDATE_DELAY
+from sungrow.coordinator import SunGrowConnection, SunGrowDataService
+from sungrow.sensor import SunGrowSensor
+
+from .fake_inverter import FakeInverter, FakeInverterConfig
+
+
+class CountingSensor(SunGrowSensor):
+    """Sensor counting its state writes instead of writing them."""
+
+    writes = 0
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        """Read what a state write reads."""
+        CountingSensor.writes += 1
+        self.native_value  # pylint: disable=pointless-statement
+        self.available  # pylint: disable=pointless-statement
+        self.extra_state_attributes  # pylint: disable=pointless-statement
+
+
+async def record(
+    hass: HomeAssistant, fake: FakeInverter, path: str, polls: int
+) -> int:
+    """Record polls of the fake inverter; return the bytes received."""
+    connection = SunGrowConnection(hass, fake.host)
+    connection.client.port = fake.port
+    connection.client.http_port = fake.port
+    recorder = CaptureRecorder(hass, path)
+    connection.client.recorder = recorder
+    task = asyncio.create_task(recorder.exporter.async_run())
+    for _ in range(polls):
+        try:
+            await connection.async_get_data()
+        except SunGrowError:
+            continue
+    await connection.async_close()
+    await recorder.exporter.async_stop()
+    await task
+    return connection.client.bytes_received
+
+
+async def replay(hass: HomeAssistant, path: str, speed: float | None) -> None:
+    """Replay a capture through a data service and its entities."""
+    service = SunGrowDataService(hass, "10.0.0.1")
+    service.async_setup()
+    entities: list[CountingSensor] = []
+
+    @callback
+    def _async_add_entities() -> None:
+        """Attach an entity to every point, as the sensor platform does."""
+        known = {entity.entity_description.key for entity in entities}
+        for description in service.descriptions:
+            if description.key in known:
+                continue
+            entity = CountingSensor(description, service)
+            service.async_enable_point(description)
+            service.coordinator.async_add_listener(entity._handle_coordinator_update)
+            entities.append(entity)
+
+    service.async_add_schema_listener(_async_add_entities)
+    CountingSensor.writes = 0
+    records = list(read_capture(path))
+    start = time.perf_counter()
+    polls = await async_replay(service, records, speed)
+    elapsed = time.perf_counter() - start
+    covered = polls * INVERTER_UPDATE_DELAY.total_seconds() / 3600
+    print(
+        f"  {'as fast as possible' if speed is None else f'{speed:g}x':<22} "
+        f"{polls} polls in {elapsed:6.2f}s ({polls / elapsed:7.0f} polls/s, "
+        f"{covered:5.1f}h of polling), {len(entities)} entities, "
+        f"{CountingSensor.writes / max(polls, 1):5.1f} writes/poll"
+    )
+    await service.async_shutdown()
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    """Run the benchmark."""
+    fake = FakeInverter(
+        FakeInverterConfig(
+            extra_points=args.extra_points, variation=args.variation, seed=1
+        )
+    )
+    await fake.async_start()
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        path = os.path.join(config_dir, "capture.jsonl.gz")
+        start = time.perf_counter()
+        received = await record(hass, fake, path, args.polls)
+        size = os.path.getsize(path)
+        print(
+            f"Recorded {args.polls} polls in {time.perf_counter() - start:.2f}s: "
+            f"{received / 1024:.1f} KiB received, capture {size / 1024:.1f} KiB "
+            f"({size / args.polls:.0f} bytes/poll)"
+        )
+        print("Replay")
+        await replay(hass, path, None)
+        if args.speed:
+            await replay(hass, path, args.speed)
+        await hass.async_stop(force=True)
+    await fake.async_stop()
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="SunGrow record/replay benchmark")
+    parser.add_argument("--polls", type=int, default=5760)
+    parser.add_argument("--extra-points", type=int, default=40)
+    parser.add_argument("--variation", type=float, default=0.002)
+    parser.add_argument(
+        "--speed", type=float, default=0, help="also replay at this pace (1 = recorded)"
+    )
+    asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
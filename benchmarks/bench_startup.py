@@ -0,0 +1,92 @@
+"""Startup benchmark: time until the entities of N inverters can be added.
+
+Compares the previous startup, which awaited a first round trip to every
+inverter before adding entities, with the cached startup, which restores the
+point schema and values from storage and refreshes in the background. The
+fake inverters answer slowly, as a sleeping inverter would.
+
+Run from the repository root with Home Assistant installed:
+
+    python -m benchmarks.bench_startup --latency 0.5
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from sungrow.const import STORAGE_KEY, STORAGE_VERSION
+from sungrow.coordinator import SunGrowDataService
+
+from .fake_inverter import FakeInverter, FakeInverterConfig
+
+
+def _service(
+    hass: HomeAssistant, fake: FakeInverter, index: int
+) -> SunGrowDataService:
+    """Return a data service polling a fake inverter, with its own store."""
+    store = Store(hass, STORAGE_VERSION, STORAGE_KEY.format(entry_id=f"bench{index}"))
+    # All fakes listen on 127.0.0.1, tell them apart by name for the fleet
+    service = SunGrowDataService(hass, f"127.0.0.1:{fake.port}", store)
+    service.connection.client.host = fake.host
+    service.connection.client.port = fake.port
+    service.connection.client.http_port = fake.port
+    service.async_setup()
+    return service
+
+
+async def _async_run(hass: HomeAssistant, fakes: list[FakeInverter]) -> None:
+    """Time both startups for one fleet size."""
+    services = [_service(hass, fake, index) for index, fake in enumerate(fakes)]
+    start = time.perf_counter()
+    await asyncio.gather(*(s.coordinator.async_refresh() for s in services))
+    blocking = time.perf_counter() - start
+    for service in services:
+        await service.async_shutdown()
+
+    services = [_service(hass, fake, index) for index, fake in enumerate(fakes)]
+    start = time.perf_counter()
+    await asyncio.gather(*(s.async_restore() for s in services))
+    entities = sum(len(s.descriptions) for s in services)
+    cached = time.perf_counter() - start
+    for service in services:
+        await service.async_shutdown()
+
+    print(
+        f"{len(fakes):3d} inverters: first refresh {blocking * 1000:8.1f}ms, "
+        f"cached {cached * 1000:6.1f}ms ({entities} entities)"
+    )
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    """Run the benchmark for each fleet size."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        config = FakeInverterConfig(latency=args.latency, jitter=args.jitter)
+        for count in args.inverters:
+            fakes = [FakeInverter(config) for _ in range(count)]
+            for fake in fakes:
+                await fake.async_start()
+            try:
+                await _async_run(hass, fakes)
+            finally:
+                for fake in fakes:
+                    await fake.async_stop()
+        await hass.async_stop(force=True)
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="SunGrow startup benchmark")
+    parser.add_argument("--inverters", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
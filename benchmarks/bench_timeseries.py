@@ -0,0 +1,59 @@
+"""Memory and CPU cost of the per-inverter time series.
+
+Feeds a day of 15 s samples for the numeric points of each inverter and
+reports the memory held per inverter, which must stay flat however long the
+feed, and the time spent per poll.
+
+Run from the repository root with Home Assistant installed:
+
+    python -m benchmarks.bench_timeseries --inverters 10 --points 30
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from sungrow.timeseries import TimeSeries
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="SunGrow time series benchmark")
+    parser.add_argument("--inverters", type=int, default=10)
+    parser.add_argument("--points", type=int, default=30)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--interval", type=float, default=15)
+    args = parser.parse_args()
+
+    rnd = random.Random(1)
+    keys = [f"point_{index}" for index in range(args.points)]
+    polls = int(args.hours * 3600 / args.interval)
+    start = 1_700_000_000.0
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    inverters = [TimeSeries() for _ in range(args.inverters)]
+    elapsed = 0.0
+    for poll in range(polls):
+        timestamp = start + poll * args.interval
+        for series in inverters:
+            values = [(key, rnd.uniform(0, 100)) for key in keys]
+            begin = time.perf_counter()
+            series.add(timestamp, values)
+            elapsed += time.perf_counter() - begin
+        if poll == polls // 2:
+            halfway = sum(s.size_diff for s in tracemalloc.take_snapshot().compare_to(before, "filename"))
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    print(f"{args.inverters} inverters x {args.points} points, {polls} polls")
+    print(f"  memory per inverter: {halfway / args.inverters / 1024:8.1f} KiB halfway, "
+          f"{size / args.inverters / 1024:8.1f} KiB at the end")
+    print(f"  time per inverter poll: {elapsed / polls / args.inverters * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
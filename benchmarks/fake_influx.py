@@ -0,0 +1,104 @@
+"""Local stand-in for the v2 write API of InfluxDB.
+
+Accepts line protocol on /api/v2/write and counts the requests, lines and
+bytes it received. The latency of each write and the share of failed writes
+are configurable, and the server can be switched to failing every write to
+simulate an outage.
+
+    python -m benchmarks.fake_influx --port 8086 --latency 0.02
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+
+from aiohttp import web
+
+
+class FakeInflux:
+    """Serve the InfluxDB write API on a local port."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int | None = None,
+    ) -> None:
+        """Initialize the fake database."""
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.down = False
+        self.host = host
+        self.port = port
+        self._rnd = random.Random(seed)
+        self._runner: web.AppRunner | None = None
+        self.requests = 0
+        self.rejected = 0
+        self.lines = 0
+        self.bytes_received = 0
+
+    @property
+    def url(self) -> str:
+        """Return the base URL of the server."""
+        return f"http://{self.host}:{self.port}"
+
+    async def async_start(self) -> None:
+        """Start serving; port 0 picks a free port."""
+        app = web.Application()
+        app.router.add_post("/api/v2/write", self._handle_write)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def async_stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_write(self, request: web.Request) -> web.Response:
+        """Accept one batch of lines."""
+        self.requests += 1
+        body = await request.read()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.down or (self.failure_rate and self._rnd.random() < self.failure_rate):
+            self.rejected += 1
+            return web.Response(status=503, text="unavailable")
+        if not request.headers.get("Authorization", "").startswith("Token "):
+            self.rejected += 1
+            return web.Response(status=401, text="unauthorized")
+        self.bytes_received += len(body)
+        self.lines += body.count(b"\n") + 1
+        return web.Response(status=204)
+
+
+async def _async_serve(args: argparse.Namespace) -> None:
+    """Serve until interrupted."""
+    influx = FakeInflux(
+        latency=args.latency, failure_rate=args.failure_rate, port=args.port
+    )
+    await influx.async_start()
+    print(f"Fake InfluxDB listening on {influx.url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await influx.async_stop()
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Fake InfluxDB write API")
+    parser.add_argument("--port", type=int, default=8086)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    asyncio.run(_async_serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""Local stand-in for the WebSocket API of a SunGrow inverter.
+
+The server answers the requests the integration sends (login, device list,
+real-time data, battery data, MPPT data and parameters) and serves the i18n
+strings. The latency, jitter, drop rate and payload size of the replies are
+configurable, so polls can be measured without hardware. The WebSocket endpoint and the
+i18n strings are served on the same port.
+
+latency is a round-trip time: every reply leaves latency (plus jitter) after
+its request arrived, in request order, so pipelined requests overlap.
+
+It can also be started on its own and added to Home Assistant as an inverter:
+
+    python -m benchmarks.fake_inverter --port 8082 --latency 0.05
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+import json
+import random
+from typing import Any
+
+from aiohttp import WSMsgType, web
+
+from .payloads import real_list
+
+STRINGS = """I18N_COMMON_RUNNING=Run
+I18N_COMMON_STANDBY=Standby
+I18N_COMMON_TOTAL_YIELD=Total Yield
+I18N_COMMON_TOTAL_ACTIVE_POWER=Total Active Power
+I18N_COMMON_COMMONUA=Phase A Voltage
+I18N_COMMON_GROUP_MPPT=MPPT{0}
+"""
+
+
+@dataclass
+class FakeInverterConfig:
+    """Behaviour of a fake inverter."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    drop_rate: float = 0.0
+    extra_points: int = 40
+    variation: float = 0.03
+    mppt: int = 2
+    battery: bool = False
+    devices: list[dict[str, Any]] = field(
+        default_factory=lambda: [
+            {
+                "dev_id": 1,
+                "dev_code": 3343,
+                "dev_type": 21,
+                "dev_procotol": 2,
+                "dev_sn": "A2231234567",
+                "dev_name": "SG5.0RS(COM1-001)",
+                "dev_model": "SG5.0RS",
+                "port_name": "COM1",
+                "phys_addr": "1",
+                "logc_addr": "1",
+                "link_status": 1,
+                "init_status": 1,
+            }
+        ]
+    )
+    # Raw values of the parameters, by holding register
+    params: dict[int, int] = field(
+        default_factory=lambda: {5007: 0x55, 5008: 1000, 13074: 0, 13087: 0x55}
+    )
+    seed: int | None = None
+
+
+class FakeInverter:
+    """Serve the inverter protocol on a local port."""
+
+    def __init__(
+        self,
+        config: FakeInverterConfig | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        """Initialize the fake inverter."""
+        self.config = config or FakeInverterConfig()
+        self.host = host
+        self.port = port
+        self._rnd = random.Random(self.config.seed)
+        self._runner: web.AppRunner | None = None
+        self._tokens: set[str] = set()
+        self._websockets: set[web.WebSocketResponse] = set()
+        self.connections = 0
+        self.requests = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+        self.param_writes = 0
+
+    async def async_start(self) -> None:
+        """Start serving; port 0 picks a free port."""
+        app = web.Application()
+        app.router.add_get("/ws/home/overview", self._handle_websocket)
+        app.router.add_get("/i18n/{locale}.properties", self._handle_strings)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def async_stop(self) -> None:
+        """Stop serving, closing the open sessions."""
+        for websocket in list(self._websockets):
+            await websocket.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_strings(self, request: web.Request) -> web.Response:
+        """Serve the i18n strings."""
+        return web.Response(text=STRINGS)
+
+    async def _handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
+        """Answer requests on one WebSocket session."""
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+        self.connections += 1
+        self._websockets.add(websocket)
+        loop = asyncio.get_running_loop()
+        replies: asyncio.Queue[tuple[float, str] | None] = asyncio.Queue()
+        sender = asyncio.create_task(self._async_send(websocket, replies))
+        try:
+            async for msg in websocket:
+                if msg.type is not WSMsgType.TEXT:
+                    continue
+                self.requests += 1
+                config = self.config
+                due = loop.time() + config.latency + self._rnd.uniform(0, config.jitter)
+                replies.put_nowait((due, json.dumps(self._reply(json.loads(msg.data)))))
+            replies.put_nowait(None)
+            await sender
+        finally:
+            sender.cancel()
+            self._websockets.discard(websocket)
+        return websocket
+
+    async def _async_send(
+        self,
+        websocket: web.WebSocketResponse,
+        replies: asyncio.Queue[tuple[float, str] | None],
+    ) -> None:
+        """Send the queued replies in order, each once it is due."""
+        loop = asyncio.get_running_loop()
+        while (queued := await replies.get()) is not None:
+            due, reply = queued
+            if (delay := due - loop.time()) > 0:
+                await asyncio.sleep(delay)
+            if websocket.closed:
+                continue
+            if self.config.drop_rate and self._rnd.random() < self.config.drop_rate:
+                self.dropped += 1
+                await websocket.close()
+                continue
+            self.bytes_sent += len(reply)
+            await websocket.send_str(reply)
+
+    def _reply(self, message: dict[str, Any]) -> dict[str, Any]:
+        """Build the reply to one request."""
+        service = message.get("service")
+        if service == "connect":
+            token = f"{self._rnd.getrandbits(64):016x}"
+            self._tokens.add(token)
+            return _success({"service": "connect", "token": token, "uid": 1})
+        if message.get("token") not in self._tokens:
+            return {"result_code": 106, "result_msg": "token error"}
+        if "dev_id" in message and message["dev_id"] not in {
+            str(device["dev_id"]) for device in self.config.devices
+        }:
+            return {"result_code": 0, "result_msg": "device not found"}
+        if service == "devicelist":
+            devices = self.config.devices
+            return _success({"service": service, "count": len(devices), "list": devices})
+        if service == "real":
+            items = real_list(
+                self.config.extra_points, variation=self.config.variation, rnd=self._rnd
+            )
+            return _success({"service": service, "count": len(items), "list": items})
+        if service == "real_battery" and self.config.battery:
+            items = [
+                {"data_name": "I18N_COMMON_BATTERY_VOLTAGE", "data_value": "52.1", "data_unit": "V"},
+                {"data_name": "I18N_COMMON_BATTERY_CURRENT", "data_value": "3.2", "data_unit": "A"},
+                {"data_name": "I18N_COMMON_BATTERY_LEVEL", "data_value": "76.0", "data_unit": "%"},
+            ]
+            return _success({"service": service, "count": len(items), "list": items})
+        if service == "direct":
+            items = [
+                {
+                    "name": f"I18N_COMMON_GROUP_MPPT%@{index}",
+                    "voltage": f"{self._rnd.uniform(200, 400):.1f}",
+                    "voltage_unit": "V",
+                    "current": f"{self._rnd.uniform(0, 10):.1f}",
+                    "current_unit": "A",
+                }
+                for index in range(1, self.config.mppt + 1)
+            ]
+            return _success({"service": service, "count": len(items), "list": items})
+        if service in ("param", "param_set"):
+            return self._reply_params(service, message.get("list", []))
+        return {"result_code": 0, "result_msg": "unsupported service"}
+
+    def _reply_params(
+        self, service: str, items: list[dict[str, Any]]
+    ) -> dict[str, Any]:
+        """Read or write parameters."""
+        params = self.config.params
+        if any(int(item["param_addr"]) not in params for item in items):
+            return {"result_code": 0, "result_msg": "parameter not supported"}
+        if service == "param_set":
+            self.param_writes += 1
+            for item in items:
+                params[int(item["param_addr"])] = int(item["param_value"])
+            return _success({"service": service})
+        values = [
+            {
+                "param_addr": item["param_addr"],
+                "param_value": str(params[int(item["param_addr"])]),
+            }
+            for item in items
+        ]
+        return _success({"service": service, "count": len(values), "list": values})
+
+
+def fake_devices(count: int) -> list[dict[str, Any]]:
+    """Return a device list of an inverter followed by count - 1 more devices."""
+    primary = FakeInverterConfig().devices[0]
+    return [primary] + [
+        {
+            **primary,
+            "dev_id": index,
+            "dev_sn": f"A22300000{index:02d}",
+            "dev_name": f"SG5.0RS(COM1-{index:03d})",
+            "phys_addr": str(index),
+            "logc_addr": str(index),
+        }
+        for index in range(2, count + 1)
+    ]
+
+
+def _success(result_data: dict[str, Any]) -> dict[str, Any]:
+    """Wrap result_data in a successful reply."""
+    return {"result_code": 1, "result_msg": "success", "result_data": result_data}
+
+
+async def _async_serve(args: argparse.Namespace) -> None:
+    """Serve until interrupted."""
+    inverter = FakeInverter(
+        FakeInverterConfig(
+            latency=args.latency,
+            jitter=args.jitter,
+            drop_rate=args.drop_rate,
+            extra_points=args.extra_points,
+        ),
+        host=args.host,
+        port=args.port,
+    )
+    await inverter.async_start()
+    print(f"Fake SunGrow inverter listening on {inverter.host}:{inverter.port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await inverter.async_stop()
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--extra-points", type=int, default=40)
+    try:
+        asyncio.run(_async_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
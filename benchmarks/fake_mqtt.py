@@ -0,0 +1,44 @@
+"""Local stand-in for the MQTT integration's publish.
+
+Replaces mqtt.async_publish for MqttSink and counts the messages and bytes
+it received, checking that every payload is one JSON object. The latency of
+each publish is configurable, and the broker can be taken down to fail every
+publish the way the MQTT integration does while it is disconnected.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+
+class FakeMqtt:
+    """Receive the messages MqttSink publishes."""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        """Initialize the fake broker."""
+        self.latency = latency
+        self.down = False
+        self.requests = 0
+        self.rejected = 0
+        self.bytes_received = 0
+        self.last: dict[str, dict[str, Any]] = {}
+
+    async def async_publish(
+        self, hass: HomeAssistant, topic: str, payload: str
+    ) -> None:
+        """Receive one message, as mqtt.async_publish sends it."""
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.down:
+            self.rejected += 1
+            raise HomeAssistantError("MQTT is not connected")
+        message = json.loads(payload)
+        if not isinstance(message, dict):
+            raise ValueError(f"Payload on {topic} is not a JSON object")
+        self.bytes_received += len(payload.encode())
+        self.last[topic] = message
@@ -0,0 +1,71 @@
+"""Synthetic inverter replies shared by the benchmarks."""
+from __future__ import annotations
+
+import random
+
+from sungrow_websocket import InverterItem
+
+# data_name, data_unit and a typical value for the points of a real-time reply
+REAL_POINTS: tuple[tuple[str, str, float], ...] = (
+    ("I18N_COMMON_RUNNING_STATE", "", 0),
+    ("I18N_COMMON_TOTAL_YIELD", "kWh", 15234.5),
+    ("I18N_COMMON_TOTAL_ACTIVE_POWER", "kW", 3.42),
+    ("I18N_COMMON_COMMONUA", "V", 231.4),
+    ("I18N_COMMON_AIR_TEM_INSIDE_MACHINE", "℃", 41.2),
+    ("I18N_COMMON_TOTAL_GRID_RUNNING_TIME", "h", 12011),
+    ("I18N_COMMON_DAILY_POWER_YIELD", "kWh", 12.3),
+    ("I18N_COMMON_BUS_VOLTAGE", "V", 380.2),
+    ("I18N_COMMON_SQUARE_ARRAY_INSULATION_IMPEDANCE", "kΩ", 1865),
+    ("I18N_COMMON_TOTAL_DCPOWER", "kW", 3.55),
+    ("I18N_COMMON_TOTAL_REACTIVE_POWER", "kvar", 0.02),
+    ("I18N_COMMON_TOTAL_APPARENT_POWER", "kVA", 3.43),
+    ("I18N_COMMON_TOTAL_POWER_FACTOR", "", 0.998),
+    ("I18N_COMMON_GRID_FREQUENCY", "Hz", 50.01),
+    ("I18N_COMMON_FRAGMENT_RUN_TYPE1", "A", 14.8),
+    ("I18N_COMMON_MEASURING_POINT_AFD", "", 0),
+    ("I18N_COMMON_MAXIMUM_APPARENT_POWER_SIWHFGQY", "kVA", 5.0),
+)
+
+
+def real_list(
+    extra_points: int = 40,
+    seed: int | None = None,
+    variation: float = 0.03,
+    rnd: random.Random | None = None,
+) -> list[dict[str, str]]:
+    """Return the result_data list of a real-time reply.
+
+    extra_points adds filler points the integration does not know about, as
+    real inverters report far more than the default sensors. Each value
+    deviates randomly from its typical value by up to variation (relative).
+    """
+    rnd = rnd or random.Random(seed)
+    items = [
+        {
+            "data_name": name,
+            "data_value": "I18N_COMMON_RUNNING" if name.endswith("RUNNING_STATE")
+            else f"{value * rnd.uniform(1 - variation, 1 + variation):.2f}",
+            "data_unit": unit,
+        }
+        for name, unit, value in REAL_POINTS
+    ]
+    items.extend(
+        {
+            "data_name": f"I18N_COMMON_EXTRA_POINT_{index}",
+            "data_value": f"{rnd.uniform(0, 100):.1f}",
+            "data_unit": "V",
+        }
+        for index in range(extra_points)
+    )
+    return items
+
+
+def response(extra_points: int = 40, seed: int | None = None) -> dict[str, InverterItem]:
+    """Return a parsed real-time reply as produced by the client."""
+    data: dict[str, InverterItem] = {}
+    for item in real_list(extra_points, seed):
+        name = item["data_name"]
+        data[name.removeprefix("I18N_COMMON_").lower()] = InverterItem(
+            name=name, desc=name, value=item["data_value"], unit=item["data_unit"]
+        )
+    return data
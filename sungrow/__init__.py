@@ -1,45 +1,186 @@
 """The SolarEdge integration."""
 from __future__ import annotations
 
-import socket
-
-from requests.exceptions import ConnectTimeout, HTTPError
-
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.core import HomeAssistant, callback
 import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.typing import ConfigType
+from homeassistant.util import slugify
 
-from sungrow_websocket import SungrowWebsocket
-from .const import CONF_ADDRESS, DOMAIN, LOGGER
+from .capture import async_setup_capture
+from .const import (
+    CONF_ADDRESS,
+    CONF_CONTROL,
+    CONF_STALE_GRACE_PERIOD,
+    DEFAULT_STALE_GRACE_PERIOD,
+    DOMAIN,
+    LOGGER,
+    STORAGE_KEY,
+    STORAGE_VERSION,
+)
+from .coordinator import SunGrowDataService
+from .export import async_setup_export
+from .services import async_setup_services
 
 CONFIG_SCHEMA = cv.removed(DOMAIN, raise_if_present=False)
 
-PLATFORMS = [Platform.SENSOR]
+PLATFORMS = [Platform.BINARY_SENSOR, Platform.NUMBER, Platform.SELECT, Platform.SENSOR]
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the SunGrow services."""
+    async_setup_services(hass)
+    return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up SunGrow from a config entry."""
-#    try:
-#        sg = SungrowWebsocket(entry.data[CONF_ADDRESS], locale="en_US")
-#        data = sg.get_data()
-#    except Exception as ex:
-#        LOGGER.error("Could not retrieve details from SunGrow inverter")
-#        raise ConfigEntryNotReady from ex
-#
-#    if "commonua" not in data:
-#        LOGGER.error("Missing details data in SunGrow response")
-#        raise ConfigEntryNotReady
-
-    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {}
+    inverter = SunGrowDataService(
+        hass,
+        entry.data[CONF_ADDRESS],
+        Store(hass, STORAGE_VERSION, STORAGE_KEY.format(entry_id=entry.entry_id)),
+        entry.options.get(CONF_STALE_GRACE_PERIOD, DEFAULT_STALE_GRACE_PERIOD),
+        entry.unique_id,
+        control=entry.options.get(CONF_CONTROL, False),
+    )
+    services = [inverter]
+    for service in services:
+        await service.async_restore()
+
+    # The cached devices of an entry older than its serial may name the serial
+    if serial := _async_set_unique_id(hass, entry, inverter):
+        inverter.unique_id = serial
+    if entry.unique_id is not None:
+        await _async_migrate_to_serial(hass, entry, entry.unique_id)
+    else:
+
+        @callback
+        def _async_serial_discovered() -> None:
+            """Reload the entry once its serial is known, to key it by the serial."""
+            if _async_set_unique_id(hass, entry, inverter):
+                hass.config_entries.async_schedule_reload(entry.entry_id)
+
+        entry.async_on_unload(
+            inverter.async_add_schema_listener(_async_serial_discovered)
+        )
+
+    for service in services:
+        service.async_setup()
+        entry.async_on_unload(service.async_shutdown)
+    # The exporters and the capture listen to the coordinators created above
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
+        "options": dict(entry.options),
+        "services": services,
+        "exporters": [
+            *async_setup_export(hass, entry, services),
+            *async_setup_capture(hass, entry, services),
+        ],
+    }
+
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
+    # Entities start from the cached values; do not hold up startup on the
+    # first round trip to a slow or sleeping inverter.
+    for service in services:
+        entry.async_create_background_task(
+            hass,
+            service.coordinator.async_refresh(),
+            f"{DOMAIN} first refresh {service.ip_address}",
+        )
     return True
 
 
+@callback
+def _async_set_unique_id(
+    hass: HomeAssistant, entry: ConfigEntry, service: SunGrowDataService
+) -> str | None:
+    """Key an entry created before serials were kept by its serial; return it."""
+    if entry.unique_id is not None or not service.devices:
+        return None
+    serial = str(service.devices[0].get("dev_sn") or "")
+    if not serial or hass.config_entries.async_entry_for_domain_unique_id(
+        DOMAIN, serial
+    ):
+        return None
+    hass.config_entries.async_update_entry(entry, unique_id=serial)
+    return serial
+
+
+async def _async_migrate_to_serial(
+    hass: HomeAssistant, entry: ConfigEntry, serial: str
+) -> None:
+    """Move entities, devices and statistics keyed by the address to the serial."""
+    address = entry.data[CONF_ADDRESS]
+    if address == serial:
+        return
+
+    def _rekey(key: str) -> str | None:
+        """Return the key moved to the serial, None if it is not keyed by address."""
+        if key == address:
+            return serial
+        if key.startswith(f"{address}_"):
+            return f"{serial}{key[len(address):]}"
+        return None
+
+    @callback
+    def _async_migrate_entity(entity_entry: er.RegistryEntry) -> dict[str, str] | None:
+        """Return the unique id of an entity keyed by the serial."""
+        if (unique_id := _rekey(entity_entry.unique_id)) is None:
+            return None
+        return {"new_unique_id": unique_id}
+
+    await er.async_migrate_entries(hass, entry.entry_id, _async_migrate_entity)
+
+    device_registry = dr.async_get(hass)
+    for device in dr.async_entries_for_config_entry(device_registry, entry.entry_id):
+        identifiers = {
+            (domain, _rekey(key) or key) if domain == DOMAIN else (domain, key)
+            for domain, key in device.identifiers
+        }
+        if identifiers != device.identifiers:
+            device_registry.async_update_device(device.id, new_identifiers=identifiers)
+
+    if "recorder" not in hass.config.components:
+        return
+    from homeassistant.components.recorder import (  # pylint: disable=import-outside-toplevel
+        get_instance,
+    )
+    from homeassistant.components.recorder.statistics import (  # pylint: disable=import-outside-toplevel
+        async_list_statistic_ids,
+    )
+
+    old_prefix = f"{DOMAIN}:{slugify(address)}_"
+    new_prefix = f"{DOMAIN}:{slugify(serial)}_"
+    for statistic in await async_list_statistic_ids(hass):
+        statistic_id: str = statistic["statistic_id"]
+        if statistic_id.startswith(old_prefix):
+            LOGGER.debug("Moving the statistics %s to the serial", statistic_id)
+            get_instance(hass).async_update_statistics_metadata(
+                statistic_id,
+                new_statistic_id=new_prefix + statistic_id[len(old_prefix) :],
+            )
+
+
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the entry when its options change."""
+    if entry.options != hass.data[DOMAIN][entry.entry_id]["options"]:
+        await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload SunGrow config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
         del hass.data[DOMAIN][entry.entry_id]
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the cached schema and values of a removed config entry."""
+    await Store(
+        hass, STORAGE_VERSION, STORAGE_KEY.format(entry_id=entry.entry_id)
+    ).async_remove()
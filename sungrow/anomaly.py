@@ -0,0 +1,254 @@
+"""Anomaly and fault detection on the values of each poll.
+
+The detector keeps rolling statistics, an exponentially weighted moving
+average (EWMA), variance and rate of change, for the handful of points that
+tell the health of an inverter, and derives its conversion efficiency from
+the AC and DC power. Each poll updates a fixed set of statistics, so its
+cost does not grow with the history and its memory is constant.
+
+Problems are judged on the EWMAs rather than on single samples, so one
+noisy reading does not raise them, except for the states the inverter
+reports itself:
+
+* derating: the running state of the inverter reports DERATING_RUNNING_STATE
+* insulation drift: the insulation impedance falls more than
+  INSULATION_DRIFT below its long-term baseline, or below
+  INSULATION_MIN_IMPEDANCE
+* overheating: the internal temperature stays above OVERHEAT_TEMPERATURE
+* string underperformance: an MPPT string delivers less than
+  STRING_UNDERPERFORMANCE of the best string (needs the MPPT voltage and
+  current sensors enabled)
+* arc fault: the arc fault detection point reports a non-zero value
+"""
+from __future__ import annotations
+
+import math
+import re
+from typing import Any
+
+from sungrow_websocket import InverterItem
+
+from .const import (
+    ANOMALY_BASELINE_ALPHA,
+    ANOMALY_EWMA_ALPHA,
+    ANOMALY_MIN_DC_POWER,
+    DERATING_RUNNING_STATE,
+    INSULATION_DRIFT,
+    INSULATION_MIN_IMPEDANCE,
+    OVERHEAT_TEMPERATURE,
+    STRING_UNDERPERFORMANCE,
+)
+from .points import Converter
+
+PROBLEM_DERATING = "derating"
+PROBLEM_INSULATION_DRIFT = "insulation_drift"
+PROBLEM_OVERHEATING = "overheating"
+PROBLEM_STRING_UNDERPERFORMANCE = "string_underperformance"
+PROBLEM_ARC_FAULT = "arc_fault"
+
+PROBLEMS = (
+    PROBLEM_DERATING,
+    PROBLEM_INSULATION_DRIFT,
+    PROBLEM_OVERHEATING,
+    PROBLEM_STRING_UNDERPERFORMANCE,
+    PROBLEM_ARC_FAULT,
+)
+
+POINT_AC_POWER = "total_active_power"
+POINT_DC_POWER = "total_dcpower"
+POINT_TEMPERATURE = "air_tem_inside_machine"
+POINT_INSULATION = "square_array_insulation_impedance"
+POINT_ARC_FAULT = "measuring_point_afd"
+POINT_RUNNING_STATE = "running_state"
+
+WATCHED_POINTS = (
+    POINT_AC_POWER,
+    POINT_DC_POWER,
+    POINT_TEMPERATURE,
+    POINT_INSULATION,
+    POINT_ARC_FAULT,
+)
+
+# MPPT string points of the inverter itself, as discovered from the direct request
+_MPPT_POINT = re.compile(r"mppt(\d+)_(voltage|current)")
+
+
+class RollingStat:
+    """EWMA, variance and rate of change (per second) of one series."""
+
+    __slots__ = ("alpha", "count", "mean", "variance", "rate", "value", "timestamp")
+
+    def __init__(self, alpha: float) -> None:
+        """Initialize the statistics."""
+        self.alpha = alpha
+        self.count = 0
+        self.mean = 0.0
+        self.variance = 0.0
+        self.rate = 0.0
+        self.value = 0.0
+        self.timestamp = 0.0
+
+    def add(self, timestamp: float, value: float) -> None:
+        """Fold a sample into the statistics."""
+        if self.count:
+            if (elapsed := timestamp - self.timestamp) > 0:
+                self.rate = (value - self.value) / elapsed
+            diff = value - self.mean
+            increment = self.alpha * diff
+            self.mean += increment
+            self.variance = (1 - self.alpha) * (self.variance + diff * increment)
+        else:
+            self.mean = value
+        self.count += 1
+        self.value = value
+        self.timestamp = timestamp
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics, rounded for display."""
+        return {
+            "value": round(self.value, 4),
+            "ewma": round(self.mean, 4),
+            "stddev": round(math.sqrt(self.variance), 4),
+            "rate": round(self.rate, 6),
+        }
+
+
+def _float(value: Any) -> float | None:
+    """Return a converted value if it is a number."""
+    return value if isinstance(value, float) else None
+
+
+class AnomalyDetector:
+    """Judge the health of one inverter from the values of its polls."""
+
+    def __init__(self) -> None:
+        """Initialize the detector."""
+        self.stats: dict[str, RollingStat] = {
+            key: RollingStat(ANOMALY_EWMA_ALPHA) for key in WATCHED_POINTS
+        }
+        self.baseline = RollingStat(ANOMALY_BASELINE_ALPHA)
+        self.efficiency = RollingStat(ANOMALY_EWMA_ALPHA)
+        self.strings: dict[str, RollingStat] = {}
+        self.running_state = ""
+        self.active: dict[str, bool] = dict.fromkeys(PROBLEMS, False)
+        self._points: tuple[tuple[str, Converter], ...] = ()
+        self._mppt: tuple[tuple[str, str, str, Converter, Converter], ...] = ()
+
+    def set_points(self, converters: dict[str, Converter]) -> None:
+        """Use the converters of the points the inverter reports."""
+        self._points = tuple(
+            (key, converters[key]) for key in WATCHED_POINTS if key in converters
+        )
+        strings: dict[str, dict[str, str]] = {}
+        for key in converters:
+            if (match := _MPPT_POINT.fullmatch(key)) is not None:
+                strings.setdefault(f"mppt{match[1]}", {})[match[2]] = key
+        self._mppt = tuple(
+            (
+                name,
+                keys["voltage"],
+                keys["current"],
+                converters[keys["voltage"]],
+                converters[keys["current"]],
+            )
+            for name, keys in sorted(strings.items())
+            if len(keys) == 2
+        )
+        self.strings = {
+            name: self.strings.get(name) or RollingStat(ANOMALY_EWMA_ALPHA)
+            for name, *_ in self._mppt
+        }
+
+    def add(self, timestamp: float, response: dict[str, InverterItem]) -> list[str]:
+        """Update the statistics from a reply; return the problems that changed."""
+        stats = self.stats
+        for key, convert in self._points:
+            if (item := response.get(key)) is not None and (
+                value := _float(convert(item.value))
+            ) is not None:
+                stats[key].add(timestamp, value)
+        if (state := response.get(POINT_RUNNING_STATE)) is not None:
+            self.running_state = str(state.value)
+
+        dc_power = stats[POINT_DC_POWER]
+        producing = (
+            dc_power.timestamp == timestamp and dc_power.value > ANOMALY_MIN_DC_POWER
+        )
+        if producing and stats[POINT_AC_POWER].timestamp == timestamp:
+            self.efficiency.add(timestamp, stats[POINT_AC_POWER].value / dc_power.value)
+        insulation = stats[POINT_INSULATION]
+        if insulation.timestamp == timestamp and not self.active[PROBLEM_INSULATION_DRIFT]:
+            # Hold the baseline while the impedance drifts, not to follow it down
+            self.baseline.add(timestamp, insulation.value)
+        underperforming = producing and self._add_strings(timestamp, response)
+
+        active = {
+            PROBLEM_DERATING: DERATING_RUNNING_STATE in self.running_state.lower(),
+            PROBLEM_INSULATION_DRIFT: insulation.count > 0
+            and (
+                insulation.mean < INSULATION_MIN_IMPEDANCE
+                or insulation.mean < (1 - INSULATION_DRIFT) * self.baseline.mean
+            ),
+            PROBLEM_OVERHEATING: stats[POINT_TEMPERATURE].count > 0
+            and stats[POINT_TEMPERATURE].mean > OVERHEAT_TEMPERATURE,
+            PROBLEM_STRING_UNDERPERFORMANCE: underperforming,
+            PROBLEM_ARC_FAULT: stats[POINT_ARC_FAULT].timestamp == timestamp
+            and stats[POINT_ARC_FAULT].value != 0,
+        }
+        changed = [
+            problem for problem, state in active.items() if state != self.active[problem]
+        ]
+        self.active = active
+        return changed
+
+    def _add_strings(self, timestamp: float, response: dict[str, InverterItem]) -> bool:
+        """Track the share of each string in the best one; return True if one lags."""
+        powers = []
+        for name, voltage_key, current_key, voltage_convert, current_convert in self._mppt:
+            voltage = response.get(voltage_key)
+            current = response.get(current_key)
+            if voltage is None or current is None:
+                continue
+            volts = _float(voltage_convert(voltage.value))
+            amps = _float(current_convert(current.value))
+            if volts is not None and amps is not None:
+                powers.append((name, volts * amps))
+        if len(powers) < 2 or (best := max(power for _, power in powers)) <= 0:
+            return False
+        lagging = False
+        for name, power in powers:
+            share = self.strings[name]
+            share.add(timestamp, power / best)
+            lagging = lagging or share.mean < STRING_UNDERPERFORMANCE
+        return lagging
+
+    def details(self, problem: str) -> dict[str, Any]:
+        """Return the statistics a problem is judged on."""
+        if problem == PROBLEM_DERATING:
+            return {
+                "running_state": self.running_state,
+                "efficiency": self.efficiency.as_dict(),
+            }
+        if problem == PROBLEM_INSULATION_DRIFT:
+            return {
+                "impedance": self.stats[POINT_INSULATION].as_dict(),
+                "baseline": round(self.baseline.mean, 1),
+            }
+        if problem == PROBLEM_OVERHEATING:
+            return {"temperature": self.stats[POINT_TEMPERATURE].as_dict()}
+        if problem == PROBLEM_STRING_UNDERPERFORMANCE:
+            return {name: share.as_dict() for name, share in self.strings.items()}
+        return {"arc_fault": self.stats[POINT_ARC_FAULT].as_dict()}
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the state of the detector for diagnostics."""
+        return {
+            "active": self.active,
+            "running_state": self.running_state or None,
+            "points": {
+                key: stat.as_dict() for key, stat in self.stats.items() if stat.count
+            },
+            "efficiency": self.efficiency.as_dict() if self.efficiency.count else None,
+            "insulation_baseline": self.baseline.mean if self.baseline.count else None,
+            "strings": {name: share.as_dict() for name, share in self.strings.items()},
+        }
@@ -0,0 +1,84 @@
+"""Problems detected on the values of a SunGrow inverter."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.binary_sensor import (
+    BinarySensorDeviceClass,
+    BinarySensorEntity,
+    BinarySensorEntityDescription,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .anomaly import (
+    PROBLEM_ARC_FAULT,
+    PROBLEM_DERATING,
+    PROBLEM_INSULATION_DRIFT,
+    PROBLEM_OVERHEATING,
+    PROBLEM_STRING_UNDERPERFORMANCE,
+)
+from .const import DOMAIN
+from .entity import SunGrowEntity
+
+PROBLEM_SENSOR_TYPES = [
+    BinarySensorEntityDescription(
+        key=PROBLEM_DERATING,
+        translation_key=PROBLEM_DERATING,
+        icon="mdi:solar-power-variant-outline",
+        device_class=BinarySensorDeviceClass.PROBLEM,
+    ),
+    BinarySensorEntityDescription(
+        key=PROBLEM_INSULATION_DRIFT,
+        translation_key=PROBLEM_INSULATION_DRIFT,
+        icon="mdi:resistor",
+        device_class=BinarySensorDeviceClass.PROBLEM,
+    ),
+    BinarySensorEntityDescription(
+        key=PROBLEM_OVERHEATING,
+        translation_key=PROBLEM_OVERHEATING,
+        icon="mdi:thermometer-alert",
+        device_class=BinarySensorDeviceClass.PROBLEM,
+    ),
+    BinarySensorEntityDescription(
+        key=PROBLEM_STRING_UNDERPERFORMANCE,
+        translation_key=PROBLEM_STRING_UNDERPERFORMANCE,
+        icon="mdi:solar-panel",
+        device_class=BinarySensorDeviceClass.PROBLEM,
+        entity_registry_enabled_default=False,
+    ),
+    BinarySensorEntityDescription(
+        key=PROBLEM_ARC_FAULT,
+        translation_key=PROBLEM_ARC_FAULT,
+        icon="mdi:flash-alert-outline",
+        device_class=BinarySensorDeviceClass.PROBLEM,
+    ),
+]
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the problem sensors of each inverter."""
+    async_add_entities(
+        SunGrowProblemSensor(description, service)
+        for service in hass.data[DOMAIN][entry.entry_id]["services"]
+        for description in PROBLEM_SENSOR_TYPES
+    )
+
+
+class SunGrowProblemSensor(SunGrowEntity, BinarySensorEntity):
+    """Problem raised by the anomaly detector of a SunGrow inverter."""
+
+    @property
+    def is_on(self) -> bool:
+        """Return True while the problem is detected."""
+        return self.data_service.anomalies.active[self.entity_description.key]
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the statistics the problem is judged on."""
+        return self.data_service.anomalies.details(self.entity_description.key)
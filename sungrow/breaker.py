@@ -0,0 +1,82 @@
+"""Circuit breaker guarding the polls of one inverter."""
+from __future__ import annotations
+
+import random
+import time
+from typing import Any
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stop polling an inverter that keeps failing, and probe it now and then.
+
+    The breaker opens after threshold consecutive failures. While it is open
+    every poll fails at once instead of waiting for a connection timeout.
+    Once the backoff has elapsed a single poll goes through (half-open): its
+    success closes the breaker, its failure opens it again for twice as
+    long, up to backoff_max. Every backoff is spread by +/- jitter so
+    inverters that dropped off the same access point are not retried in
+    lockstep.
+    """
+
+    def __init__(
+        self,
+        threshold: int,
+        backoff_min: float,
+        backoff_max: float,
+        jitter: float,
+    ) -> None:
+        """Initialize the breaker."""
+        self.threshold = threshold
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.trips = 0
+        self._backoff = 0.0
+        self._retry_at = 0.0
+
+    @property
+    def retry_in(self) -> float:
+        """Return the seconds left before the next probe, 0 if polls go through."""
+        if self.state != STATE_OPEN:
+            return 0.0
+        return max(self._retry_at - time.monotonic(), 0.0)
+
+    def allow(self) -> bool:
+        """Return True if a poll may be attempted now."""
+        if self.state == STATE_OPEN:
+            if time.monotonic() < self._retry_at:
+                return False
+            self.state = STATE_HALF_OPEN
+        return True
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful poll."""
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self._backoff = 0.0
+
+    def record_failure(self) -> None:
+        """Count a failed poll, opening the breaker if needed."""
+        self.failures += 1
+        if self.state != STATE_HALF_OPEN and self.failures < self.threshold:
+            return
+        self._backoff = min(max(self._backoff * 2, self.backoff_min), self.backoff_max)
+        delay = self._backoff * random.uniform(1 - self.jitter, 1 + self.jitter)
+        self._retry_at = time.monotonic() + delay
+        self.state = STATE_OPEN
+        self.trips += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the state of the breaker."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "retry_in": round(self.retry_in, 1),
+        }
@@ -0,0 +1,319 @@
+"""Capture and replay of the raw traffic of an inverter.
+
+A capture is an append-only file of JSON lines, one record per session,
+poll or failed poll, with the wall-clock time it was received at:
+
+* session: the device list and, when they changed, the i18n strings
+* poll: the (dev_id, service) of each request of a poll and the raw
+  result_data, or the error, of its reply
+* items: the parsed points of a poll read by the fallback library
+* error: a poll that failed, with the error
+
+Lines are written in batches, each batch compressed as one gzip member, so
+the file stays compact, can be read with gzip, and is never rewritten.
+
+ReplayClient serves such records in place of an inverter, so a capture
+runs through the same parsing, extraction and entity updates as live
+replies; async_replay drives it at the recorded pace or as fast as possible.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterable, Iterator
+import gzip
+import json
+import os
+import time
+from typing import Any
+
+import aiohttp
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.util import slugify
+
+from sungrow_websocket import InverterItem
+
+from .breaker import CircuitBreaker
+from .client import (
+    Request,
+    SunGrowClient,
+    SunGrowConnectionError,
+    SunGrowRequestError,
+)
+from .const import (
+    CAPTURE_BATCH_SIZE,
+    CAPTURE_FLUSH_INTERVAL,
+    CAPTURE_MAX_BYTES,
+    CIRCUIT_BREAKER_THRESHOLD,
+    CONF_CAPTURE,
+    DOMAIN,
+    LOGGER,
+)
+from .coordinator import SunGrowDataService
+from .export import SunGrowExporter, SunGrowExportError
+from .fleet import SunGrowFleet
+
+RECORD_SESSION = "session"
+RECORD_POLL = "poll"
+RECORD_ITEMS = "items"
+RECORD_ERROR = "error"
+
+
+def capture_path(hass: HomeAssistant, ip_address: str) -> str:
+    """Return the capture file of an inverter, in the configuration folder."""
+    return hass.config.path(f"{DOMAIN}_capture_{slugify(ip_address)}.jsonl.gz")
+
+
+def write_capture(path: str, records: list[str]) -> int:
+    """Append encoded records to a capture as one gzip member; return its size."""
+    data = gzip.compress("".join(f"{record}\n" for record in records).encode())
+    with open(path, "ab") as file:
+        file.write(data)
+    return len(data)
+
+
+def read_capture(path: str) -> Iterator[dict[str, Any]]:
+    """Yield the records of a capture, up to a batch cut short by a crash."""
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        try:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile, ValueError) as ex:
+            LOGGER.warning("Capture %s ends with a damaged record: %s", path, ex)
+
+
+class CaptureRecorder:
+    """Record the traffic of one inverter into a capture file.
+
+    Records go through an exporter, so the file is written in the executor,
+    in batches, and a full disk only costs the oldest pending records. The
+    recorder stops once the file reaches max_bytes.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, path: str, max_bytes: int = CAPTURE_MAX_BYTES
+    ) -> None:
+        """Initialize the recorder."""
+        self.hass = hass
+        self.path = path
+        self.max_bytes = max_bytes
+        self.size: int | None = None
+        self.exporter = SunGrowExporter(
+            "capture",
+            self._async_write,
+            batch_size=CAPTURE_BATCH_SIZE,
+            flush_interval=CAPTURE_FLUSH_INTERVAL,
+        )
+        self._strings_recorded = -1
+
+    @callback
+    def _record(self, kind: str, **fields: Any) -> None:
+        """Queue one record."""
+        if self.size is not None and self.size >= self.max_bytes:
+            return
+        self.exporter.async_enqueue(
+            json.dumps(
+                {"type": kind, "t": time.time(), **fields},
+                separators=(",", ":"),
+                ensure_ascii=False,
+            )
+        )
+
+    @callback
+    def record_session(self, client: SunGrowClient) -> None:
+        """Record a new session, with the strings if they changed."""
+        fields: dict[str, Any] = {"devices": client.devices}
+        if len(client.strings) != self._strings_recorded:
+            self._strings_recorded = len(client.strings)
+            fields["strings"] = client.strings
+        self._record(RECORD_SESSION, **fields)
+
+    @callback
+    def record_poll(
+        self,
+        messages: list[dict[str, Any]],
+        results: list[dict[str, Any] | SunGrowRequestError],
+    ) -> None:
+        """Record the raw replies of a poll."""
+        self._record(
+            RECORD_POLL,
+            requests=[[message["dev_id"], message["service"]] for message in messages],
+            results=[
+                {"error": str(result)}
+                if isinstance(result, SunGrowRequestError)
+                else {"data": result}
+                for result in results
+            ],
+        )
+
+    @callback
+    def record_items(self, items: dict[str, InverterItem]) -> None:
+        """Record the points of a poll read by the fallback library."""
+        self._record(RECORD_ITEMS, items={key: list(item) for key, item in items.items()})
+
+    @callback
+    def record_error(self, error: Exception) -> None:
+        """Record a failed poll."""
+        self._record(RECORD_ERROR, error=str(error))
+
+    async def _async_write(self, records: list[str]) -> None:
+        """Append a batch to the file."""
+        try:
+            await self.hass.async_add_executor_job(self._write, records)
+        except OSError as ex:
+            raise SunGrowExportError(f"Cannot write {self.path}: {ex}") from ex
+
+    def _write(self, records: list[str]) -> None:
+        """Append a batch to the file, in the executor."""
+        if self.size is None:
+            self.size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if self.size >= self.max_bytes:
+            return
+        self.size += write_capture(self.path, records)
+        if self.size >= self.max_bytes:
+            LOGGER.warning("Capture %s is full, recording stopped", self.path)
+
+
+@callback
+def async_setup_capture(
+    hass: HomeAssistant, entry: ConfigEntry, services: list[SunGrowDataService]
+) -> list[SunGrowExporter]:
+    """Start recording the traffic of each inverter if the option is set."""
+    if not entry.options.get(CONF_CAPTURE):
+        return []
+    exporters = []
+    for service in services:
+        recorder = CaptureRecorder(hass, capture_path(hass, service.ip_address))
+        service.connection.client.recorder = recorder
+        LOGGER.info("Recording the traffic of %s to %s", service.ip_address, recorder.path)
+        entry.async_create_background_task(
+            hass, recorder.exporter.async_run(), f"{DOMAIN} capture {service.ip_address}"
+        )
+        entry.async_on_unload(recorder.exporter.async_stop)
+        exporters.append(recorder.exporter)
+    return exporters
+
+
+class ReplayClient(SunGrowClient):
+    """Serve captured records in place of an inverter.
+
+    feed sets the record the next connection or poll is answered from.
+    Requests of a poll are matched to the captured ones by (dev_id,
+    service); a request the capture holds no reply for is rejected, as the
+    inverter rejects a service it does not provide.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, host: str) -> None:
+        """Initialize the client."""
+        super().__init__(session, host)
+        self._open = False
+        self._session_record: dict[str, Any] | None = None
+        self._record: dict[str, Any] | None = None
+
+    @property
+    def connected(self) -> bool:
+        """Return True if the replayed session is open."""
+        return self._open
+
+    def feed(self, record: dict[str, Any]) -> None:
+        """Answer the next connection or poll from a record."""
+        if record["type"] == RECORD_SESSION:
+            self._session_record = record
+        else:
+            self._record = record
+
+    async def async_connect(self, *, load_strings: bool = True) -> None:
+        """Open the session described by the last session record."""
+        if (record := self._session_record) is None:
+            raise SunGrowConnectionError("The capture holds no session")
+        if "strings" in record:
+            self.strings = record["strings"]
+        self.devices = list(record["devices"])
+        self.dev_id = str(self.devices[0]["dev_id"])
+        self._open = True
+
+    async def async_close(self) -> None:
+        """Close the replayed session."""
+        self._open = False
+
+    async def async_get_data(
+        self,
+        requests: tuple[Request, ...] | None = None,
+        sources: dict[str, Request] | None = None,
+    ) -> dict[str, InverterItem]:
+        """Return the points of the current record."""
+        if (record := self._record) is not None and record["type"] == RECORD_ITEMS:
+            return {key: InverterItem(*item) for key, item in record["items"].items()}
+        return await super().async_get_data(requests, sources)
+
+    async def async_request_many(
+        self, messages: list[dict[str, Any]]
+    ) -> list[dict[str, Any] | SunGrowRequestError]:
+        """Return the captured replies to the requests of a poll."""
+        if (record := self._record) is None:
+            raise SunGrowConnectionError("The capture holds no poll")
+        if record["type"] == RECORD_ERROR:
+            raise SunGrowConnectionError(record["error"])
+        replies = {
+            tuple(request): reply
+            for request, reply in zip(record["requests"], record["results"])
+        }
+        results: list[dict[str, Any] | SunGrowRequestError] = []
+        for message in messages:
+            reply = replies.get((message["dev_id"], message["service"]))
+            if reply is None or "error" in reply:
+                error = reply["error"] if reply else "not captured"
+                results.append(SunGrowRequestError(f"{message['service']} failed: {error}"))
+            else:
+                results.append(reply["data"])
+        return results
+
+
+class _ReplayFleet(SunGrowFleet):
+    """Fleet that does not space out the polls of a replay."""
+
+    @property
+    def stagger(self) -> float:
+        """Return no spacing, the replay sets the pace."""
+        return 0.0
+
+
+async def async_replay(
+    service: SunGrowDataService,
+    records: Iterable[dict[str, Any]],
+    speed: float | None = None,
+) -> int:
+    """Feed captured records through a data service; return the polls replayed.
+
+    Each poll is a refresh of the service's coordinator, so the replies are
+    parsed, extracted and dispatched to the entities as live ones are. speed
+    1 keeps the recorded pace, 10 replays ten times faster and None as fast
+    as possible. The service no longer schedules polls itself. Each poll
+    takes the time of its record, so the values that depend on the clock,
+    such as the integrated energy, follow the recording.
+    """
+    client = ReplayClient(async_get_clientsession(service.hass), service.ip_address)
+    service.connection.client = client
+    service.scheduled = False
+    service.coordinator.update_interval = None
+    service.fleet.async_unregister(service.unique_id)
+    service.fleet = _ReplayFleet()
+    service.fleet.async_register(service.unique_id, service.ip_address)
+    if speed != 1:
+        # The backoff of the breaker runs on the wall clock, do not let it skip polls
+        service.connection.breaker = CircuitBreaker(CIRCUIT_BREAKER_THRESHOLD, 0, 0, 0)
+    polls = 0
+    previous: float | None = None
+    for record in records:
+        client.feed(record)
+        if record["type"] == RECORD_SESSION:
+            continue
+        if speed and previous is not None:
+            await asyncio.sleep(max(record["t"] - previous, 0) / speed)
+        previous = service.replay_time = record["t"]
+        await service.coordinator.async_refresh()
+        polls += 1
+    return polls
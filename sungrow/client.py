@@ -0,0 +1,399 @@
+"""Async-native client for the SunGrow inverter WebSocket API."""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import time
+from typing import TYPE_CHECKING, Any
+
+import aiohttp
+
+from sungrow_websocket import InverterItem
+
+from .const import INVERTER_REQUEST_TIMEOUT, INVERTER_WEBSOCKET_PORT, LOGGER
+
+if TYPE_CHECKING:
+    from .capture import CaptureRecorder
+
+
+class SunGrowError(Exception):
+    """Base class for inverter client errors."""
+
+
+class SunGrowConnectionError(SunGrowError):
+    """Raised when the inverter cannot be reached or the session is gone."""
+
+
+class SunGrowRequestError(SunGrowConnectionError):
+    """Raised when the inverter rejects a request."""
+
+
+class SunGrowCircuitOpenError(SunGrowConnectionError):
+    """Raised instead of polling an inverter that keeps failing."""
+
+
+class SunGrowProtocolError(SunGrowError):
+    """Raised when a reply from the inverter is not understood."""
+
+
+# Services holding data points: the real-time block, the battery block of
+# hybrid models and the per-MPPT string voltages and currents
+SERVICE_REAL = "real"
+SERVICE_BATTERY = "real_battery"
+SERVICE_DIRECT = "direct"
+DATA_SERVICES = (SERVICE_REAL, SERVICE_BATTERY, SERVICE_DIRECT)
+
+# (dev_id, service) of a data request; an empty dev_id is the inverter itself,
+# the first device of the dongle's device list
+Request = tuple[str, str]
+REQUEST_REAL: Request = ("", SERVICE_REAL)
+
+# Services reading and writing the parameters of the inverter, addressed by
+# their holding register
+SERVICE_PARAM = "param"
+SERVICE_SET_PARAM = "param_set"
+
+
+@dataclass
+class ParamRound:
+    """Parameter writes and reads of one round, and their outcome.
+
+    writes maps parameter addresses to raw values; they are sent before the
+    reads. errors holds the rejected writes, values the raw values read and
+    rejected the reads the inverter refused.
+    """
+
+    writes: dict[int, int] = field(default_factory=dict)
+    reads: list[int] = field(default_factory=list)
+    errors: dict[int, SunGrowRequestError] = field(default_factory=dict)
+    values: dict[int, int] = field(default_factory=dict)
+    rejected: list[int] = field(default_factory=list)
+
+
+def device_key(dev_id: str, key: str) -> str:
+    """Return the key of a point of a device other than the inverter."""
+    return f"device_{dev_id}_{key}"
+
+
+def item_id(name: str) -> str:
+    """Return the data key the inverter uses for a data_name."""
+    if name.startswith("I18N_COMMON_"):
+        return name.removeprefix("I18N_COMMON_").lower()
+    return name.removeprefix("I18N_").lower()
+
+
+class SunGrowClient:
+    """Talk to a SunGrow inverter entirely on the event loop.
+
+    One instance holds one WebSocket session: the login token and device id
+    obtained by async_connect are reused by every later request until the
+    socket is closed. A recorder, when set, captures every session and data
+    reply as received.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        host: str,
+        *,
+        port: int = INVERTER_WEBSOCKET_PORT,
+        http_port: int = 80,
+        locale: str = "en_US",
+        timeout: float = INVERTER_REQUEST_TIMEOUT,
+    ) -> None:
+        """Initialize the client."""
+        self.host = host
+        self.port = port
+        self.http_port = http_port
+        self.locale = locale
+        self._session = session
+        self._timeout = timeout
+        self._websocket: aiohttp.ClientWebSocketResponse | None = None
+        self._token = ""
+        self.dev_id = ""
+        self.devices: list[dict[str, Any]] = []
+        self.strings: dict[str, str] = {}
+        self.timings: dict[str, float] = {}
+        self.bytes_received = 0
+        self.recorder: CaptureRecorder | None = None
+
+    @property
+    def connected(self) -> bool:
+        """Return True if the session is open."""
+        return self._websocket is not None and not self._websocket.closed
+
+    async def async_connect(self, *, load_strings: bool = True) -> None:
+        """Open the socket, log in and look up the inverter device id.
+
+        load_strings=False skips the i18n strings, which only data requests
+        need, to check the handshake alone.
+        """
+        start = time.perf_counter()
+        if load_strings and not self.strings:
+            await self._async_update_strings()
+        try:
+            async with asyncio.timeout(self._timeout):
+                self._websocket = await self._session.ws_connect(
+                    f"ws://{self.host}:{self.port}/ws/home/overview"
+                )
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as ex:
+            raise SunGrowConnectionError(f"Cannot connect to {self.host}: {ex}") from ex
+        connected = time.perf_counter()
+        self.timings["connect"] = connected - start
+        try:
+            await self._async_login()
+        except SunGrowError:
+            await self.async_close()
+            raise
+        self.timings["authenticate"] = time.perf_counter() - connected
+        if self.recorder is not None:
+            self.recorder.record_session(self)
+
+    async def _async_login(self) -> None:
+        """Obtain a token and the device list on the freshly opened socket."""
+        result = await self.async_request({"service": "connect", "token": ""})
+        try:
+            self._token = result["token"]
+        except (KeyError, TypeError) as ex:
+            raise SunGrowProtocolError("Login reply holds no token") from ex
+        result = await self.async_request(
+            {"service": "devicelist", "type": "0", "is_check_token": "0"}
+        )
+        try:
+            self.devices = list(result["list"])
+            self.dev_id = str(self.devices[0]["dev_id"])
+        except (KeyError, IndexError, TypeError) as ex:
+            raise SunGrowProtocolError("Device list reply holds no device") from ex
+
+    async def async_close(self) -> None:
+        """Close the session, if any."""
+        websocket, self._websocket = self._websocket, None
+        self._token = ""
+        if websocket is not None:
+            await websocket.close()
+
+    async def async_request(self, message: dict[str, Any]) -> dict[str, Any]:
+        """Send one request on the session and return its result_data."""
+        result = (await self.async_request_many([message]))[0]
+        if isinstance(result, SunGrowRequestError):
+            raise result
+        return result
+
+    async def async_request_many(
+        self, messages: list[dict[str, Any]]
+    ) -> list[dict[str, Any] | SunGrowRequestError]:
+        """Pipeline requests on the session and return their results in order.
+
+        All requests are sent before the first reply is read, so the round
+        trips overlap. A rejected request yields a SunGrowRequestError in its
+        slot instead of failing the others.
+        """
+        if not self.connected:
+            raise SunGrowConnectionError("Session is not open")
+        assert self._websocket is not None
+        websocket = self._websocket
+        results: list[dict[str, Any] | SunGrowRequestError] = []
+        try:
+            for message in messages:
+                await websocket.send_json(
+                    {"lang": self.locale, "token": self._token, **message}
+                )
+            async with asyncio.timeout(self._timeout):
+                for message in messages:
+                    results.append(self._result(message, await websocket.receive()))
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as ex:
+            raise SunGrowConnectionError(
+                f"{messages[len(results)]['service']} request failed: {ex!r}"
+            ) from ex
+        return results
+
+    def _result(
+        self, message: dict[str, Any], msg: aiohttp.WSMessage
+    ) -> dict[str, Any] | SunGrowRequestError:
+        """Return the result_data of the reply to a request."""
+        if msg.type is not aiohttp.WSMsgType.TEXT:
+            raise SunGrowConnectionError(f"Session closed by inverter ({msg.type.name})")
+        self.bytes_received += len(msg.data)
+        try:
+            reply = msg.json()
+        except ValueError as ex:
+            raise SunGrowProtocolError("Reply is not valid JSON") from ex
+        if reply.get("result_code") != 1 or reply.get("result_msg") != "success":
+            return SunGrowRequestError(
+                f"{message['service']} failed: {reply.get('result_msg')}"
+            )
+        return reply["result_data"]
+
+    @property
+    def all_requests(self) -> tuple[Request, ...]:
+        """Return the requests reading every service of every device."""
+        return tuple(
+            (dev_id, service)
+            for dev_id in ("", *(str(device["dev_id"]) for device in self.devices[1:]))
+            for service in DATA_SERVICES
+        )
+
+    async def async_get_data(
+        self,
+        requests: tuple[Request, ...] | None = None,
+        sources: dict[str, Request] | None = None,
+    ) -> dict[str, InverterItem]:
+        """Request and parse data in one pipelined round.
+
+        requests lists (dev_id, service) pairs, "" standing for the inverter
+        itself; None reads every service of every device. Points of other
+        devices are keyed with device_key. The real-time block of the inverter
+        is mandatory; other blocks are skipped when the dongle rejects them,
+        as it does for the battery block of models without a battery. If
+        sources is given, it is filled with the request of each point.
+        """
+        if not self.connected:
+            await self.async_connect()
+        if requests is None:
+            requests = self.all_requests
+        start = time.perf_counter()
+        messages = [
+            {"service": service, "dev_id": dev_id or self.dev_id}
+            for dev_id, service in requests
+        ]
+        results = await self.async_request_many(messages)
+        received = time.perf_counter()
+        if self.recorder is not None:
+            self.recorder.record_poll(messages, results)
+        data: dict[str, InverterItem] = {}
+        for request, result in zip(requests, results):
+            dev_id, service = request
+            if isinstance(result, SunGrowRequestError):
+                if request == REQUEST_REAL:
+                    raise result
+                LOGGER.debug("%s does not provide %s for %r", self.host, service, dev_id)
+                continue
+            try:
+                if service == SERVICE_DIRECT:
+                    points = self._parse_direct(result["list"])
+                else:
+                    points = self._parse_real(result["list"])
+            except (KeyError, TypeError) as ex:
+                raise SunGrowProtocolError(f"Unexpected {service} data layout") from ex
+            if dev_id:
+                points = {device_key(dev_id, key): item for key, item in points.items()}
+            data.update(points)
+            if sources is not None:
+                sources.update(dict.fromkeys(points, request))
+        self.timings["request"] = received - start
+        self.timings["parse"] = time.perf_counter() - received
+        return data
+
+    async def async_params(
+        self, writes: dict[int, int], reads: list[int]
+    ) -> ParamRound:
+        """Write and read parameters of the inverter in one pipelined round.
+
+        The round is separate from the data rounds, so a dongle that does not
+        answer parameter requests never holds up a poll.
+        """
+        params = ParamRound(writes, reads)
+        if messages := self._param_messages(params):
+            self._param_results(params, await self.async_request_many(messages))
+        return params
+
+    def _param_messages(self, params: ParamRound) -> list[dict[str, Any]]:
+        """Return the requests of a parameter round, one per parameter.
+
+        A parameter the model does not have only fails its own request.
+        """
+        return [
+            {
+                "service": SERVICE_SET_PARAM,
+                "dev_id": self.dev_id,
+                "list": [{"param_addr": address, "param_value": value}],
+            }
+            for address, value in params.writes.items()
+        ] + [
+            {
+                "service": SERVICE_PARAM,
+                "dev_id": self.dev_id,
+                "list": [{"param_addr": address}],
+            }
+            for address in params.reads
+        ]
+
+    def _param_results(
+        self,
+        params: ParamRound,
+        results: list[dict[str, Any] | SunGrowRequestError],
+    ) -> None:
+        """Fill a parameter round with the results of its requests."""
+        writes = params.writes
+        for address, result in zip(writes, results):
+            if isinstance(result, SunGrowRequestError):
+                params.errors[address] = result
+        for address, result in zip(params.reads, results[len(writes) :]):
+            if isinstance(result, SunGrowRequestError):
+                LOGGER.debug("%s does not provide parameter %s", self.host, address)
+                params.rejected.append(address)
+                continue
+            try:
+                for item in result["list"]:
+                    params.values[int(item["param_addr"])] = int(
+                        float(item["param_value"])
+                    )
+            except (KeyError, TypeError, ValueError) as ex:
+                raise SunGrowProtocolError("Unexpected param data layout") from ex
+
+    def _parse_real(self, items: list[dict[str, Any]]) -> dict[str, InverterItem]:
+        """Parse the list of a real-time or battery reply."""
+        strings = self.strings
+        data: dict[str, InverterItem] = {}
+        for item in items:
+            name = item["data_name"]
+            value = item["data_value"]
+            data[item_id(name)] = InverterItem(
+                name=name,
+                desc=strings.get(name, name),
+                value=strings.get(value, value),
+                unit=item["data_unit"],
+            )
+        return data
+
+    def _parse_direct(self, items: list[dict[str, Any]]) -> dict[str, InverterItem]:
+        """Parse the list of an MPPT reply into voltage and current points."""
+        data: dict[str, InverterItem] = {}
+        for item in items:
+            name = item["name"]
+            label = name
+            if name.startswith("I18N_COMMON_"):
+                # e.g. I18N_COMMON_GROUP_MPPT%@1 with the string "MPPT{0}"
+                if (template := self.strings.get(name[:-3])) is not None:
+                    label = template.format(name[-1])
+            for quantity in ("voltage", "current"):
+                desc = f"{label} {quantity.capitalize()}"
+                data[desc.lower().replace(" ", "_")] = InverterItem(
+                    name=name,
+                    desc=desc,
+                    value=item[quantity],
+                    unit=item[f"{quantity}_unit"],
+                )
+        return data
+
+    async def _async_update_strings(self) -> None:
+        """Load the i18n strings used to translate data names and values."""
+        text: str | None = None
+        try:
+            for locale in dict.fromkeys((self.locale, "en_US")):
+                url = f"http://{self.host}:{self.http_port}/i18n/{locale}.properties"
+                async with asyncio.timeout(self._timeout):
+                    async with self._session.get(url) as response:
+                        if response.status == 200:
+                            text = await response.text()
+                            self.bytes_received += len(text)
+                            break
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as ex:
+            raise SunGrowConnectionError(f"Cannot load strings from {self.host}") from ex
+        if text is None:
+            raise SunGrowProtocolError("Unable to get locale")
+        for line in text.splitlines():
+            parts = line.split("=", 1)
+            if len(parts) == 2:
+                self.strings[parts[0]] = parts[1]
+        LOGGER.debug("Loaded %s strings from %s", len(self.strings), self.host)
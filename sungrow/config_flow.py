@@ -1,9 +1,8 @@
 """Config flow for the SunGrow platform."""
 from __future__ import annotations
 
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from requests.exceptions import ConnectTimeout, HTTPError
 import voluptuous as vol
 
 from homeassistant import config_entries
@@ -12,8 +11,24 @@ from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.util import slugify
 
-from sungrow_websocket import SungrowWebsocket
-from .const import CONF_ADDRESS, DEFAULT_NAME, DOMAIN
+from .const import (
+    CONF_ADDRESS,
+    CONF_CAPTURE,
+    CONF_CONTROL,
+    CONF_INFLUX_BUCKET,
+    CONF_INFLUX_ORG,
+    CONF_INFLUX_TOKEN,
+    CONF_INFLUX_URL,
+    CONF_MQTT_TOPIC,
+    CONF_STALE_GRACE_PERIOD,
+    DEFAULT_NAME,
+    DEFAULT_STALE_GRACE_PERIOD,
+    DOMAIN,
+)
+from .discovery import DiscoveredInverter, async_get_discovery
+
+if TYPE_CHECKING:
+    from homeassistant.components.dhcp import DhcpServiceInfo
 
 
 class SunGrowConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -24,54 +39,77 @@ class SunGrowConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     def __init__(self) -> None:
         """Initialize the config flow."""
         self._errors: dict[str, str] = {}
+        self._name = DEFAULT_NAME
+        self._discovered: dict[str, DiscoveredInverter] = {}
+        self._inverter: DiscoveredInverter | None = None
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> SunGrowOptionsFlow:
+        """Return the options flow."""
+        return SunGrowOptionsFlow(config_entry)
 
     @callback
     def _async_current_ip_address(self) -> set[str]:
-        """Return the site_ids for the domain."""
+        """Return the addresses of the entries without a serial number."""
         return {
             entry.data[CONF_ADDRESS]
             for entry in self._async_current_entries(include_ignore=False)
-            if CONF_ADDRESS in entry.data
+            if CONF_ADDRESS in entry.data and entry.unique_id is None
         }
 
-    def _ip_address_in_configuration_exists(self, ip_address: str) -> bool:
-        """Return True if site_id exists in configuration."""
-        return ip_address in self._async_current_ip_address()
-
-    def _check_ip_address(self, ip_address: str) -> bool:
-        """Check if we can connect to the sunfrow inverter."""
-        try:
-            sg = SungrowWebsocket(ip_address, locale="en_US")
-            data = sg.get_data()
-            if 'commonua' not in data:
-                self._errors[CONF_ADDRESS] = "unexpected_data"
-                return False
-        except:
-            self._errors[CONF_ADDRESS] = "could_not_connect"
-            return False
-        return True
+    def _inverter_in_configuration_exists(self, inverter: DiscoveredInverter) -> bool:
+        """Return True if the inverter is configured already."""
+        return (
+            inverter.serial is not None
+            and inverter.serial in self._async_current_ids(include_ignore=False)
+        ) or inverter.host in self._async_current_ip_address()
+
+    async def _async_create_inverter_entry(
+        self, inverter: DiscoveredInverter
+    ) -> FlowResult:
+        """Create the entry of an inverter, keyed by its serial number.
+
+        An inverter that does not report its serial gets an entry keyed by
+        its address, as entries made before serials were kept.
+        """
+        if inverter.serial is not None:
+            await self.async_set_unique_id(inverter.serial)
+            self._abort_if_unique_id_configured(updates={CONF_ADDRESS: inverter.host})
+        return self.async_create_entry(
+            title=self._name, data={CONF_ADDRESS: inverter.host}
+        )
 
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
-        """Step when user initializes a integration."""
+        """Step when user initializes a integration.
+
+        Leaving the address empty scans the local network for inverters.
+        """
         self._errors = {}
         if user_input is not None:
-            #name = slugify(user_input.get(CONF_NAME, DEFAULT_NAME))
-            name = user_input.get(CONF_NAME, DEFAULT_NAME)
-            if self._ip_address_in_configuration_exists(user_input[CONF_ADDRESS]):
+            self._name = user_input.get(CONF_NAME, DEFAULT_NAME)
+            if not (ip_address := user_input.get(CONF_ADDRESS, "").strip()):
+                return await self.async_step_scan()
+            inverter = await async_get_discovery(self.hass).async_probe(
+                ip_address, manual=True
+            )
+            if inverter is None:
+                self._errors[CONF_ADDRESS] = "could_not_connect"
+            elif self._inverter_in_configuration_exists(inverter):
                 self._errors[CONF_ADDRESS] = "already_configured"
             else:
-                ip_address = user_input[CONF_ADDRESS]
-                can_connect = await self.hass.async_add_executor_job(
-                    self._check_ip_address, ip_address
-                )
-                if can_connect:
-                    return self.async_create_entry(
-                        title=name, data={CONF_ADDRESS: ip_address}
-                    )
+                return await self._async_create_inverter_entry(inverter)
         else:
             user_input = {CONF_NAME: DEFAULT_NAME, CONF_ADDRESS: ""}
+        return self._async_show_user_form(user_input)
+
+    @callback
+    def _async_show_user_form(self, user_input: dict[str, Any]) -> FlowResult:
+        """Show the form asking for a name and, optionally, an address."""
         return self.async_show_form(
             step_id="user",
             data_schema=vol.Schema(
@@ -79,8 +117,128 @@ class SunGrowConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     vol.Required(
                         CONF_NAME, default=user_input.get(CONF_NAME, DEFAULT_NAME)
                     ): str,
-                    vol.Required(CONF_ADDRESS, default=user_input[CONF_ADDRESS]): str,
+                    vol.Optional(
+                        CONF_ADDRESS, default=user_input.get(CONF_ADDRESS, "")
+                    ): str,
                 }
             ),
             errors=self._errors,
         )
+
+    async def async_step_scan(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Probe the DHCP hints and the local subnets for inverters."""
+        discovery = async_get_discovery(self.hass)
+        found = await discovery.async_scan(await discovery.async_candidates(True))
+        self._discovered = {
+            inverter.host: inverter
+            for inverter in found
+            if not self._inverter_in_configuration_exists(inverter)
+        }
+        if not self._discovered:
+            self._errors = {"base": "no_devices_found"}
+            return self._async_show_user_form({CONF_NAME: self._name})
+        return await self.async_step_pick()
+
+    async def async_step_pick(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Let the user pick one of the inverters found."""
+        if user_input is not None:
+            return await self._async_create_inverter_entry(
+                self._discovered[user_input[CONF_ADDRESS]]
+            )
+        return self.async_show_form(
+            step_id="pick",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_ADDRESS): vol.In(
+                        {host: inverter.title for host, inverter in self._discovered.items()}
+                    )
+                }
+            ),
+        )
+
+    async def async_step_dhcp(self, discovery_info: DhcpServiceInfo) -> FlowResult:
+        """Handle an inverter dongle announced by DHCP."""
+        discovery = async_get_discovery(self.hass)
+        discovery.async_add_hint(discovery_info.ip)
+        inverter = await discovery.async_probe(discovery_info.ip)
+        if inverter is None:
+            return self.async_abort(reason="cannot_connect")
+        if inverter.serial is not None:
+            await self.async_set_unique_id(inverter.serial)
+            # A known inverter that got a new lease keeps its entry
+            self._abort_if_unique_id_configured(updates={CONF_ADDRESS: inverter.host})
+        if inverter.host in self._async_current_ip_address():
+            return self.async_abort(reason="already_configured")
+        self._inverter = inverter
+        self.context["title_placeholders"] = {"name": inverter.title}
+        return await self.async_step_confirm()
+
+    async def async_step_confirm(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Confirm the setup of a discovered inverter."""
+        assert self._inverter is not None
+        if user_input is not None:
+            self._name = user_input.get(CONF_NAME, DEFAULT_NAME)
+            return await self._async_create_inverter_entry(self._inverter)
+        return self.async_show_form(
+            step_id="confirm",
+            data_schema=vol.Schema(
+                {vol.Required(CONF_NAME, default=DEFAULT_NAME): str}
+            ),
+            description_placeholders={"name": self._inverter.title},
+        )
+
+
+class SunGrowOptionsFlow(config_entries.OptionsFlow):
+    """Handle the options of an inverter."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize the options flow."""
+        self.config_entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+        options = self.config_entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_STALE_GRACE_PERIOD,
+                        default=options.get(
+                            CONF_STALE_GRACE_PERIOD, DEFAULT_STALE_GRACE_PERIOD
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=86400)),
+                    vol.Optional(
+                        CONF_INFLUX_URL, default=options.get(CONF_INFLUX_URL, "")
+                    ): str,
+                    vol.Optional(
+                        CONF_INFLUX_ORG, default=options.get(CONF_INFLUX_ORG, "")
+                    ): str,
+                    vol.Optional(
+                        CONF_INFLUX_BUCKET, default=options.get(CONF_INFLUX_BUCKET, "")
+                    ): str,
+                    vol.Optional(
+                        CONF_INFLUX_TOKEN, default=options.get(CONF_INFLUX_TOKEN, "")
+                    ): str,
+                    vol.Optional(
+                        CONF_MQTT_TOPIC, default=options.get(CONF_MQTT_TOPIC, "")
+                    ): str,
+                    vol.Optional(
+                        CONF_CAPTURE, default=options.get(CONF_CAPTURE, False)
+                    ): bool,
+                    vol.Optional(
+                        CONF_CONTROL, default=options.get(CONF_CONTROL, False)
+                    ): bool,
+                }
+            ),
+        )
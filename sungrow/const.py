@@ -6,6 +6,8 @@ import logging
 # it also need to be the same as the folder name, otherwise the strings.json will not be found
 # it has also to be the same as the folder name of brand (to be able to fetch the logo)
 DOMAIN = "sungrow"
+DATA_FLEET = f"{DOMAIN}_fleet"
+DATA_DISCOVERY = f"{DOMAIN}_discovery"
 
 LOGGER = logging.getLogger(__package__)
 
@@ -13,5 +15,105 @@ LOGGER = logging.getLogger(__package__)
 CONF_ADDRESS = "ip_address"
 DEFAULT_NAME = "SunGrow Inverter"
 
+# How long (seconds) the last good values stay available while polls fail
+CONF_STALE_GRACE_PERIOD = "stale_grace_period"
+DEFAULT_STALE_GRACE_PERIOD = 600
+
 INVERTER_UPDATE_DELAY = timedelta(seconds=15)
 
+# Adaptive polling: fast while the AC power is ramping, slower once it is
+# stable, and backed off to the standby delay when the inverter is idle or the
+# sun is down. The standby delay is the floor that bounds how late a wake-up
+# is noticed.
+INVERTER_UPDATE_DELAY_FAST = timedelta(seconds=10)
+INVERTER_UPDATE_DELAY_STABLE = timedelta(seconds=30)
+INVERTER_UPDATE_DELAY_STANDBY = timedelta(seconds=120)
+RAMP_THRESHOLD_KW = 0.1
+STABLE_POLLS = 4
+STANDBY_RUNNING_STATES = ("standby", "stop", "shutdown", "sleep")
+
+# Last known point schema and values, persisted per config entry, and the
+# point schemas shared by the inverters of one process
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.{{entry_id}}"
+CACHE_SAVE_DELAY = 300
+SCHEMA_CACHE_SIZE = 16
+
+INVERTER_WEBSOCKET_PORT = 8082
+INVERTER_REQUEST_TIMEOUT = 10
+
+# Energy integrated from the power samples: samples further apart (seconds)
+# are not integrated, and the result is kept within one step (kWh) of the
+# inverter's energy counters
+ENERGY_MAX_GAP = 300
+ENERGY_COUNTER_RESOLUTION = 0.1
+
+# Optional export of every poll to InfluxDB (v2 write API) and MQTT
+CONF_INFLUX_URL = "influx_url"
+CONF_INFLUX_ORG = "influx_org"
+CONF_INFLUX_BUCKET = "influx_bucket"
+CONF_INFLUX_TOKEN = "influx_token"
+CONF_MQTT_TOPIC = "mqtt_topic"
+
+# Export queue: records kept while the target is unreachable, records per
+# batch, and the seconds between batches and between retries of a batch
+EXPORT_QUEUE_SIZE = 1000
+EXPORT_BATCH_SIZE = 100
+EXPORT_FLUSH_INTERVAL = 5
+EXPORT_RETRY_DELAY = 30
+
+# Opt-in capture of the raw traffic of an inverter: records per batch, the
+# seconds between batches and the size (bytes) at which recording stops
+CONF_CAPTURE = "capture"
+CAPTURE_BATCH_SIZE = 500
+CAPTURE_FLUSH_INTERVAL = 60
+CAPTURE_MAX_BYTES = 100 * 1024 * 1024
+
+# Opt-in control of the power limits: the parameter requests of the WiNet
+# dongle have not been checked on every firmware
+CONF_CONTROL = "control"
+
+# Parameter writes: seconds between two writes to one inverter, and the
+# seconds after a write at which the poll reading it back runs
+COMMAND_MIN_INTERVAL = 10
+COMMAND_CONFIRM_DELAY = 5
+
+# Circuit breaker: consecutive failed polls before polling stops, backoff
+# (seconds) before the next probe and the +/- fraction it is spread by
+CIRCUIT_BREAKER_THRESHOLD = 2
+RECONNECT_BACKOFF_MIN = 15
+RECONNECT_BACKOFF_MAX = 300
+RECONNECT_BACKOFF_JITTER = 0.2
+
+# Fallback to the sungrow_websocket library: consecutive replies the native
+# client does not understand before falling back, and the seconds after which
+# the native client is tried again
+FALLBACK_PROTOCOL_ERRORS = 3
+FALLBACK_RETRY_INTERVAL = 1800
+
+# Limits shared by the polls of all inverters on one host
+FLEET_MAX_CONCURRENT_POLLS = 4
+FLEET_MAX_CONCURRENT_POLLS_PER_SUBNET = 2
+FLEET_MAX_STAGGER = 1.0
+
+# LAN discovery: handshake timeout and probes in flight (seconds, count), and
+# how long an answer, or the lack of one, is remembered (seconds)
+DISCOVERY_TIMEOUT = 2
+DISCOVERY_MAX_CONCURRENT = 32
+DISCOVERY_CACHE_TTL = 600
+DISCOVERY_MISS_TTL = 60
+
+# Anomaly detection: smoothing of the rolling statistics (per poll) and of
+# the long-term insulation baseline, the DC power (kW) below which the
+# efficiency is not derived, the running state text that reports derating and
+# the thresholds of the problems (relative drop of the insulation, impedance
+# in kΩ, temperature in °C and share of the best string)
+ANOMALY_EWMA_ALPHA = 0.1
+ANOMALY_BASELINE_ALPHA = 0.0005
+ANOMALY_MIN_DC_POWER = 0.5
+DERATING_RUNNING_STATE = "derat"
+INSULATION_DRIFT = 0.3
+INSULATION_MIN_IMPEDANCE = 100
+OVERHEAT_TEMPERATURE = 70
+STRING_UNDERPERFORMANCE = 0.7
+EVENT_ANOMALY = f"{DOMAIN}_anomaly"
@@ -0,0 +1,255 @@
+"""Writable parameters of a SunGrow inverter and the queue of their writes."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import time
+from typing import Any
+
+from homeassistant.components.number import (
+    NumberDeviceClass,
+    NumberEntityDescription,
+    NumberMode,
+)
+from homeassistant.components.select import SelectEntityDescription
+from homeassistant.const import PERCENTAGE, EntityCategory, UnitOfPower
+
+from .const import COMMAND_MIN_INTERVAL
+
+# Raw values of the switches of the limits
+LIMIT_ENABLED = 0xAA
+LIMIT_DISABLED = 0x55
+
+
+@dataclass(frozen=True)
+class SunGrowParameterRequiredKeyMixin:
+    """Entity description with the address of a SunGrow parameter."""
+    param_addr: int
+
+
+@dataclass(frozen=True)
+class SunGrowNumberEntityDescription(
+    NumberEntityDescription, SunGrowParameterRequiredKeyMixin
+):
+    """Number entity description for SunGrow; a raw value is scale units."""
+
+    scale: float = 1.0
+
+    def to_raw(self, value: float) -> int:
+        """Return the raw value of a setpoint."""
+        assert self.native_min_value is not None and self.native_max_value is not None
+        if not self.native_min_value <= float(value) <= self.native_max_value:
+            raise ValueError(
+                f"{self.key} must be between {self.native_min_value} "
+                f"and {self.native_max_value}"
+            )
+        return round(float(value) / self.scale)
+
+    def from_raw(self, raw: int) -> float:
+        """Return the value of a raw value."""
+        return round(raw * self.scale, 3)
+
+
+@dataclass(frozen=True)
+class SunGrowSelectEntityDescription(
+    SelectEntityDescription, SunGrowParameterRequiredKeyMixin
+):
+    """Select entity description for SunGrow; raw_values maps the options."""
+
+    raw_values: tuple[tuple[str, int], ...] = ()
+
+    def to_raw(self, option: str) -> int:
+        """Return the raw value of an option."""
+        for name, raw in self.raw_values:
+            if name == option:
+                return raw
+        raise ValueError(f"{self.key} must be one of {', '.join(self.options or ())}")
+
+    def from_raw(self, raw: int) -> str | None:
+        """Return the option of a raw value, None if it is not one."""
+        for name, value in self.raw_values:
+            if value == raw:
+                return name
+        return None
+
+
+_SWITCH = (("enabled", LIMIT_ENABLED), ("disabled", LIMIT_DISABLED))
+
+NUMBER_TYPES = [
+    SunGrowNumberEntityDescription(
+        key="power_limitation_setting",
+        param_addr=5008,
+        translation_key="power_limitation_setting",
+        icon="mdi:solar-power-variant-outline",
+        entity_category=EntityCategory.CONFIG,
+        native_unit_of_measurement=PERCENTAGE,
+        native_min_value=0,
+        native_max_value=110,
+        native_step=0.1,
+        mode=NumberMode.BOX,
+        scale=0.1,
+    ),
+    SunGrowNumberEntityDescription(
+        key="export_power_limitation_value",
+        param_addr=13074,
+        translation_key="export_power_limitation_value",
+        icon="mdi:transmission-tower-export",
+        entity_category=EntityCategory.CONFIG,
+        device_class=NumberDeviceClass.POWER,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        native_min_value=0,
+        native_max_value=30000,
+        native_step=10,
+        mode=NumberMode.BOX,
+    ),
+]
+
+SELECT_TYPES = [
+    SunGrowSelectEntityDescription(
+        key="power_limitation",
+        param_addr=5007,
+        translation_key="power_limitation",
+        icon="mdi:solar-power-variant-outline",
+        entity_category=EntityCategory.CONFIG,
+        options=[name for name, _ in _SWITCH],
+        raw_values=_SWITCH,
+    ),
+    SunGrowSelectEntityDescription(
+        key="export_power_limitation",
+        param_addr=13087,
+        translation_key="export_power_limitation",
+        icon="mdi:transmission-tower-export",
+        entity_category=EntityCategory.CONFIG,
+        options=[name for name, _ in _SWITCH],
+        raw_values=_SWITCH,
+    ),
+]
+
+PARAMETER_INDEX: dict[
+    str, SunGrowNumberEntityDescription | SunGrowSelectEntityDescription
+] = {description.key: description for description in [*NUMBER_TYPES, *SELECT_TYPES]}
+
+PARAMETER_KEYS: dict[int, str] = {
+    description.param_addr: key for key, description in PARAMETER_INDEX.items()
+}
+
+
+class CommandQueue:
+    """Parameter writes waiting for one inverter, and the values read back."""
+
+    def __init__(
+        self,
+        addresses: tuple[int, ...] = tuple(PARAMETER_KEYS),
+        min_interval: float = COMMAND_MIN_INTERVAL,
+    ) -> None:
+        """Initialize the queue."""
+        self.addresses = addresses
+        self.min_interval = min_interval
+        self.queued: dict[int, int] = {}
+        self.unconfirmed: dict[int, int] = {}
+        self.values: dict[int, int] = {}
+        self.errors: dict[int, str] = {}
+        # Why the parameters are no longer exchanged, None while they are
+        self.disabled: str | None = None
+        self.next_write = 0.0
+        self.requested = 0
+        self.coalesced = 0
+        self.written = 0
+        self.confirmed = 0
+        self.failed = 0
+
+    def set(self, address: int, value: int) -> None:
+        """Queue a setpoint, replacing the one queued for the same parameter."""
+        self.requested += 1
+        if address in self.queued:
+            self.coalesced += 1
+        self.queued[address] = value
+        self.errors.pop(address, None)
+
+    def pending(self, address: int) -> int | None:
+        """Return the value queued or written but not yet confirmed."""
+        return self.queued.get(address, self.unconfirmed.get(address))
+
+    @property
+    def retry_in(self) -> float:
+        """Return the seconds until the next write is allowed."""
+        return max(self.next_write - time.monotonic(), 0.0)
+
+    def take(self, read_all: bool = False) -> tuple[dict[int, int], list[int]]:
+        """Return the writes due now and the parameters to read.
+
+        The parameters read are those written by an earlier round, or all of
+        them with read_all, as after a new session.
+        """
+        reads = list(self.addresses if read_all else self.unconfirmed)
+        writes: dict[int, int] = {}
+        now = time.monotonic()
+        if self.queued and now >= self.next_write:
+            writes, self.queued = self.queued, {}
+            self.next_write = now + self.min_interval
+        return writes, reads
+
+    def done(
+        self,
+        writes: dict[int, int],
+        errors: dict[int, Exception],
+        values: dict[int, int],
+    ) -> set[int]:
+        """Record the outcome of a round; return the parameters that changed.
+
+        errors holds the writes the inverter rejected.
+        """
+        changed: set[int] = set()
+        for address, value in values.items():
+            if self.values.get(address) != value:
+                self.values[address] = value
+                changed.add(address)
+            if address in writes:
+                continue
+            if (expected := self.unconfirmed.pop(address, None)) is None:
+                continue
+            changed.add(address)
+            if value == expected:
+                self.confirmed += 1
+            else:
+                self.failed += 1
+                self.errors[address] = (
+                    f"Inverter reports {value} after writing {expected}"
+                )
+        changed.update(writes)
+        for address, value in writes.items():
+            if (error := errors.get(address)) is not None:
+                self.failed += 1
+                self.errors[address] = str(error)
+            else:
+                self.written += 1
+                self.unconfirmed[address] = value
+        return changed
+
+    def disable(self, reason: str, writes: dict[int, int]) -> set[int]:
+        """Stop the exchange of parameters; return the parameters that changed.
+
+        writes holds the writes of the round that failed; they fail with the
+        ones still queued or waiting to be confirmed.
+        """
+        self.disabled = reason
+        failed = {**self.unconfirmed, **writes, **self.queued}
+        self.failed += len(failed)
+        self.errors.update(dict.fromkeys(failed, reason))
+        self.queued = {}
+        self.unconfirmed = {}
+        return set(self.addresses)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters and the state of the queue for diagnostics."""
+        return {
+            "requested": self.requested,
+            "coalesced": self.coalesced,
+            "written": self.written,
+            "confirmed": self.confirmed,
+            "failed": self.failed,
+            "queued": self.queued,
+            "unconfirmed": self.unconfirmed,
+            "values": self.values,
+            "errors": self.errors,
+            "disabled": self.disabled,
+        }
@@ -2,20 +2,341 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+import asyncio
+from collections.abc import Callable
 from datetime import date, datetime, timedelta
+from functools import partial
+import logging
+import time
 from typing import Any
 
+import aiohttp
 from stringcase import snakecase
+import websockets.exceptions
 
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.components.sensor import SensorStateClass
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util, slugify
 
 from sungrow_websocket import SungrowWebsocket, InverterItem
 
+from .anomaly import AnomalyDetector
+from .breaker import CircuitBreaker
+from .client import (
+    REQUEST_REAL,
+    ParamRound,
+    Request,
+    SunGrowCircuitOpenError,
+    SunGrowClient,
+    SunGrowConnectionError,
+    SunGrowError,
+    SunGrowProtocolError,
+)
 from .const import (
+    DOMAIN,
     LOGGER,
-    INVERTER_UPDATE_DELAY
+    CACHE_SAVE_DELAY,
+    CIRCUIT_BREAKER_THRESHOLD,
+    COMMAND_CONFIRM_DELAY,
+    DEFAULT_STALE_GRACE_PERIOD,
+    ENERGY_COUNTER_RESOLUTION,
+    ENERGY_MAX_GAP,
+    EVENT_ANOMALY,
+    FALLBACK_PROTOCOL_ERRORS,
+    FALLBACK_RETRY_INTERVAL,
+    INVERTER_UPDATE_DELAY,
+    INVERTER_UPDATE_DELAY_FAST,
+    INVERTER_UPDATE_DELAY_STABLE,
+    INVERTER_UPDATE_DELAY_STANDBY,
+    RAMP_THRESHOLD_KW,
+    RECONNECT_BACKOFF_MIN,
+    RECONNECT_BACKOFF_MAX,
+    RECONNECT_BACKOFF_JITTER,
+    STABLE_POLLS,
+    STANDBY_RUNNING_STATES,
+)
+from .control import PARAMETER_INDEX, PARAMETER_KEYS, CommandQueue
+from .energy import EnergyMeters
+from .fleet import async_get_fleet
+from .points import (
+    SENSOR_INDEX,
+    Converter,
+    PointSchema,
+    SunGrowSensorEntityDescription,
+    compile_converter,
+    discover_schema,
 )
+from .stats import PollDiagnostics
+from .timeseries import TimeSeries
+
+SENSOR_KEYS = tuple(SENSOR_INDEX)
+
+Point = tuple[str, Converter, float | None, float | None]
+
+
+def _points(
+    descriptions: list[SunGrowSensorEntityDescription],
+    converters: dict[str, Converter] | None = None,
+) -> tuple[Point, ...]:
+    """Return the (json_key, converter, deadband_abs, deadband_rel) of each description."""
+    converters = converters or {}
+    return tuple(
+        (
+            description.json_key,
+            converters.get(description.json_key) or compile_converter(description),
+            description.deadband_abs,
+            description.deadband_rel,
+        )
+        for description in descriptions
+    )
+
+
+# Points extracted until the entities have told which points they need
+_POINTS = _points(list(SENSOR_INDEX.values()))
+
+
+def _within_deadband(
+    old: Any, new: Any, deadband_abs: float | None, deadband_rel: float | None
+) -> bool:
+    """Return True if a numeric change is too small to be published."""
+    try:
+        old_value = float(old)
+        delta = abs(float(new) - old_value)
+    except (TypeError, ValueError):
+        return False
+    if deadband_abs is not None and delta <= deadband_abs:
+        return True
+    return deadband_rel is not None and delta <= deadband_rel * abs(old_value)
+
+
+def extract_points(
+    response: dict[str, InverterItem],
+    data: dict[str, Any],
+    changed: set[str],
+    points: tuple[Point, ...] = _POINTS,
+) -> set[str]:
+    """Copy the changed values of the given points from a response into data.
+
+    data holds the last published values, converted by the point's
+    converter. A point is only updated, and its key added to changed, when
+    its value differs from the published one by more than the point's
+    deadband.
+    """
+    for key, convert, deadband_abs, deadband_rel in points:
+        item = response.get(key)
+        if item is None:
+            if data.pop(key, None) is not None:
+                changed.add(key)
+            continue
+        value = convert(item.value)
+        old = data.get(key)
+        if value == old:
+            continue
+        if (
+            old is not None
+            and (deadband_abs is not None or deadband_rel is not None)
+            and _within_deadband(old, value, deadband_abs, deadband_rel)
+        ):
+            continue
+        data[key] = value
+        changed.add(key)
+    return changed
+
+
+class SunGrowConnection:
+    """Long-lived session to one inverter, with a circuit breaker and a fallback."""
+
+    def __init__(
+        self, hass: HomeAssistant, ip_address: str, locale: str = "en_US"
+    ) -> None:
+        """Initialize the connection."""
+        self.hass = hass
+        self.ip_address = ip_address
+        self.client = SunGrowClient(
+            async_get_clientsession(hass), ip_address, locale=locale
+        )
+        self._fallback: SungrowWebsocket | None = None
+        self._fallback_until = 0.0
+        self.protocol_errors = 0
+        self.breaker = CircuitBreaker(
+            CIRCUIT_BREAKER_THRESHOLD,
+            RECONNECT_BACKOFF_MIN,
+            RECONNECT_BACKOFF_MAX,
+            RECONNECT_BACKOFF_JITTER,
+        )
+        self.polls = 0
+        self.connects = 0
+        self.disconnects = 0
+        self.failures = 0
+        self.last_poll_latency: float | None = None
+
+    @property
+    def connected(self) -> bool:
+        """Return True if the session is open."""
+        return self.client.connected
+
+    @property
+    def fallback(self) -> bool:
+        """Return True while the blocking library polls the inverter."""
+        return self._fallback is not None
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """Return poll latency and connection churn counters."""
+        return {
+            "connected": self.connected,
+            "fallback": self.fallback,
+            "protocol_errors": self.protocol_errors,
+            "polls": self.polls,
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            "failures": self.failures,
+            "last_poll_latency": self.last_poll_latency,
+            "breaker": self.breaker.as_dict(),
+        }
+
+    async def async_get_data(
+        self,
+        requests: tuple[Request, ...] | None = None,
+        sources: dict[str, Request] | None = None,
+    ) -> dict[str, InverterItem]:
+        """Fetch data in one round, reusing the session when possible.
+
+        requests and sources are passed on to SunGrowClient.async_get_data;
+        None reads everything.
+        """
+        self.check_circuit()
+        start = time.perf_counter()
+        self.client.timings.clear()
+        if self._fallback is not None and time.monotonic() >= self._fallback_until:
+            LOGGER.info("Trying the native client of %s again", self.ip_address)
+            self._fallback = None
+        try:
+            if self._fallback is None:
+                try:
+                    data = await self._async_get_data_native(requests, sources)
+                    self.protocol_errors = 0
+                except SunGrowProtocolError as ex:
+                    await self.async_close()
+                    self.protocol_errors += 1
+                    if self.protocol_errors < FALLBACK_PROTOCOL_ERRORS:
+                        raise
+                    LOGGER.warning(
+                        "Inverter %s keeps replying unexpectedly (%s), "
+                        "falling back to sungrow_websocket",
+                        self.ip_address,
+                        ex,
+                    )
+                    self._fallback = SungrowWebsocket(
+                        self.ip_address, locale=self.client.locale
+                    )
+                    self._fallback_until = time.monotonic() + FALLBACK_RETRY_INTERVAL
+            if self._fallback is not None:
+                data = await self._async_get_data_fallback()
+                if self.client.recorder is not None:
+                    self.client.recorder.record_items(data)
+        except SunGrowError as ex:
+            if self.client.recorder is not None:
+                self.client.recorder.record_error(ex)
+            self.failures += 1
+            self.breaker.record_failure()
+            await self.async_close()
+            raise
+        self.breaker.record_success()
+        self.polls += 1
+        self.last_poll_latency = time.perf_counter() - start
+        return data
+
+    def check_circuit(self) -> None:
+        """Fail at once while the circuit breaker holds polls off."""
+        if not self.breaker.allow():
+            raise SunGrowCircuitOpenError(
+                f"Inverter keeps failing, next attempt in {self.breaker.retry_in:.0f}s"
+            )
+
+    async def async_close(self) -> None:
+        """Close the session."""
+        if self.client.connected:
+            self.disconnects += 1
+        await self.client.async_close()
+
+    async def _async_get_data_native(
+        self,
+        requests: tuple[Request, ...] | None,
+        sources: dict[str, Request] | None,
+    ) -> dict[str, InverterItem]:
+        """Fetch data, re-authenticating once if a reused session went stale."""
+        if self.client.connected:
+            try:
+                return await self.client.async_get_data(requests, sources)
+            except SunGrowConnectionError:
+                LOGGER.debug("Session to %s went stale, reconnecting", self.ip_address)
+                await self.async_close()
+        await self.client.async_connect()
+        self.connects += 1
+        return await self.client.async_get_data(requests, sources)
+
+    async def async_params(
+        self, writes: dict[int, int], reads: list[int]
+    ) -> ParamRound:
+        """Exchange parameters in a round of their own, on the open session.
+
+        A failure closes the session, so a late reply cannot be taken for
+        one of the next poll; it does not count against the breaker.
+        """
+        if self._fallback is not None or not self.client.connected:
+            raise SunGrowConnectionError("No native session to exchange parameters on")
+        try:
+            return await self.client.async_params(writes, reads)
+        except SunGrowError:
+            await self.async_close()
+            raise
+
+    async def _async_get_data_fallback(self) -> dict[str, InverterItem]:
+        """Fetch all data with the blocking library in the executor."""
+        assert self._fallback is not None
+        start = time.perf_counter()
+        try:
+            data = await self.hass.async_add_executor_job(self._fallback.get_data)
+        except (
+            OSError,
+            asyncio.TimeoutError,
+            aiohttp.ClientError,
+            websockets.exceptions.WebSocketException,
+        ) as ex:
+            raise SunGrowConnectionError(str(ex) or type(ex).__name__) from ex
+        except (KeyError, IndexError, TypeError, ValueError) as ex:
+            raise SunGrowProtocolError("Unexpected reply from inverter") from ex
+        self.client.timings["request"] = time.perf_counter() - start
+        self.connects += 1
+        self.disconnects += 1
+        if not data:
+            raise SunGrowConnectionError("Inverter rejected the request")
+        return data
+
+
+class SunGrowUpdateCoordinator(DataUpdateCoordinator[None]):
+    """Coordinator that times the dispatch of each update to its entities."""
+
+    def __init__(
+        self, hass: HomeAssistant, diagnostics: PollDiagnostics, **kwargs: Any
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(hass, LOGGER, **kwargs)
+        self._diagnostics = diagnostics
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all registered listeners."""
+        start = time.perf_counter()
+        super().async_update_listeners()
+        self._diagnostics.record("dispatch", time.perf_counter() - start)
 
 
 class SunGrowDataService(ABC):
@@ -23,101 +344,642 @@ class SunGrowDataService(ABC):
 
     coordinator: DataUpdateCoordinator[None]
 
-    def __init__(self, hass: HomeAssistant, ip_address: str ) -> None:
-        """Initialize the data object."""
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        ip_address: str,
+        store: Store | None = None,
+        stale_grace_period: float = DEFAULT_STALE_GRACE_PERIOD,
+        serial: str | None = None,
+        control: bool = False,
+    ) -> None:
+        """Initialize the data object.
+
+        Entities, devices and statistics are keyed by the serial of the
+        inverter, so they survive a change of its address; by the address
+        only for an entry whose serial is not known yet. control enables
+        the exchange of parameters, off by default.
+        """
         self.ip_address = ip_address
+        self.unique_id = serial or ip_address
+        self.stale_grace_period = stale_grace_period
+        # False leaves the polls to the caller, as a replay does
+        self.scheduled = True
+        # Recorded time of the poll a replay feeds, None on the live clocks
+        self.replay_time: float | None = None
+        self.last_success: float | None = None
+        # False until the first poll finished, the values are the cached ones
+        self.refreshed = False
+        # Attributes of the entities while their values are stale
+        self.stale_attributes: dict[str, Any] = {"stale": True, "last_updated": None}
         self.data: dict[str, Any] = {}
-        self.attributes: dict[str, Any] = {}
+        self.changed: set[str] = set()
+        # Published values laid out by slot; entities look up their slot once
+        self.snapshot: tuple[Any, ...] = ()
+        self.slot_keys: tuple[str, ...] = ()
+        self._slots: dict[str, int] = {}
+        self.published_updates = 0
+        self.suppressed_updates = 0
         self.hass = hass
+        self.schema: PointSchema | None = None
+        self._schema_model = ""
+        self._schema_response: dict[str, InverterItem] = {}
+        self._schema_session = -1
+        self.store = store
+        self._next_save = 0.0
+        self._schema_listeners: list[Callable[[], None]] = []
+        self._enabled: dict[str, SunGrowSensorEntityDescription] = {}
+        self._points = _POINTS
+        self._series: tuple[tuple[str, Converter], ...] = ()
+        self.timeseries = TimeSeries()
+        self.energy = EnergyMeters(ENERGY_MAX_GAP, ENERGY_COUNTER_RESOLUTION)
+        self.anomalies = AnomalyDetector()
+        self.anomalies.set_points({key: convert for key, convert, _, _ in _POINTS})
+        self.control = control
+        self.commands = CommandQueue()
+        # One round at a time on the session, whoever requested the poll
+        self._poll_lock = asyncio.Lock()
+        self._command_unsub: CALLBACK_TYPE | None = None
+        self._requests: tuple[Request, ...] = (REQUEST_REAL,)
+        self.devices: list[dict[str, Any]] = []
+        self._running_state = ""
+        self._last_power: float | None = None
+        self._ramping = False
+        self._stable_polls = 0
+        self.connection = SunGrowConnection(hass, ip_address)
+        self.fleet = async_get_fleet(hass)
+        self.diagnostics = PollDiagnostics()
 
     @callback
     def async_setup(self) -> None:
         """Coordinator creation."""
-        self.coordinator = DataUpdateCoordinator(
+        self.coordinator = SunGrowUpdateCoordinator(
             self.hass,
-            LOGGER,
+            self.diagnostics,
             name=str(self),
             update_method=self.async_update_data,
             update_interval=self.update_interval,
         )
+        self.fleet.async_register(self.unique_id, self.ip_address)
 
     @property
     def update_interval(self) -> timedelta:
-        """Update interval."""
+        """Update interval, adapted to what the inverter is doing."""
+        if not self.data:
+            return INVERTER_UPDATE_DELAY
+        if self._in_standby():
+            return INVERTER_UPDATE_DELAY_STANDBY
+        if self._ramping:
+            return INVERTER_UPDATE_DELAY_FAST
+        if self._stable_polls >= STABLE_POLLS:
+            return INVERTER_UPDATE_DELAY_STABLE
         return INVERTER_UPDATE_DELAY
 
-    def update(self) -> None:
-        """Update the data from the SunGrow inverter."""
+    def _in_standby(self) -> bool:
+        """Return True if the inverter is idle or the sun is down."""
+        running_state = self._running_state.lower()
+        if any(state in running_state for state in STANDBY_RUNNING_STATES):
+            return True
+        if self._last_power:
+            return False
+        sun = self.hass.states.get("sun.sun")
+        return sun is not None and sun.state == "below_horizon"
+
+    def _track_power(self, dataFromSunGrow: dict[str, InverterItem]) -> None:
+        """Follow the raw state and AC power to tell ramps from stable output."""
+        if (state := dataFromSunGrow.get("running_state")) is not None:
+            self._running_state = str(state.value)
+        item = dataFromSunGrow.get("total_active_power")
         try:
-            #now = datetime.now()
-            sg = SungrowWebsocket(self.ip_address, locale="en_US")
-            dataFromSunGrow = sg.get_data()
-            LOGGER.info(dataFromSunGrow)
-        except KeyError as ex:
-            raise UpdateFailed("Missing inverter data, skipping update") from ex
-        self.data = {}
-        self.attributes = {}
+            power = float(item.value) if item is not None else None
+        except (TypeError, ValueError):
+            power = None
+        if power is None or self._last_power is None:
+            self._ramping = False
+            self._stable_polls = 0
+        elif abs(power - self._last_power) > RAMP_THRESHOLD_KW:
+            self._ramping = True
+            self._stable_polls = 0
+        else:
+            self._ramping = False
+            self._stable_polls += 1
+        self._last_power = power
+
+    def _record_samples(
+        self, timestamp: float, dataFromSunGrow: dict[str, InverterItem]
+    ) -> None:
+        """Add the numeric values of the enabled points to the time series."""
+        values = []
+        for key, convert in self._series:
+            item = dataFromSunGrow.get(key)
+            if item is None:
+                continue
+            if isinstance(value := convert(item.value), float):
+                values.append((key, value))
+        if closed := self.timeseries.add(timestamp, values):
+            self._async_publish_statistics(closed)
+
+    @callback
+    def _async_publish_statistics(
+        self, closed: list[tuple[str, tuple[float, ...]]]
+    ) -> None:
+        """Import the hourly buckets of the time series as statistics.
+
+        A point whose statistic is refused is skipped; it never fails the poll.
+        """
+        if "recorder" not in self.hass.config.components:
+            return
+        # The recorder is optional, only import it once it is known to be loaded
+        from homeassistant.components.recorder.models import (  # pylint: disable=import-outside-toplevel
+            StatisticData,
+            StatisticMetaData,
+        )
+        from homeassistant.components.recorder.statistics import (  # pylint: disable=import-outside-toplevel
+            async_add_external_statistics,
+            valid_statistic_id,
+        )
+
+        descriptions = self.schema.descriptions if self.schema is not None else SENSOR_INDEX
+        for key, (start, minimum, maximum, mean) in closed:
+            # Keys of discovered points may hold characters a statistic id cannot
+            statistic_id = f"{DOMAIN}:{slugify(f'{self.unique_id}_{key}')}"
+            if not valid_statistic_id(statistic_id):
+                LOGGER.debug("No statistics for %s, invalid id %s", key, statistic_id)
+                continue
+            description = descriptions.get(key)
+            metadata = StatisticMetaData(
+                has_mean=True,
+                has_sum=False,
+                name=f"{self.unique_id} {key}",
+                source=DOMAIN,
+                statistic_id=statistic_id,
+                unit_of_measurement=description.native_unit_of_measurement
+                if description is not None
+                else None,
+            )
+            try:
+                async_add_external_statistics(
+                    self.hass,
+                    metadata,
+                    [
+                        StatisticData(
+                            start=dt_util.utc_from_timestamp(start),
+                            mean=mean,
+                            min=minimum,
+                            max=maximum,
+                        )
+                    ],
+                )
+            except HomeAssistantError as ex:
+                LOGGER.debug("Statistics of %s not imported: %s", key, ex)
+
+    def update(
+        self, dataFromSunGrow: dict[str, InverterItem], timestamp: float | None = None
+    ) -> None:
+        """Update the data from a SunGrow inverter response received at timestamp.
+
+        timestamp is the wall-clock time of a replayed response, None for a
+        live one.
+        """
+        changed = self.changed
+        changed.clear()
+        start = time.perf_counter()
         try:
-            if "commonua" in dataFromSunGrow:
-                item: InverterItem = dataFromSunGrow["commonua"]
-                self.data["commonua"] = item.value
-            if "total_yield" in dataFromSunGrow:
-                item: InverterItem = dataFromSunGrow["total_yield"]
-                self.data["total_yield"] = item.value
-            if "running_state" in dataFromSunGrow:
-                item: InverterItem = dataFromSunGrow["running_state"]
-                self.data["running_state"] = item.value
-            if "total_active_power" in dataFromSunGrow:
-                item: InverterItem = dataFromSunGrow["total_active_power"]
-                self.data["total_active_power"] = item.value
-            if "air_tem_inside_machine" in dataFromSunGrow:
-                item: InverterItem = dataFromSunGrow["air_tem_inside_machine"]
-                self.data["air_tem_inside_machine"] = item.value
-            if "total_grid_running_time" in dataFromSunGrow:
-                item: InverterItem = dataFromSunGrow["total_grid_running_time"]
-                self.data["total_grid_running_time"] = item.value
-            if "daily_power_yield" in dataFromSunGrow:
-                item: InverterItem = dataFromSunGrow["daily_power_yield"]
-                self.data["daily_power_yield"] = item.value
-            if "bus_voltage" in dataFromSunGrow:
-                item: InverterItem = dataFromSunGrow["bus_voltage"]
-                self.data["bus_voltage"] = item.value
-            if "square_array_insulation_impedance" in dataFromSunGrow:
-                item: InverterItem = dataFromSunGrow["square_array_insulation_impedance"]
-                self.data["square_array_insulation_impedance"] = item.value
-            if "total_dcpower" in dataFromSunGrow:
-                item: InverterItem = dataFromSunGrow["total_dcpower"]
-                self.data["total_dcpower"] = item.value
-            if "total_reactive_power" in dataFromSunGrow:
-                item: InverterItem = dataFromSunGrow["total_reactive_power"]
-                self.data["total_reactive_power"] = item.value
-            if "total_apparent_power" in dataFromSunGrow:
-                item: InverterItem = dataFromSunGrow["total_apparent_power"]
-                self.data["total_apparent_power"] = item.value
-            if "total_power_factor" in dataFromSunGrow:
-                item: InverterItem = dataFromSunGrow["total_power_factor"]
-                self.data["total_power_factor"] = item.value
-            if "grid_frequency" in dataFromSunGrow:
-                item: InverterItem = dataFromSunGrow["grid_frequency"]
-                self.data["grid_frequency"] = item.value
-            if "fragment_run_type1" in dataFromSunGrow:
-                item: InverterItem = dataFromSunGrow["fragment_run_type1"]
-                self.data["fragment_run_type1"] = item.value
-            if "measuring_point_afd" in dataFromSunGrow:
-                item: InverterItem = dataFromSunGrow["measuring_point_afd"]
-                self.data["measuring_point_afd"] = item.value
-            if "maximum_apparent_power_siwhfgqy" in dataFromSunGrow:
-                item: InverterItem = dataFromSunGrow["maximum_apparent_power_siwhfgqy"]
-                self.data["maximum_apparent_power_siwhfgqy"] = item.value
+            extract_points(dataFromSunGrow, self.data, changed, self._points)
         except Exception as ex:
+            self.diagnostics.record_failure("extract")
             raise UpdateFailed("Not able to extract data, skipping update") from ex
-        LOGGER.debug("Updated SunGrow inverter details: %s, %s", self.data, self.attributes)
+        self.diagnostics.record("extract", time.perf_counter() - start)
+        self.published_updates += len(changed)
+        self.suppressed_updates += len(self._points) - len(changed)
+        now = time.monotonic() if timestamp is None else timestamp
+        self.energy.add(now, dataFromSunGrow, changed)
+        for problem in self.anomalies.add(now, dataFromSunGrow):
+            changed.add(problem)
+            self._async_fire_anomaly(problem)
+        if changed:
+            self._publish()
+        self._track_power(dataFromSunGrow)
+        self._record_samples(
+            time.time() if timestamp is None else timestamp, dataFromSunGrow
+        )
+        if self.scheduled:
+            self.coordinator.update_interval = self.update_interval
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug("Updated SunGrow inverter details: %s", self.data)
+            LOGGER.debug(
+                "SunGrow stats for %s: %s, published %s, suppressed %s, latency %s",
+                self.ip_address,
+                self.connection.stats,
+                self.published_updates,
+                self.suppressed_updates,
+                self.fleet.stats().get(self.unique_id),
+            )
+
+    @callback
+    def _async_fire_anomaly(self, problem: str) -> None:
+        """Fire an event when a problem is raised or cleared."""
+        active = self.anomalies.active[problem]
+        if active:
+            LOGGER.info("Inverter %s reports %s", self.ip_address, problem)
+        self.hass.bus.async_fire(
+            EVENT_ANOMALY,
+            {
+                "ip_address": self.ip_address,
+                "problem": problem,
+                "active": active,
+                **self.anomalies.details(problem),
+            },
+        )
+
+    def slot(self, key: str) -> int:
+        """Return the slot of a point or energy meter in the snapshot."""
+        if (slot := self._slots.get(key)) is None:
+            slot = self._slots[key] = len(self._slots)
+            self.slot_keys = (*self.slot_keys, key)
+            self._publish()
+        return slot
+
+    def _publish(self) -> None:
+        """Replace the snapshot with the current values."""
+        data = self.data
+        energy = self.energy.values
+        self.snapshot = tuple(data.get(key, energy.get(key)) for key in self._slots)
+
+    @property
+    def stale(self) -> bool:
+        """Return True if the values are left over from an earlier poll.
+
+        The values restored at startup are stale until the first poll; the
+        coordinator reports success before it ever polled.
+        """
+        return not (self.refreshed and self.coordinator.last_update_success)
+
+    @property
+    def available(self) -> bool:
+        """Return True while the values are fresh or within the grace period."""
+        return (self.refreshed and self.coordinator.last_update_success) or (
+            self.last_success is not None
+            and (self.replay_time or time.time()) - self.last_success
+            <= self.stale_grace_period
+        )
+
+    def _set_last_success(self, timestamp: float | None) -> None:
+        """Remember when the values were last fresh."""
+        self.last_success = timestamp
+        self.stale_attributes = {
+            "stale": True,
+            "last_updated": dt_util.utc_from_timestamp(timestamp)
+            if timestamp is not None
+            else None,
+        }
+
+    @property
+    def descriptions(self) -> list[SunGrowSensorEntityDescription]:
+        """Return the descriptions of the points this inverter reports."""
+        if self.schema is None:
+            return list(SENSOR_INDEX.values())
+        return list(self.schema.descriptions.values())
+
+    def device_info(self, key: str) -> DeviceInfo:
+        """Return the device a point belongs to."""
+        dev_id = ""
+        if self.schema is not None:
+            dev_id = self.schema.sources.get(key, REQUEST_REAL)[0]
+        if not dev_id:
+            return DeviceInfo(
+                identifiers={(DOMAIN, self.unique_id)}, manufacturer="SunGrow"
+            )
+        device = next(
+            (device for device in self.devices if str(device.get("dev_id")) == dev_id),
+            {},
+        )
+        return DeviceInfo(
+            identifiers={(DOMAIN, f"{self.unique_id}_{dev_id}")},
+            manufacturer="SunGrow",
+            model=device.get("dev_model"),
+            name=device.get("dev_name"),
+            serial_number=device.get("dev_sn"),
+            via_device=(DOMAIN, self.unique_id),
+        )
+
+    @callback
+    def async_add_schema_listener(self, listener: Callable[[], None]) -> CALLBACK_TYPE:
+        """Call listener whenever a new point schema is discovered."""
+        self._schema_listeners.append(listener)
+        return lambda: self._schema_listeners.remove(listener)
+
+    @callback
+    def async_enable_point(
+        self, description: SunGrowSensorEntityDescription
+    ) -> CALLBACK_TYPE:
+        """Start extracting a point for an enabled entity."""
+        self._enabled[description.json_key] = description
+        self._async_update_points()
+
+        @callback
+        def _async_disable() -> None:
+            self._enabled.pop(description.json_key, None)
+            self._async_update_points()
+
+        return _async_disable
+
+    @callback
+    def _async_update_points(self) -> None:
+        """Extract and request only what the enabled entities need."""
+        descriptions = list(self._enabled.values()) or list(SENSOR_INDEX.values())
+        self._points = _points(
+            descriptions, self.schema.converters if self.schema is not None else None
+        )
+        self._series = tuple(
+            (key, convert)
+            for (key, convert, _, _), description in zip(self._points, descriptions)
+            if description.state_class == SensorStateClass.MEASUREMENT
+        )
+        self.timeseries.retain(tuple(key for key, _ in self._series))
+        sources = self.schema.sources if self.schema is not None else {}
+        requests = {REQUEST_REAL}
+        requests.update(sources.get(key, REQUEST_REAL) for key in self._enabled)
+        self._requests = tuple(sorted(requests))
+
+    @callback
+    def _async_discover(
+        self, response: dict[str, InverterItem], sources: dict[str, Request]
+    ) -> None:
+        """Derive the point schema from a full reply."""
+        self._schema_session = self.connection.connects
+        model = ""
+        if self.connection.client.devices:
+            self.devices = self.connection.client.devices
+            model = str(self.devices[0].get("dev_model", ""))
+        if self._async_set_schema(model or "unknown", response, sources):
+            self._async_schedule_save(force=True)
+            for listener in list(self._schema_listeners):
+                listener()
+
+    @callback
+    def _async_set_schema(
+        self, model: str, response: dict[str, InverterItem], sources: dict[str, Request]
+    ) -> bool:
+        """Use the schema of a full reply; return True if it is a new one."""
+        known = self._schema_response
+        if (
+            self.schema is not None
+            and model == self._schema_model
+            and all(
+                (item := known.get(key)) is not None and item.unit == point.unit
+                for key, point in response.items()
+            )
+        ):
+            # A reply missing some points, as at night, keeps the schema
+            return False
+        schema = discover_schema(model, response, sources)
+        if self.schema is schema:
+            return False
+        LOGGER.debug(
+            "Inverter %s reports %s points (schema %s)",
+            self.ip_address,
+            len(schema.descriptions),
+            schema.key,
+        )
+        self.schema = schema
+        self.anomalies.set_points(schema.converters)
+        self._schema_model = model
+        self._schema_response = response
+        self._async_update_points()
+        return True
+
+    async def async_restore(self) -> None:
+        """Load the point schema and last values saved by a previous run."""
+        if self.store is None or (cache := await self.store.async_load()) is None:
+            return
+        try:
+            response = {
+                key: InverterItem(*item) for key, item in cache["points"].items()
+            }
+            sources = {
+                key: ("", source) if isinstance(source, str) else tuple(source)
+                for key, source in cache["sources"].items()
+            }
+            self.devices = list(cache.get("devices", []))
+            self._async_set_schema(cache["model"], response, sources)
+            self.data.update(cache["data"])
+            self._set_last_success(cache.get("last_success"))
+            self.energy.restore(cache.get("energy", {}))
+            self._publish()
+        except (KeyError, TypeError, ValueError) as ex:
+            LOGGER.warning("Ignoring the cached schema of %s: %r", self.ip_address, ex)
+
+    @callback
+    def _async_schedule_save(self, force: bool = False) -> None:
+        """Save the schema and values, at most once per CACHE_SAVE_DELAY."""
+        if self.store is None or self.schema is None:
+            return
+        now = time.monotonic()
+        if not force and now < self._next_save:
+            return
+        self._next_save = now + CACHE_SAVE_DELAY
+        self.store.async_delay_save(self._cache_data, 0 if force else CACHE_SAVE_DELAY)
+
+    @callback
+    def _cache_data(self) -> dict[str, Any]:
+        """Return what async_restore needs to rebuild the entities."""
+        assert self.schema is not None
+        return {
+            "model": self._schema_model,
+            "points": {key: list(item) for key, item in self._schema_response.items()},
+            "sources": self.schema.sources,
+            "devices": self.devices,
+            "data": dict(self.data),
+            "energy": dict(self.energy.values),
+            "last_success": self.last_success,
+        }
+
+    @property
+    def bytes_received(self) -> int:
+        """Return the number of bytes received from the inverter."""
+        return self.connection.client.bytes_received
 
     async def async_update_data(self) -> None:
         """Update data."""
-        await self.hass.async_add_executor_job(self.update)
+        try:
+            await self._async_update_data()
+        finally:
+            # From now on last_update_success tells whether the values are fresh
+            self.refreshed = True
 
+    async def _async_update_data(self) -> None:
+        """Poll the inverter and extract the values of its reply."""
+        diagnostics = self.diagnostics
+        start = time.perf_counter()
+        discover = self._schema_session != self.connection.connects
+        sources: dict[str, Request] = {}
+        try:
+            # Do not wait for a fleet slot only to fail
+            self.connection.check_circuit()
+            dataFromSunGrow, parameters = await self.fleet.async_poll(
+                self.unique_id,
+                partial(
+                    self._async_poll,
+                    None if discover else self._requests,
+                    sources if discover else None,
+                ),
+            )
+        except SunGrowError as ex:
+            self.changed.clear()
+            if not isinstance(ex, SunGrowCircuitOpenError):
+                diagnostics.record_failure(type(ex).__name__)
+            raise UpdateFailed(f"Error communicating with inverter: {ex}") from ex
+        diagnostics.record("poll", time.perf_counter() - start)
+        for phase, seconds in self.connection.client.timings.items():
+            diagnostics.record(phase, seconds)
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug("Raw response from %s: %s", self.ip_address, dataFromSunGrow)
+        if discover:
+            self._async_discover(dataFromSunGrow, sources)
+        timestamp = self.replay_time
+        self.update(dataFromSunGrow, timestamp)
+        self.changed.update(
+            PARAMETER_KEYS[address]
+            for address in parameters
+            if address in PARAMETER_KEYS
+        )
+        self._set_last_success(time.time() if timestamp is None else timestamp)
+        self._async_schedule_save()
+        self._async_schedule_commands()
 
+    async def _async_poll(
+        self,
+        requests: tuple[Request, ...] | None,
+        sources: dict[str, Request] | None,
+    ) -> tuple[dict[str, InverterItem], set[int]]:
+        """Read the data, then exchange the parameters in a round of their own.
 
+        Return the data and the parameters whose value, write or support
+        changed. A new session (sources given) reads every parameter.
+        """
+        async with self._poll_lock:
+            data = await self.connection.async_get_data(requests, sources)
+            if not self.control:
+                return data, set()
+            return data, await self._async_exchange_parameters(sources is not None)
+
+    async def _async_exchange_parameters(self, read_all: bool) -> set[int]:
+        """Write the due setpoints and read the parameters back in their own round."""
+        commands = self.commands
+        if commands.disabled is not None or self.connection.fallback:
+            return set()
+        writes, reads = commands.take(read_all)
+        if not writes and not reads:
+            return set()
+        try:
+            params = await self.connection.async_params(writes, reads)
+        except SunGrowError as ex:
+            return self._async_disable_commands(str(ex), writes)
+        if reads and len(params.rejected) == len(reads):
+            return self._async_disable_commands(
+                "Inverter rejects parameter reads", writes
+            )
+        failed = commands.failed
+        changed = commands.done(writes, params.errors, params.values)
+        if commands.failed > failed:
+            for address in changed & commands.errors.keys():
+                LOGGER.warning(
+                    "Inverter %s did not apply %s: %s",
+                    self.ip_address,
+                    PARAMETER_KEYS.get(address, address),
+                    commands.errors[address],
+                )
+        return changed
+
+    @callback
+    def _async_disable_commands(self, reason: str, writes: dict[int, int]) -> set[int]:
+        """Stop exchanging parameters; return the parameters that changed."""
+        LOGGER.warning(
+            "Parameters of inverter %s cannot be exchanged (%s), "
+            "its power limits are unavailable until the entry is reloaded",
+            self.ip_address,
+            reason,
+        )
+        return self.commands.disable(reason, writes)
+
+    async def async_set_parameter(self, key: str, value: Any) -> None:
+        """Queue the write of a parameter; it runs in a poll once due.
+
+        Raise ServiceValidationError if the value is not valid for the
+        parameter, HomeAssistantError if the parameters of the inverter
+        cannot be written.
+        """
+        if not self.control:
+            raise HomeAssistantError("Power limit control is off in the options")
+        if (reason := self.commands.disabled) is not None:
+            raise HomeAssistantError(
+                f"Parameters of {self.ip_address} cannot be written: {reason}"
+            )
+        description = PARAMETER_INDEX[key]
+        try:
+            raw = description.to_raw(value)
+        except ValueError as ex:
+            raise ServiceValidationError(str(ex)) from ex
+        self.commands.set(description.param_addr, raw)
+        self._async_schedule_commands()
+
+    @callback
+    def _async_schedule_commands(self) -> None:
+        """Poll when a queued write is due or a written value can be read back."""
+        if self._command_unsub is not None:
+            self._command_unsub()
+            self._command_unsub = None
+        commands = self.commands
+        if not self.scheduled:
+            return
+        if commands.queued:
+            delay = commands.retry_in
+        elif commands.unconfirmed:
+            delay = COMMAND_CONFIRM_DELAY
+        else:
+            return
+        self._command_unsub = async_call_later(
+            self.hass, delay, self._async_command_poll
+        )
+
+    @callback
+    def _async_command_poll(self, _now: datetime) -> None:
+        """Request a poll for the parameters, debounced with the other requests."""
+        self._command_unsub = None
+        self.hass.async_create_task(self.coordinator.async_request_refresh())
 
+    def as_diagnostics(self) -> dict[str, Any]:
+        """Return the state of the polling pipeline for diagnostics."""
+        return {
+            "update_interval": self.coordinator.update_interval.total_seconds()
+            if self.coordinator.update_interval
+            else None,
+            "connection": self.connection.stats,
+            "last_success": self.last_success,
+            "stale": self.stale,
+            "fleet_latency": self.fleet.stats().get(self.unique_id),
+            "timings": self.diagnostics.as_dict(),
+            "published_updates": self.published_updates,
+            "suppressed_updates": self.suppressed_updates,
+            "bytes_received": self.bytes_received,
+            "schema": self.schema.key if self.schema is not None else None,
+            "enabled_points": list(self._enabled),
+            "requests": list(self._requests),
+            "devices": self.devices,
+            "data": self.data,
+            "energy": self.energy.values,
+            "anomalies": self.anomalies.as_dict(),
+            "control": self.control,
+            "commands": self.commands.as_dict(),
+        }
 
+    async def async_shutdown(self) -> None:
+        """Leave the fleet, save the cache and close the inverter session."""
+        self.fleet.async_unregister(self.unique_id)
+        if self._command_unsub is not None:
+            self._command_unsub()
+            self._command_unsub = None
+        if self.store is not None and self.schema is not None:
+            await self.store.async_save(self._cache_data())
+        await self.connection.async_close()
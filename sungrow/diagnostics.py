@@ -0,0 +1,31 @@
+"""Diagnostics support for SunGrow."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_ADDRESS, CONF_INFLUX_TOKEN, DOMAIN
+
+# dev_sn and the entry unique_id are the serial number of an inverter
+TO_REDACT = {CONF_ADDRESS, CONF_INFLUX_TOKEN, "dev_sn", "unique_id"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "services": [
+            async_redact_data(service.as_diagnostics(), TO_REDACT)
+            for service in entry_data.get("services", [])
+        ],
+        "exporters": {
+            exporter.name: exporter.stats()
+            for exporter in entry_data.get("exporters", [])
+        },
+    }
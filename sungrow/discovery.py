@@ -0,0 +1,135 @@
+"""Discovery of SunGrow inverters on the local network."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterable
+from dataclasses import dataclass
+import ipaddress
+import time
+
+from homeassistant.components import network
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .client import SunGrowClient, SunGrowError
+from .const import (
+    DATA_DISCOVERY,
+    DISCOVERY_CACHE_TTL,
+    DISCOVERY_MAX_CONCURRENT,
+    DISCOVERY_MISS_TTL,
+    DISCOVERY_TIMEOUT,
+    INVERTER_REQUEST_TIMEOUT,
+    LOGGER,
+)
+
+
+@dataclass(frozen=True)
+class DiscoveredInverter:
+    """An inverter that answered the WebSocket handshake."""
+
+    host: str
+    serial: str | None
+    model: str
+
+    @property
+    def title(self) -> str:
+        """Return a label for the inverter."""
+        name = " ".join(filter(None, (self.model or "SunGrow", self.serial)))
+        return f"{name} ({self.host})"
+
+
+class SunGrowDiscovery:
+    """Probe hosts for SunGrow inverters and remember the answers.
+
+    A probe only opens the WebSocket and logs in, which is enough to read
+    the serial number from the device list. Hosts are probed concurrently,
+    up to DISCOVERY_MAX_CONCURRENT at a time, and every answer, including
+    no answer, is cached so a repeated flow returns at once.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the discovery."""
+        self.hass = hass
+        self.hints: set[str] = set()
+        self._results: dict[str, tuple[float, DiscoveredInverter | None]] = {}
+        self._semaphore = asyncio.Semaphore(DISCOVERY_MAX_CONCURRENT)
+
+    @callback
+    def async_add_hint(self, host: str) -> None:
+        """Remember a host announced by DHCP."""
+        self.hints.add(host)
+
+    async def async_probe(
+        self, host: str, manual: bool = False
+    ) -> DiscoveredInverter | None:
+        """Return the inverter answering on a host, if any.
+
+        A host the user typed in is probed even after a recent miss, with the
+        timeout of a poll rather than the short one of a scan.
+        """
+        if (
+            (cached := self._results.get(host)) is not None
+            and cached[0] > time.monotonic()
+            and (cached[1] is not None or not manual)
+        ):
+            return cached[1]
+        if manual:
+            inverter = await self._async_handshake(host, INVERTER_REQUEST_TIMEOUT)
+        else:
+            async with self._semaphore:
+                inverter = await self._async_handshake(host, DISCOVERY_TIMEOUT)
+        ttl = DISCOVERY_CACHE_TTL if inverter is not None else DISCOVERY_MISS_TTL
+        self._results[host] = (time.monotonic() + ttl, inverter)
+        return inverter
+
+    async def _async_handshake(
+        self, host: str, timeout: float
+    ) -> DiscoveredInverter | None:
+        """Log in on a host and read the first device of its device list."""
+        client = SunGrowClient(async_get_clientsession(self.hass), host, timeout=timeout)
+        try:
+            await client.async_connect(load_strings=False)
+        except SunGrowError as ex:
+            LOGGER.debug("No SunGrow inverter on %s: %s", host, ex)
+            return None
+        finally:
+            await client.async_close()
+        device = client.devices[0]
+        return DiscoveredInverter(
+            host=host,
+            serial=str(serial) if (serial := device.get("dev_sn")) else None,
+            model=str(device.get("dev_model", "")),
+        )
+
+    async def async_scan(self, hosts: Iterable[str]) -> list[DiscoveredInverter]:
+        """Probe hosts concurrently and return the inverters found."""
+        results = await asyncio.gather(*(self.async_probe(host) for host in hosts))
+        return [inverter for inverter in results if inverter is not None]
+
+    async def async_candidates(self, scan_subnets: bool) -> list[str]:
+        """Return the DHCP hints, followed by the local /24 subnets if asked."""
+        hosts = dict.fromkeys(sorted(self.hints))
+        if scan_subnets:
+            for adapter in await network.async_get_adapters(self.hass):
+                if not adapter["enabled"]:
+                    continue
+                for address in adapter["ipv4"]:
+                    own = ipaddress.ip_address(address["address"])
+                    if own.is_loopback:
+                        continue
+                    # Never sweep more than the /24 around this host
+                    subnet = ipaddress.ip_network(
+                        f"{own}/{max(address['network_prefix'], 24)}", strict=False
+                    )
+                    hosts.update(
+                        dict.fromkeys(str(host) for host in subnet.hosts() if host != own)
+                    )
+        return list(hosts)
+
+
+@callback
+def async_get_discovery(hass: HomeAssistant) -> SunGrowDiscovery:
+    """Return the discovery shared by all config flows."""
+    if (discovery := hass.data.get(DATA_DISCOVERY)) is None:
+        discovery = hass.data[DATA_DISCOVERY] = SunGrowDiscovery(hass)
+    return discovery
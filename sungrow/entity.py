@@ -0,0 +1,107 @@
+"""Base entities of a SunGrow inverter."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import callback
+from homeassistant.helpers.entity import EntityDescription
+from homeassistant.helpers.update_coordinator import (
+    CoordinatorEntity,
+    DataUpdateCoordinator,
+)
+
+from .control import SunGrowNumberEntityDescription, SunGrowSelectEntityDescription
+from .coordinator import SunGrowDataService
+
+
+class SunGrowEntity(CoordinatorEntity[DataUpdateCoordinator[None]]):
+    """Entity updated by the data service of a SunGrow inverter.
+
+    The state is only written when the value keyed changed_key changed in a
+    poll, or when the availability or staleness of the values changed. The
+    entity belongs to the device of the point keyed device_key.
+    """
+
+    _attr_has_entity_name = True
+
+    def __init__(
+        self,
+        description: EntityDescription,
+        data_service: SunGrowDataService,
+        changed_key: str | None = None,
+        device_key: str = "",
+    ) -> None:
+        """Initialize the entity."""
+        super().__init__(data_service.coordinator)
+        self.entity_description = description
+        self.data_service = data_service
+        self._changed_key = changed_key or description.key
+        self._published: tuple[bool, bool] | None = None
+        self._attr_unique_id = f"{data_service.unique_id}_{description.key}"
+        self._attr_device_info = data_service.device_info(device_key)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only if the value, availability or staleness changed."""
+        published = (self.available, self.data_service.stale)
+        if self._changed_key in self.data_service.changed or (
+            published != self._published
+        ):
+            self._published = published
+            self.async_write_ha_state()
+
+    @property
+    def available(self) -> bool:
+        """Return True while the last good value is recent enough."""
+        return self.data_service.available
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return when the value was last updated, while polls fail."""
+        return self.data_service.stale_attributes if self.data_service.stale else None
+
+
+class SunGrowParameterEntity(SunGrowEntity):
+    """Parameter of a SunGrow inverter, written through its command queue.
+
+    The state is the value the inverter last reported; a setpoint waiting
+    to be written or confirmed shows in the pending attribute.
+    """
+
+    entity_description: SunGrowNumberEntityDescription | SunGrowSelectEntityDescription
+
+    @property
+    def raw_value(self) -> int | None:
+        """Return the raw value the inverter last reported."""
+        return self.data_service.commands.values.get(self.entity_description.param_addr)
+
+    @property
+    def available(self) -> bool:
+        """Return True once the inverter reported the parameter.
+
+        The parameter is unavailable once the inverter stopped answering
+        parameter requests.
+        """
+        return (
+            self.data_service.available
+            and self.data_service.commands.disabled is None
+            and self.raw_value is not None
+        )
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the setpoint waiting to be applied and the last error."""
+        commands = self.data_service.commands
+        address = self.entity_description.param_addr
+        pending = commands.pending(address)
+        return {
+            "pending": self.entity_description.from_raw(pending)
+            if pending is not None
+            else None,
+            "error": commands.errors.get(address),
+        }
+
+    async def _async_set(self, value: Any) -> None:
+        """Queue a setpoint and show it as pending."""
+        await self.data_service.async_set_parameter(self.entity_description.key, value)
+        self.async_write_ha_state()
@@ -0,0 +1,367 @@
+"""Export of the inverter values to InfluxDB and MQTT.
+
+Each successful poll is serialized once into a single record: a line of
+Influx line protocol or an MQTT JSON payload holding every value of the
+snapshot. Records wait in a bounded queue and are sent in batches by a
+background task, over Home Assistant's pooled HTTP session or its MQTT
+client. When the queue is full, for instance while the database is down,
+the oldest records are dropped so memory stays bounded and the freshest
+values are the ones kept.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Awaitable, Callable
+from http import HTTPStatus
+import json
+import time
+from typing import TYPE_CHECKING, Any
+
+import aiohttp
+
+from homeassistant.components import mqtt
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .const import (
+    CONF_INFLUX_BUCKET,
+    CONF_INFLUX_ORG,
+    CONF_INFLUX_TOKEN,
+    CONF_INFLUX_URL,
+    CONF_MQTT_TOPIC,
+    DOMAIN,
+    EXPORT_BATCH_SIZE,
+    EXPORT_FLUSH_INTERVAL,
+    EXPORT_QUEUE_SIZE,
+    EXPORT_RETRY_DELAY,
+    INVERTER_REQUEST_TIMEOUT,
+    LOGGER,
+)
+from .points import SENSOR_INDEX, is_numeric
+
+if TYPE_CHECKING:
+    from .coordinator import SunGrowDataService
+
+
+class SunGrowExportError(HomeAssistantError):
+    """Raised when a batch cannot be delivered."""
+
+
+class SunGrowExportRejectedError(SunGrowExportError):
+    """Raised when the target refuses a batch; sending it again cannot help."""
+
+
+def _escape(text: str, special: str) -> str:
+    """Backslash-escape the special characters of a line protocol token."""
+    for char in special:
+        text = text.replace(char, f"\\{char}")
+    return text
+
+
+class LineProtocolSerializer:
+    """Serialize the snapshot of a data service into one line protocol line."""
+
+    def __init__(self, service: SunGrowDataService, measurement: str = DOMAIN) -> None:
+        """Initialize the serializer."""
+        self._service = service
+        self._prefix = (
+            f"{_escape(measurement, ', ')},host={_escape(service.ip_address, ',= ')} "
+        )
+        self._fields: tuple[str, ...] = ()
+        self._numeric: tuple[bool, ...] = ()
+
+    def __call__(self) -> str | None:
+        """Return the line of the current snapshot, None if it holds no value."""
+        service = self._service
+        keys = service.slot_keys
+        if len(self._fields) != len(keys):
+            # Slots are only ever appended, describe the new ones
+            new = keys[len(self._fields) :]
+            descriptions = (
+                service.schema.descriptions if service.schema is not None else SENSOR_INDEX
+            )
+            self._fields = (*self._fields, *(_escape(key, ",= ") for key in new))
+            # A field keeps one type in InfluxDB: only textual points are strings
+            self._numeric = (
+                *self._numeric,
+                *(
+                    (description := descriptions.get(key)) is None
+                    or is_numeric(description)
+                    for key in new
+                ),
+            )
+        fields = []
+        for name, numeric, value in zip(self._fields, self._numeric, service.snapshot):
+            if value is None:
+                continue
+            if not numeric:
+                text = _escape(str(value), '\\"')
+                fields.append(f'{name}="{text}"')
+            elif isinstance(value, (int, float)):
+                fields.append(f"{name}={float(value)!r}")
+        if not fields:
+            return None
+        return f"{self._prefix}{','.join(fields)} {time.time_ns()}"
+
+
+class JsonSerializer:
+    """Serialize the snapshot of a data service into one JSON payload."""
+
+    def __init__(self, service: SunGrowDataService) -> None:
+        """Initialize the serializer."""
+        self._service = service
+
+    def __call__(self) -> str | None:
+        """Return the payload of the current snapshot, None if it holds no value."""
+        service = self._service
+        values = {
+            key: value
+            for key, value in zip(service.slot_keys, service.snapshot)
+            if value is not None
+        }
+        if not values:
+            return None
+        return json.dumps(
+            {"host": service.ip_address, "timestamp": time.time(), "values": values},
+            separators=(",", ":"),
+        )
+
+
+class InfluxSink:
+    """Write batches of lines to the v2 write API of InfluxDB."""
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        org: str,
+        bucket: str,
+        token: str,
+    ) -> None:
+        """Initialize the sink."""
+        self._session = session
+        self._url = f"{url.rstrip('/')}/api/v2/write"
+        self._params = {"org": org, "bucket": bucket, "precision": "ns"}
+        self._headers = {
+            "Authorization": f"Token {token}",
+            "Content-Type": "text/plain; charset=utf-8",
+        }
+
+    async def async_send(self, records: list[str]) -> None:
+        """Send one batch in a single request."""
+        try:
+            async with asyncio.timeout(INVERTER_REQUEST_TIMEOUT):
+                async with self._session.post(
+                    self._url,
+                    params=self._params,
+                    headers=self._headers,
+                    data="\n".join(records).encode(),
+                ) as response:
+                    if response.status >= 300:
+                        # A client error other than 429 would be rejected again
+                        error = (
+                            SunGrowExportRejectedError
+                            if 400 <= response.status < 500
+                            and response.status != HTTPStatus.TOO_MANY_REQUESTS
+                            else SunGrowExportError
+                        )
+                        raise error(
+                            f"InfluxDB rejected the batch: {response.status} "
+                            f"{await response.text()}"
+                        )
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as ex:
+            raise SunGrowExportError(f"Cannot reach InfluxDB: {ex!r}") from ex
+
+
+class MqttSink:
+    """Publish each record as one message through the MQTT integration."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        topic: str,
+        publish: Callable[[HomeAssistant, str, str], Awaitable[None]] = mqtt.async_publish,
+    ) -> None:
+        """Initialize the sink."""
+        self._hass = hass
+        self._topic = topic
+        self._publish = publish
+
+    async def async_send(self, records: list[str]) -> None:
+        """Publish the records of one batch."""
+        for record in records:
+            await self._publish(self._hass, self._topic, record)
+
+
+class SunGrowExporter:
+    """Queue serialized records and send them in batches.
+
+    The queue holds at most queue_size records; once it is full every new
+    record drops the oldest one. A batch leaves when batch_size records are
+    waiting or flush_interval seconds after the previous one. A batch that
+    fails is put back at the head of the queue and retried after
+    retry_delay seconds, unless the target rejected it: it is dropped and
+    counted, as it would be rejected again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        send: Callable[[list[str]], Awaitable[None]],
+        *,
+        queue_size: int = EXPORT_QUEUE_SIZE,
+        batch_size: int = EXPORT_BATCH_SIZE,
+        flush_interval: float = EXPORT_FLUSH_INTERVAL,
+        retry_delay: float = EXPORT_RETRY_DELAY,
+    ) -> None:
+        """Initialize the exporter."""
+        self.name = name
+        self._send = send
+        self._queue: deque[str] = deque(maxlen=queue_size)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._retry_delay = retry_delay
+        self._wakeup = asyncio.Event()
+        # async_stop may flush while the background task is sending
+        self._sending = asyncio.Lock()
+        self._stopping = False
+        self.queued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.failures = 0
+        self.last_error: str | None = None
+
+    @callback
+    def async_enqueue(self, record: str) -> None:
+        """Queue a record, dropping the oldest one if the queue is full."""
+        queue = self._queue
+        if len(queue) == queue.maxlen:
+            self.dropped += 1
+        queue.append(record)
+        self.queued += 1
+        if len(queue) >= self._batch_size:
+            self._wakeup.set()
+
+    async def async_run(self) -> None:
+        """Send batches until stopped."""
+        while not self._stopping:
+            try:
+                async with asyncio.timeout(self._flush_interval):
+                    await self._wakeup.wait()
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._queue and not await self._async_send_batch():
+                if self._stopping:
+                    return
+                await asyncio.sleep(self._retry_delay)
+
+    async def _async_send_batch(self) -> bool:
+        """Send the oldest batch, after any batch in flight.
+
+        Return False if it has to be retried.
+        """
+        async with self._sending:
+            return await self._async_send_next()
+
+    async def _async_send_next(self) -> bool:
+        """Send the oldest batch; return False if it has to be retried."""
+        queue = self._queue
+        if not queue:
+            return True
+        batch = [queue.popleft() for _ in range(min(self._batch_size, len(queue)))]
+        try:
+            await self._send(batch)
+        except SunGrowExportRejectedError as ex:
+            self.failures += 1
+            self.rejected += len(batch)
+            self.last_error = str(ex)
+            LOGGER.warning(
+                "Export to %s dropped %s records: %s", self.name, len(batch), ex
+            )
+            return True
+        except HomeAssistantError as ex:
+            self.failures += 1
+            self.last_error = str(ex)
+            LOGGER.debug("Export to %s failed: %s", self.name, ex)
+            # Newer records may have filled the queue meanwhile, keep those
+            assert queue.maxlen is not None
+            keep = max(min(queue.maxlen - len(queue), len(batch)), 0)
+            self.dropped += len(batch) - keep
+            queue.extendleft(reversed(batch[len(batch) - keep :]))
+            return False
+        self.sent += len(batch)
+        return True
+
+    async def async_stop(self) -> None:
+        """Stop the background task and try to send what is left once."""
+        self._stopping = True
+        self._wakeup.set()
+        while self._queue:
+            if not await self._async_send_batch():
+                break
+
+    def stats(self) -> dict[str, Any]:
+        """Return the counters of the exporter."""
+        return {
+            "pending": len(self._queue),
+            "queued": self.queued,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+@callback
+def async_setup_export(
+    hass: HomeAssistant, entry: ConfigEntry, services: list[SunGrowDataService]
+) -> list[SunGrowExporter]:
+    """Start the exporters configured in the options of an entry.
+
+    The exporters listen to the coordinators, so the data services must be
+    set up first.
+    """
+    options = entry.options
+    exporters: list[tuple[SunGrowExporter, Callable[[SunGrowDataService], Any]]] = []
+    if options.get(CONF_INFLUX_URL):
+        sink = InfluxSink(
+            async_get_clientsession(hass),
+            options[CONF_INFLUX_URL],
+            options.get(CONF_INFLUX_ORG, ""),
+            options.get(CONF_INFLUX_BUCKET, ""),
+            options.get(CONF_INFLUX_TOKEN, ""),
+        )
+        exporters.append(
+            (SunGrowExporter("influxdb", sink.async_send), LineProtocolSerializer)
+        )
+    if options.get(CONF_MQTT_TOPIC):
+        sink = MqttSink(hass, options[CONF_MQTT_TOPIC])
+        exporters.append((SunGrowExporter("mqtt", sink.async_send), JsonSerializer))
+
+    for exporter, serializer_class in exporters:
+        for service in services:
+            serialize = serializer_class(service)
+
+            @callback
+            def _async_export(
+                service: SunGrowDataService = service,
+                serialize: Callable[[], str | None] = serialize,
+                exporter: SunGrowExporter = exporter,
+            ) -> None:
+                """Queue the snapshot of a successful poll."""
+                if service.coordinator.last_update_success and service.changed:
+                    if (record := serialize()) is not None:
+                        exporter.async_enqueue(record)
+
+            entry.async_on_unload(service.coordinator.async_add_listener(_async_export))
+        entry.async_create_background_task(
+            hass, exporter.async_run(), f"{DOMAIN} export {exporter.name}"
+        )
+        entry.async_on_unload(exporter.async_stop)
+    return [exporter for exporter, _ in exporters]
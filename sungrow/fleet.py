@@ -0,0 +1,102 @@
+"""Shared scheduling of the polls of all SunGrow inverters on one host."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import ipaddress
+import time
+from typing import Any, TypeVar
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import (
+    DATA_FLEET,
+    FLEET_MAX_CONCURRENT_POLLS,
+    FLEET_MAX_CONCURRENT_POLLS_PER_SUBNET,
+    FLEET_MAX_STAGGER,
+    INVERTER_UPDATE_DELAY_FAST,
+    LOGGER,
+)
+from .stats import RollingWindow
+
+_T = TypeVar("_T")
+
+
+def _subnet(ip_address: str) -> str:
+    """Return the /24 subnet of an address, or the host name itself."""
+    try:
+        return str(ipaddress.ip_network(f"{ip_address}/24", strict=False))
+    except ValueError:
+        return ip_address
+
+
+class SunGrowFleet:
+    """Own the polls of every SunGrow inverter configured on this host.
+
+    Poll starts are spaced out so inverters that share a timer tick do not
+    fire together, and the number of polls in flight is capped globally and
+    per /24 subnet so a shared WiFi dongle is not overloaded.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the fleet."""
+        # Subnet of each inverter, keyed by the unique id of its data service
+        self._members: dict[str, str] = {}
+        self._global = asyncio.Semaphore(FLEET_MAX_CONCURRENT_POLLS)
+        self._subnets: dict[str, asyncio.Semaphore] = {}
+        self._next_start = 0.0
+        self.latencies: dict[str, RollingWindow] = {}
+
+    @callback
+    def async_register(self, key: str, ip_address: str) -> None:
+        """Add an inverter to the fleet, keyed by key."""
+        subnet = self._members[key] = _subnet(ip_address)
+        self.latencies.setdefault(key, RollingWindow())
+        if subnet not in self._subnets:
+            self._subnets[subnet] = asyncio.Semaphore(
+                FLEET_MAX_CONCURRENT_POLLS_PER_SUBNET
+            )
+
+    @callback
+    def async_unregister(self, key: str) -> None:
+        """Remove an inverter from the fleet."""
+        self._members.pop(key, None)
+        self.latencies.pop(key, None)
+
+    @property
+    def stagger(self) -> float:
+        """Return the minimum spacing in seconds between two poll starts."""
+        members = max(len(self._members), 1)
+        return min(INVERTER_UPDATE_DELAY_FAST.total_seconds() / members, FLEET_MAX_STAGGER)
+
+    async def async_poll(
+        self, key: str, poll: Callable[[], Awaitable[_T]]
+    ) -> _T:
+        """Run one poll of an inverter within the fleet limits."""
+        # Resolved first, the inverter may be unregistered while its start waits
+        subnet = self._subnets[self._members[key]]
+        now = time.monotonic()
+        start_at = max(now, self._next_start)
+        self._next_start = start_at + self.stagger
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+        async with subnet, self._global:
+            start = time.perf_counter()
+            try:
+                return await poll()
+            finally:
+                if (window := self.latencies.get(key)) is not None:
+                    window.add(time.perf_counter() - start)
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Return the poll latency percentiles per inverter."""
+        return {key: window.summary() for key, window in self.latencies.items()}
+
+
+@callback
+def async_get_fleet(hass: HomeAssistant) -> SunGrowFleet:
+    """Return the fleet shared by all config entries."""
+    if (fleet := hass.data.get(DATA_FLEET)) is None:
+        fleet = hass.data[DATA_FLEET] = SunGrowFleet()
+        LOGGER.debug("Created the SunGrow fleet scheduler")
+    return fleet
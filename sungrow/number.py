@@ -0,0 +1,42 @@
+"""Numeric parameters of a SunGrow inverter."""
+from __future__ import annotations
+
+from homeassistant.components.number import NumberEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN
+from .control import NUMBER_TYPES, SunGrowNumberEntityDescription
+from .entity import SunGrowParameterEntity
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the numeric parameters of each inverter."""
+    async_add_entities(
+        SunGrowNumber(description, service)
+        for service in hass.data[DOMAIN][entry.entry_id]["services"]
+        if service.control
+        for description in NUMBER_TYPES
+    )
+
+
+class SunGrowNumber(SunGrowParameterEntity, NumberEntity):
+    """Numeric parameter of a SunGrow inverter, such as a power limit."""
+
+    entity_description: SunGrowNumberEntityDescription
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the value the inverter last reported."""
+        if (raw := self.raw_value) is None:
+            return None
+        return self.entity_description.from_raw(raw)
+
+    async def async_set_native_value(self, value: float) -> None:
+        """Queue a new setpoint."""
+        await self._async_set(value)
@@ -0,0 +1,403 @@
+"""Inverter points known to the SunGrow integration.
+
+Every point the integration has curated is described once in SENSOR_TYPES.
+The json_key of a description is the key used by the inverter in its reply;
+SENSOR_INDEX maps those keys back to the descriptions and drives both the
+extraction in the coordinator and the entity creation in the sensor platform.
+Supporting a new point is a matter of adding a description here (and its
+translation).
+
+Any other point an inverter reports is discovered from its first reply and
+described from the unit it carries (see discover_schema).
+
+The unit of each point is also read from the first reply of a firmware, and
+compiled into a converter turning the raw values of that point into numbers
+in the unit of its description. Converters are cached with the schema, so a
+poll only calls them.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import partial
+from typing import Any
+import zlib
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import (
+    PERCENTAGE,
+    POWER_VOLT_AMPERE_REACTIVE,
+    UnitOfApparentPower,
+    UnitOfElectricCurrent,
+    UnitOfElectricPotential,
+    UnitOfEnergy,
+    UnitOfFrequency,
+    UnitOfPower,
+    UnitOfTemperature,
+    UnitOfTime,
+)
+
+from sungrow_websocket import InverterItem
+
+from .client import REQUEST_REAL, Request
+from .const import SCHEMA_CACHE_SIZE
+
+
+@dataclass(frozen=True)
+class SunGrowSensorEntityRequiredKeyMixin:
+    """Sensor entity description with json_key for SunGrow."""
+    json_key: str
+
+
+@dataclass(frozen=True)
+class SunGrowSensorEntityDescription(
+    SensorEntityDescription, SunGrowSensorEntityRequiredKeyMixin
+):
+    """Sensor entity description for SunGrow.
+
+    A new value is only published when it moves away from the last published
+    one by more than the larger of deadband_abs and deadband_rel times that
+    value. Non-numeric values are published whenever they change.
+    """
+
+    deadband_abs: float | None = None
+    deadband_rel: float | None = None
+
+
+SENSOR_TYPES = [
+    SunGrowSensorEntityDescription(
+        key="running_state",
+        json_key="running_state",
+        icon="mdi:cog-outline",
+        translation_key="running_state",
+        entity_registry_enabled_default=False,
+    ),
+    SunGrowSensorEntityDescription(
+        key="total_yield",
+        json_key="total_yield",
+        translation_key="total_yield",
+        icon="mdi:solar-power",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+    ),
+    SunGrowSensorEntityDescription(
+        key="total_active_power",
+        json_key="total_active_power",
+        translation_key="total_active_power",
+        icon="mdi:solar-power",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.KILO_WATT,
+        device_class=SensorDeviceClass.POWER,
+        deadband_rel=0.005,
+    ),
+    SunGrowSensorEntityDescription(
+        key="commonua",
+        json_key="commonua",
+        translation_key="commonua",
+        icon="mdi:sine-wave",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
+        device_class=SensorDeviceClass.VOLTAGE,
+        deadband_abs=0.5,
+    ),
+    SunGrowSensorEntityDescription(
+        key="air_tem_inside_machine",
+        json_key="air_tem_inside_machine",
+        translation_key="air_tem_inside_machine",
+        icon="mdi:thermometer",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        device_class=SensorDeviceClass.TEMPERATURE,
+        deadband_abs=0.2,
+    ),
+    SunGrowSensorEntityDescription(
+        key="total_grid_running_time",
+        json_key="total_grid_running_time",
+        translation_key="total_grid_running_time",
+        icon="mdi:timer-cog-outline",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        native_unit_of_measurement=UnitOfTime.HOURS,
+        device_class=SensorDeviceClass.DURATION,
+    ),
+    SunGrowSensorEntityDescription(
+        key="daily_power_yield",
+        json_key="daily_power_yield",
+        translation_key="daily_power_yield",
+        icon="mdi:solar-power",
+        state_class=SensorStateClass.TOTAL,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+    ),
+    SunGrowSensorEntityDescription(
+        key="bus_voltage",
+        json_key="bus_voltage",
+        translation_key="bus_voltage",
+        icon="mdi:flash-triangle-outline",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
+        device_class=SensorDeviceClass.VOLTAGE,
+        deadband_abs=1.0,
+    ),
+    SunGrowSensorEntityDescription(
+        key="square_array_insulation_impedance",
+        json_key="square_array_insulation_impedance",
+        translation_key="square_array_insulation_impedance",
+        icon="mdi:resistor",
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    SunGrowSensorEntityDescription(
+        key="total_dcpower",
+        json_key="total_dcpower",
+        translation_key="total_dcpower",
+        icon="mdi:solar-power",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.KILO_WATT,
+        device_class=SensorDeviceClass.POWER,
+        deadband_rel=0.005,
+    ),
+    SunGrowSensorEntityDescription(
+        key="total_reactive_power",
+        json_key="total_reactive_power",
+        translation_key="total_reactive_power",
+        icon="mdi:solar-power",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=POWER_VOLT_AMPERE_REACTIVE,
+        device_class=SensorDeviceClass.REACTIVE_POWER,
+    ),
+    SunGrowSensorEntityDescription(
+        key="total_apparent_power",
+        json_key="total_apparent_power",
+        translation_key="total_apparent_power",
+        icon="mdi:solar-power",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfApparentPower.VOLT_AMPERE,
+        device_class=SensorDeviceClass.APPARENT_POWER,
+    ),
+    SunGrowSensorEntityDescription(
+        key="total_power_factor",
+        json_key="total_power_factor",
+        translation_key="total_power_factor",
+        icon="mdi:thermometer",
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.POWER_FACTOR,
+        deadband_abs=0.005,
+    ),
+    SunGrowSensorEntityDescription(
+        key="grid_frequency",
+        json_key="grid_frequency",
+        translation_key="grid_frequency",
+        icon="mdi:sine-wave",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfFrequency.HERTZ,
+        device_class=SensorDeviceClass.FREQUENCY,
+        deadband_abs=0.02,
+    ),
+    SunGrowSensorEntityDescription(
+        key="fragment_run_type1",
+        json_key="fragment_run_type1",
+        translation_key="fragment_run_type1",
+        icon="mdi:solar-power",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
+        device_class=SensorDeviceClass.CURRENT,
+    ),
+    SunGrowSensorEntityDescription(
+        key="measuring_point_afd",
+        json_key="measuring_point_afd",
+        translation_key="measuring_point_afd",
+        icon="mdi:note-alert-outline",
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    SunGrowSensorEntityDescription(
+        key="maximum_apparent_power_siwhfgqy",
+        json_key="maximum_apparent_power_siwhfgqy",
+        translation_key="maximum_apparent_power_siwhfgqy",
+        icon="mdi:solar-power",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfApparentPower.VOLT_AMPERE,
+        device_class=SensorDeviceClass.APPARENT_POWER,
+    ),
+]
+
+
+SENSOR_INDEX: dict[str, SunGrowSensorEntityDescription] = {
+    description.json_key: description for description in SENSOR_TYPES
+}
+
+# Unit reported by the inverter -> (device class, state class, HA unit)
+UNIT_TYPES: dict[
+    str, tuple[SensorDeviceClass | None, SensorStateClass, str | None]
+] = {
+    "V": (SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, UnitOfElectricPotential.VOLT),
+    "A": (SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT, UnitOfElectricCurrent.AMPERE),
+    "W": (SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, UnitOfPower.WATT),
+    "kW": (SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, UnitOfPower.KILO_WATT),
+    "Wh": (SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, UnitOfEnergy.WATT_HOUR),
+    "kWh": (SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, UnitOfEnergy.KILO_WATT_HOUR),
+    "℃": (SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT, UnitOfTemperature.CELSIUS),
+    "°C": (SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT, UnitOfTemperature.CELSIUS),
+    "var": (SensorDeviceClass.REACTIVE_POWER, SensorStateClass.MEASUREMENT, POWER_VOLT_AMPERE_REACTIVE),
+    "kvar": (SensorDeviceClass.REACTIVE_POWER, SensorStateClass.MEASUREMENT, POWER_VOLT_AMPERE_REACTIVE),
+    "VA": (SensorDeviceClass.APPARENT_POWER, SensorStateClass.MEASUREMENT, UnitOfApparentPower.VOLT_AMPERE),
+    "kVA": (SensorDeviceClass.APPARENT_POWER, SensorStateClass.MEASUREMENT, UnitOfApparentPower.VOLT_AMPERE),
+    "Hz": (SensorDeviceClass.FREQUENCY, SensorStateClass.MEASUREMENT, UnitOfFrequency.HERTZ),
+    "h": (SensorDeviceClass.DURATION, SensorStateClass.TOTAL_INCREASING, UnitOfTime.HOURS),
+    "%": (None, SensorStateClass.MEASUREMENT, PERCENTAGE),
+}
+
+
+# (unit reported by the inverter, HA unit) -> factor between them
+UNIT_SCALES: dict[tuple[str, str], float] = {
+    ("W", UnitOfPower.KILO_WATT): 0.001,
+    ("kW", UnitOfPower.WATT): 1000,
+    ("Wh", UnitOfEnergy.KILO_WATT_HOUR): 0.001,
+    ("kWh", UnitOfEnergy.WATT_HOUR): 1000,
+    ("kvar", POWER_VOLT_AMPERE_REACTIVE): 1000,
+    ("kVA", UnitOfApparentPower.VOLT_AMPERE): 1000,
+    ("min", UnitOfTime.HOURS): 1 / 60,
+}
+
+# Digits kept by a scaled value, so 3.43 kVA is 3430 VA and not 3430.0000000000005
+SCALED_DIGITS = 6
+
+Converter = Callable[[Any], Any]
+
+
+def _raw(value: Any) -> Any:
+    """Return a value that is not a number as it was reported."""
+    return value
+
+
+def _number(value: Any) -> float | None:
+    """Return a value as a float, None if it is not a number."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _scaled(scale: float, value: Any) -> float | None:
+    """Return a value as a float multiplied by scale, None if it is not a number."""
+    try:
+        return round(float(value) * scale, SCALED_DIGITS)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_numeric(description: SunGrowSensorEntityDescription) -> bool:
+    """Return True if the state of a point is a number."""
+    return (
+        description.native_unit_of_measurement is not None
+        or description.state_class is not None
+    )
+
+
+def compile_converter(
+    description: SunGrowSensorEntityDescription, item: InverterItem | None = None
+) -> Converter:
+    """Return the function turning the raw values of a point into its state.
+
+    Numeric points, those with a unit or state class, become floats in the
+    unit of their description, scaled from the unit item reports, or None
+    when the value is not a number, such as "--" at night. Other points are
+    passed through as reported.
+    """
+    if not is_numeric(description):
+        return _raw
+    unit = description.native_unit_of_measurement
+    if item is not None and unit is not None:
+        if (scale := UNIT_SCALES.get((item.unit, unit), 1)) != 1:
+            return partial(_scaled, scale)
+    return _number
+
+
+def description_from_item(key: str, item: InverterItem) -> SunGrowSensorEntityDescription:
+    """Describe a point the integration has no curated description for.
+
+    Discovered points are disabled by default, so they cost nothing until a
+    user enables them.
+    """
+    device_class, state_class, unit = UNIT_TYPES.get(item.unit, (None, None, None))
+    if state_class is None and item.unit:
+        # A point with a unit is a measurement, whatever its first value
+        state_class = SensorStateClass.MEASUREMENT
+        unit = item.unit
+    elif state_class is None:
+        try:
+            float(item.value)
+        except (TypeError, ValueError):
+            pass
+        else:
+            state_class = SensorStateClass.MEASUREMENT
+    return SunGrowSensorEntityDescription(
+        key=key,
+        json_key=key,
+        name=item.desc,
+        state_class=state_class,
+        native_unit_of_measurement=unit,
+        device_class=device_class,
+        entity_registry_enabled_default=False,
+    )
+
+
+class PointSchema:
+    """Points reported by one inverter model and firmware.
+
+    descriptions holds the curated descriptions followed by the discovered
+    ones; sources tells which request, a (dev_id, service) pair, reports each
+    point; converters turns the raw values of each point into its state.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        descriptions: dict[str, SunGrowSensorEntityDescription],
+        sources: dict[str, Request],
+        converters: dict[str, Converter],
+    ) -> None:
+        """Initialize the schema."""
+        self.key = key
+        self.descriptions = descriptions
+        self.sources = sources
+        self.converters = converters
+
+
+# Least recently used first
+_SCHEMAS: dict[str, PointSchema] = {}
+
+
+def schema_key(model: str, response: dict[str, InverterItem]) -> str:
+    """Return the cache key of a model and the point set its firmware reports."""
+    points = ",".join(sorted(f"{key}:{item.unit}" for key, item in response.items()))
+    return f"{model}-{zlib.crc32(points.encode()):08x}"
+
+
+def discover_schema(
+    model: str, response: dict[str, InverterItem], sources: dict[str, Request]
+) -> PointSchema:
+    """Return the schema of a full reply, shared by inverters of the same kind."""
+    key = schema_key(model, response)
+    if (schema := _SCHEMAS.pop(key, None)) is not None:
+        _SCHEMAS[key] = schema
+        return schema
+    if len(_SCHEMAS) >= SCHEMA_CACHE_SIZE:
+        del _SCHEMAS[next(iter(_SCHEMAS))]
+    descriptions = dict(SENSOR_INDEX)
+    for point, item in response.items():
+        if point not in descriptions:
+            descriptions[point] = description_from_item(point, item)
+    schema = _SCHEMAS[key] = PointSchema(
+        key,
+        descriptions,
+        {point: sources.get(point, REQUEST_REAL) for point in descriptions},
+        {
+            point: compile_converter(description, response.get(point))
+            for point, description in descriptions.items()
+        },
+    )
+    return schema
@@ -0,0 +1,42 @@
+"""Parameters of a SunGrow inverter with a set of options."""
+from __future__ import annotations
+
+from homeassistant.components.select import SelectEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN
+from .control import SELECT_TYPES, SunGrowSelectEntityDescription
+from .entity import SunGrowParameterEntity
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the option parameters of each inverter."""
+    async_add_entities(
+        SunGrowSelect(description, service)
+        for service in hass.data[DOMAIN][entry.entry_id]["services"]
+        if service.control
+        for description in SELECT_TYPES
+    )
+
+
+class SunGrowSelect(SunGrowParameterEntity, SelectEntity):
+    """Parameter of a SunGrow inverter with options, such as a limit switch."""
+
+    entity_description: SunGrowSelectEntityDescription
+
+    @property
+    def current_option(self) -> str | None:
+        """Return the option the inverter last reported."""
+        if (raw := self.raw_value) is None:
+            return None
+        return self.entity_description.from_raw(raw)
+
+    async def async_select_option(self, option: str) -> None:
+        """Queue a new option."""
+        await self._async_set(option)
@@ -1,6 +1,7 @@
 """Support for SunGrow API."""
 from __future__ import annotations
 
+from collections.abc import Callable
 from dataclasses import dataclass
 from typing import Any
 
@@ -12,175 +13,133 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import UnitOfEnergy, UnitOfPower, UnitOfElectricPotential,UnitOfTemperature,UnitOfTime,UnitOfFrequency,UnitOfElectricCurrent
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.device_registry import DeviceInfo
-from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import (
-    CoordinatorEntity,
-    DataUpdateCoordinator,
+from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfEnergy,
+    UnitOfInformation,
+    UnitOfTime,
 )
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import CONF_ADDRESS, DOMAIN
+from .const import DOMAIN
 from .coordinator import SunGrowDataService
-from sungrow_websocket import SungrowWebsocket
+from .entity import SunGrowEntity
+from .points import SENSOR_INDEX, SunGrowSensorEntityDescription
+
 
 @dataclass(frozen=True)
-class SunGrowSensorEntityRequiredKeyMixin:
-    """Sensor entity description with json_key for SunGrow."""
-    json_key: str
+class SunGrowDiagnosticEntityDescriptionMixin:
+    """Diagnostic sensor entity description with value_fn for SunGrow."""
+    value_fn: Callable[[SunGrowDataService], Any]
 
 
 @dataclass(frozen=True)
-class SunGrowSensorEntityDescription(
-    SensorEntityDescription, SunGrowSensorEntityRequiredKeyMixin
+class SunGrowDiagnosticEntityDescription(
+    SensorEntityDescription, SunGrowDiagnosticEntityDescriptionMixin
 ):
-    """Sensor entity description for SunGrow."""
+    """Diagnostic sensor entity description for SunGrow."""
 
 
-SENSOR_TYPES = [
-    SunGrowSensorEntityDescription(
-        key="running_state",
-        json_key="running_state",
-        icon="mdi:cog-outline",
-        translation_key="running_state",
-        entity_registry_enabled_default=False,
-    ),
-    SunGrowSensorEntityDescription(
-        key="total_yield",
-        json_key="total_yield",
-        translation_key="total_yield",
-        icon="mdi:solar-power",
-        state_class=SensorStateClass.TOTAL_INCREASING,
-        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
-        device_class=SensorDeviceClass.ENERGY,
-    ),
-    SunGrowSensorEntityDescription(
-        key="total_active_power",
-        json_key="total_active_power",
-        translation_key="total_active_power",
-        icon="mdi:solar-power",
-        state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfPower.KILO_WATT,
-        device_class=SensorDeviceClass.POWER,
-    ),
-    SunGrowSensorEntityDescription(
-        key="commonua",
-        json_key="commonua",
-        translation_key="commonua",
-        icon="mdi:sine-wave",
+def _efficiency(service: SunGrowDataService) -> float | None:
+    """Return the smoothed AC/DC conversion efficiency in percent."""
+    efficiency = service.anomalies.efficiency
+    return round(efficiency.mean * 100, 1) if efficiency.count else None
+
+
+def _latency_ms(service: SunGrowDataService, q: float) -> float | None:
+    """Return a poll latency percentile in milliseconds."""
+    latency = service.diagnostics.phases["poll"].percentile(q)
+    return None if latency is None else round(latency * 1000, 1)
+
+
+DIAGNOSTIC_SENSOR_TYPES = [
+    SunGrowDiagnosticEntityDescription(
+        key="poll_latency_p50",
+        translation_key="poll_latency_p50",
+        icon="mdi:timer-outline",
         state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda service: _latency_ms(service, 50),
     ),
-    SunGrowSensorEntityDescription(
-        key="air_tem_inside_machine",
-        json_key="air_tem_inside_machine",
-        translation_key="air_tem_inside_machine",
-        icon="mdi:thermometer",
+    SunGrowDiagnosticEntityDescription(
+        key="poll_latency_p95",
+        translation_key="poll_latency_p95",
+        icon="mdi:timer-outline",
         state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
-        device_class=SensorDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda service: _latency_ms(service, 95),
     ),
-    SunGrowSensorEntityDescription(
-        key="total_grid_running_time",
-        json_key="total_grid_running_time",
-        translation_key="total_grid_running_time",
-        icon="mdi:timer-cog-outline",
+    SunGrowDiagnosticEntityDescription(
+        key="poll_failures",
+        translation_key="poll_failures",
+        icon="mdi:lan-disconnect",
         state_class=SensorStateClass.TOTAL_INCREASING,
-        native_unit_of_measurement=UnitOfTime.HOURS,
-        device_class=SensorDeviceClass.TEMPERATURE,
-    ),
-    SunGrowSensorEntityDescription(
-        key="daily_power_yield",
-        json_key="daily_power_yield",
-        translation_key="daily_power_yield",
-        icon="mdi:solar-power",
-        state_class=SensorStateClass.TOTAL,
-        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
-        device_class=SensorDeviceClass.ENERGY,
-    ),
-    SunGrowSensorEntityDescription(
-        key="bus_voltage",
-        json_key="bus_voltage",
-        translation_key="bus_voltage",
-        icon="mdi:flash-triangle-outline",
-        state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        device_class=SensorDeviceClass.VOLTAGE,
-    ),
-    SunGrowSensorEntityDescription(
-        key="square_array_insulation_impedance",
-        json_key="square_array_insulation_impedance",
-        translation_key="square_array_insulation_impedance",
-        icon="mdi:resistor",
-        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda service: service.diagnostics.failures,
     ),
-    SunGrowSensorEntityDescription(
-        key="total_dcpower",
-        json_key="total_dcpower",
-        translation_key="total_dcpower",
-        icon="mdi:solar-power",
-        state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfPower.KILO_WATT,
-        device_class=SensorDeviceClass.POWER,
+    SunGrowDiagnosticEntityDescription(
+        key="bytes_received",
+        translation_key="bytes_received",
+        icon="mdi:download-network-outline",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        device_class=SensorDeviceClass.DATA_SIZE,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda service: service.bytes_received,
     ),
-    SunGrowSensorEntityDescription(   # kvar
-        key="total_reactive_power",
-        json_key="total_reactive_power",
-        translation_key="total_reactive_power",
-        icon="mdi:solar-power",
+    SunGrowDiagnosticEntityDescription(
+        key="conversion_efficiency",
+        translation_key="conversion_efficiency",
+        icon="mdi:percent-outline",
         state_class=SensorStateClass.MEASUREMENT,
-        device_class=SensorDeviceClass.REACTIVE_POWER,
+        native_unit_of_measurement=PERCENTAGE,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=_efficiency,
     ),
-    SunGrowSensorEntityDescription(   # kVA
-        key="total_apparent_power",
-        json_key="total_apparent_power",
-        translation_key="total_apparent_power",
+]
+
+
+# Energy integrated from the power samples, at a finer resolution than the
+# inverter's own counters
+ENERGY_SENSOR_TYPES = [
+    SensorEntityDescription(
+        key="ac_energy_total",
+        translation_key="ac_energy_total",
         icon="mdi:solar-power",
-        state_class=SensorStateClass.MEASUREMENT,
-        device_class=SensorDeviceClass.APPARENT_POWER,
-    ),
-    SunGrowSensorEntityDescription(
-        key="total_power_factor",
-        json_key="total_power_factor",
-        translation_key="total_power_factor",
-        icon="mdi:thermometer",
-        state_class=SensorStateClass.MEASUREMENT,
-        device_class=SensorDeviceClass.POWER_FACTOR,
-    ),
-    SunGrowSensorEntityDescription(
-        key="grid_frequency",
-        json_key="grid_frequency",
-        translation_key="grid_frequency",
-        icon="mdi:sine-wave",
-        state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfFrequency.HERTZ,
-        device_class=SensorDeviceClass.FREQUENCY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+        suggested_display_precision=3,
     ),
-    SunGrowSensorEntityDescription(
-        key="fragment_run_type1",
-        json_key="fragment_run_type1",
-        translation_key="fragment_run_type1",
+    SensorEntityDescription(
+        key="ac_energy_daily",
+        translation_key="ac_energy_daily",
         icon="mdi:solar-power",
-        state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
-        device_class=SensorDeviceClass.CURRENT,
-    ),
-    SunGrowSensorEntityDescription(
-        key="measuring_point_afd",
-        json_key="measuring_point_afd",
-        translation_key="measuring_point_afd",
-        icon="mdi:note-alert-outline",
-        state_class=SensorStateClass.MEASUREMENT,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+        suggested_display_precision=3,
     ),
-    SunGrowSensorEntityDescription(
-        key="maximum_apparent_power_siwhfgqy",
-        json_key="maximum_apparent_power_siwhfgqy",
-        translation_key="maximum_apparent_power_siwhfgqy",
-        icon="mdi:solar-power",
-        state_class=SensorStateClass.MEASUREMENT,
-        device_class=SensorDeviceClass.APPARENT_POWER,
+    SensorEntityDescription(
+        key="dc_energy_total",
+        translation_key="dc_energy_total",
+        icon="mdi:solar-panel",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        device_class=SensorDeviceClass.ENERGY,
+        suggested_display_precision=3,
+        entity_registry_enabled_default=False,
     ),
 ]
 
@@ -191,50 +150,74 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
 
-    sensor_factory = SunGrowSensorFactory(hass, entry.data[CONF_ADDRESS])
+    sensor_factory = SunGrowSensorFactory(hass.data[DOMAIN][entry.entry_id]["services"])
+
+    @callback
+    def _async_add_discovered_sensors() -> None:
+        """Add the sensors of points discovered after setup."""
+        if entities := sensor_factory.create_new_sensors():
+            async_add_entities(entities)
+
+    entities = sensor_factory.create_new_sensors()
     for service in sensor_factory.all_services:
-        service.async_setup()
-        await service.coordinator.async_refresh()
-
-    entities = []
-    for sensor_type in SENSOR_TYPES:
-        sensor = sensor_factory.create_sensor(sensor_type)
-        if sensor is not None:
-            entities.append(sensor)
+        entry.async_on_unload(
+            service.async_add_schema_listener(_async_add_discovered_sensors)
+        )
+        entities.extend(
+            SunGrowEnergySensor(description, service)
+            for description in ENERGY_SENSOR_TYPES
+        )
+        entities.extend(
+            SunGrowDiagnosticSensor(description, service)
+            for description in DIAGNOSTIC_SENSOR_TYPES
+        )
     async_add_entities(entities)
 
 
 class SunGrowSensorFactory:
     """Factory which creates sensors based on the sensor_key."""
 
-    def __init__(self, hass: HomeAssistant, ip_address: str) -> None:
+    def __init__(self, services: list[SunGrowDataService]) -> None:
         """Initialize the factory."""
-        inverter = SunGrowDataService(hass, ip_address)
-        self.all_services = [inverter]
+        inverter = services[0]
+        self.inverter = inverter
+        self.all_services = services
+        self._created: set[str] = set()
 
         self.services: dict[
             str,
             tuple[
-                type[SunGrowSensorEntity],
+                type[SunGrowSensor],
                 SunGrowDataService,
             ],
         ] = {}
-        for key in ("commonua", "total_active_power", "air_tem_inside_machine", "total_yield", "running_state", 'total_grid_running_time', 'daily_power_yield', 'bus_voltage', 'square_array_insulation_impedance', 'total_dcpower', 'total_reactive_power', 'total_apparent_power', 'total_power_factor', 'grid_frequency', 'fragment_run_type1', 'measuring_point_afd', 'maximum_apparent_power_siwhfgqy'):
-            self.services[key] = (SunGrowSensor, inverter)
+        for description in SENSOR_INDEX.values():
+            self.services[description.key] = (SunGrowSensor, inverter)
 
 
     def create_sensor(
         self, sensor_type: SunGrowSensorEntityDescription
     ) -> SunGrowSensor:
         """Create and return a sensor based on the sensor_key."""
-        sensor_class, service = self.services[sensor_type.key]
+        sensor_class, service = self.services.get(
+            sensor_type.key, (SunGrowSensor, self.inverter)
+        )
         return sensor_class(sensor_type, service)
 
+    def create_new_sensors(self) -> list[SunGrowSensor]:
+        """Create the sensors of the points not seen before."""
+        sensors = []
+        for service in self.all_services:
+            for description in service.descriptions:
+                if description.key in self._created:
+                    continue
+                self._created.add(description.key)
+                sensors.append(self.create_sensor(description))
+        return sensors
 
-class SunGrowSensor(
-    CoordinatorEntity[DataUpdateCoordinator[None]], SensorEntity
-):
-    _attr_has_entity_name = True
+
+class SunGrowSensor(SunGrowEntity, SensorEntity):
+    """Point of a SunGrow inverter or of a device connected to its dongle."""
 
     entity_description: SunGrowSensorEntityDescription
 
@@ -244,27 +227,63 @@ class SunGrowSensor(
         data_service: SunGrowDataService,
     ) -> None:
         """Initialize the sensor."""
-        super().__init__(data_service.coordinator)
-        self.entity_description = description
-        self.data_service = data_service
-        self._attr_device_info = DeviceInfo(
-            identifiers={(DOMAIN, data_service.ip_address)}, manufacturer="SunGrow"
+        super().__init__(
+            description, data_service, description.json_key, description.json_key
         )
+        self._slot = data_service.slot(description.json_key)
 
-    @property
-    def unique_id(self) -> str | None:
-        """Return a unique ID."""
-        if not self.data_service.ip_address:
-            return None
-        return f"{self.data_service.ip_address}_{self.entity_description.key}"
+    async def async_added_to_hass(self) -> None:
+        """Start extracting this sensor's point."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.data_service.async_enable_point(self.entity_description)
+        )
 
     @property
-    def extra_state_attributes(self) -> dict[str, Any] | None:
-        """Return the state attributes."""
-        return self.data_service.attributes.get(self.entity_description.json_key)
+    def native_value(self) -> str | None:
+        """Return the state of the sensor."""
+        return self.data_service.snapshot[self._slot]
+
+
+class SunGrowEnergySensor(SunGrowEntity, SensorEntity):
+    """Energy integrated from the power samples of a SunGrow inverter."""
+
+    def __init__(
+        self,
+        description: SensorEntityDescription,
+        data_service: SunGrowDataService,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(description, data_service)
+        self._slot = data_service.slot(description.key)
 
     @property
-    def native_value(self) -> str | None:
+    def native_value(self) -> float | None:
         """Return the state of the sensor."""
-        return self.data_service.data.get(self.entity_description.json_key)
+        return self.data_service.snapshot[self._slot]
+
+
+class SunGrowDiagnosticSensor(SunGrowEntity, SensorEntity):
+    """Sensor reporting on the polling of a SunGrow inverter."""
 
+    entity_description: SunGrowDiagnosticEntityDescription
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state after every poll, the diagnostics change each time."""
+        self.async_write_ha_state()
+
+    @property
+    def available(self) -> bool:
+        """Return True, the diagnostics are meaningful while polls fail."""
+        return True
+
+    @property
+    def extra_state_attributes(self) -> None:
+        """Return no attributes, the diagnostics are never stale."""
+        return None
+
+    @property
+    def native_value(self) -> Any:
+        """Return the state of the sensor."""
+        return self.entity_description.value_fn(self.data_service)
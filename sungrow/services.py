@@ -0,0 +1,95 @@
+"""Services for the SunGrow integration."""
+from __future__ import annotations
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+
+from .const import DOMAIN
+from .control import PARAMETER_INDEX
+from .coordinator import SunGrowDataService
+from .timeseries import RESOLUTIONS
+
+SERVICE_GET_SAMPLES = "get_samples"
+SERVICE_SET_PARAMETER = "set_parameter"
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_POINT = "point"
+ATTR_RESOLUTION = "resolution"
+ATTR_PARAMETER = "parameter"
+ATTR_VALUE = "value"
+
+GET_SAMPLES_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_POINT): cv.string,
+        vol.Optional(ATTR_RESOLUTION, default="raw"): vol.In(["raw", *RESOLUTIONS]),
+    }
+)
+
+SET_PARAMETER_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_PARAMETER): vol.In(list(PARAMETER_INDEX)),
+        vol.Required(ATTR_VALUE): vol.Any(vol.Coerce(float), cv.string),
+    }
+)
+
+
+def _entry_services(hass: HomeAssistant, entry_id: str) -> list[SunGrowDataService]:
+    """Return the data services of a loaded config entry."""
+    entry_data = hass.data.get(DOMAIN, {}).get(entry_id)
+    if not entry_data or not entry_data.get("services"):
+        raise ServiceValidationError(f"No loaded SunGrow inverter for {entry_id}")
+    return entry_data["services"]
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the SunGrow services."""
+
+    @callback
+    def _async_get_samples(call: ServiceCall) -> ServiceResponse:
+        """Return the recent samples of a point."""
+        services = _entry_services(hass, call.data[ATTR_CONFIG_ENTRY_ID])
+        point = call.data[ATTR_POINT]
+        resolution = call.data[ATTR_RESOLUTION]
+        return {
+            "point": point,
+            "resolution": resolution,
+            "samples": [
+                sample
+                for service in services
+                for sample in service.timeseries.samples(point, resolution)
+            ],
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_SAMPLES,
+        _async_get_samples,
+        schema=GET_SAMPLES_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def _async_set_parameter(call: ServiceCall) -> None:
+        """Queue the write of a parameter; it is applied by a coming poll."""
+        for service in _entry_services(hass, call.data[ATTR_CONFIG_ENTRY_ID]):
+            await service.async_set_parameter(
+                call.data[ATTR_PARAMETER], call.data[ATTR_VALUE]
+            )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_PARAMETER,
+        _async_set_parameter,
+        schema=SET_PARAMETER_SCHEMA,
+    )
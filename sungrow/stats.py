@@ -0,0 +1,83 @@
+"""Rolling statistics for the SunGrow polling pipeline."""
+from __future__ import annotations
+
+from collections import deque
+import math
+from typing import Any
+
+# Phases of a poll, in pipeline order; "poll" is the whole round trip
+POLL_PHASES = (
+    "connect",
+    "authenticate",
+    "request",
+    "parse",
+    "extract",
+    "dispatch",
+    "poll",
+)
+
+
+class RollingWindow:
+    """Keep the last samples of a measurement and report percentiles."""
+
+    def __init__(self, size: int = 240) -> None:
+        """Initialize the window."""
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        """Return the number of samples in the window."""
+        return len(self._samples)
+
+    def add(self, value: float) -> None:
+        """Add a sample, dropping the oldest one once the window is full."""
+        self._samples.append(value)
+
+    def percentile(self, q: float) -> float | None:
+        """Return the nearest-rank q-th percentile (0-100) of the window."""
+        if not self._samples:
+            return None
+        return _nearest_rank(sorted(self._samples), q)
+
+    def summary(self) -> dict[str, float | int | None]:
+        """Return the sample count and the p50/p95/p99 percentiles."""
+        if not self._samples:
+            return {"count": 0, "p50": None, "p95": None, "p99": None}
+        ordered = sorted(self._samples)
+        return {
+            "count": len(ordered),
+            "p50": _nearest_rank(ordered, 50),
+            "p95": _nearest_rank(ordered, 95),
+            "p99": _nearest_rank(ordered, 99),
+        }
+
+
+def _nearest_rank(ordered: list[float], q: float) -> float:
+    """Return the nearest-rank q-th percentile of sorted samples."""
+    return ordered[max(math.ceil(q / 100 * len(ordered)), 1) - 1]
+
+
+class PollDiagnostics:
+    """Rolling per-phase timings and counters of the polls of one inverter."""
+
+    def __init__(self, size: int = 240) -> None:
+        """Initialize the diagnostics."""
+        self.phases = {phase: RollingWindow(size) for phase in POLL_PHASES}
+        self.failures = 0
+        self.last_failure: str | None = None
+
+    def record(self, phase: str, seconds: float) -> None:
+        """Record the duration of one phase."""
+        self.phases[phase].add(seconds)
+
+    def record_failure(self, reason: str) -> None:
+        """Count a failed poll."""
+        self.failures += 1
+        self.last_failure = reason
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the phase percentiles and counters."""
+        return {
+            "phases": {phase: window.summary() for phase, window in self.phases.items()},
+            "failures": self.failures,
+            "last_failure": self.last_failure,
+        }
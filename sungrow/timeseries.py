@@ -0,0 +1,150 @@
+"""In-memory time series of the numeric points of an inverter.
+
+Each point keeps its raw samples for a short window and incrementally
+aggregated per-minute, per-5-minute and hourly min/max/mean buckets. All of
+them live in fixed-size rings of float arrays, so the memory held per point
+is allocated once and never grows.
+"""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable
+from typing import Any
+
+# Resolution name -> (bucket length in seconds, buckets kept)
+RESOLUTIONS: dict[str, tuple[int, int]] = {
+    "1m": (60, 120),
+    "5m": (300, 288),
+    "1h": (3600, 48),
+}
+RAW_SAMPLES = 480
+
+
+class _Ring:
+    """Fixed number of rows of float columns, overwriting the oldest row."""
+
+    def __init__(self, size: int, columns: int) -> None:
+        """Initialize the ring."""
+        self._size = size
+        self._columns = tuple(array("d", bytes(8 * size)) for _ in range(columns))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Return the number of rows held."""
+        return self._count
+
+    def append(self, *row: float) -> None:
+        """Add a row."""
+        index = self._next
+        for column, value in zip(self._columns, row):
+            column[index] = value
+        self._next = (index + 1) % self._size
+        self._count = min(self._count + 1, self._size)
+
+    def rows(self) -> list[tuple[float, ...]]:
+        """Return the rows, oldest first."""
+        first = (self._next - self._count) % self._size
+        return [
+            tuple(column[(first + offset) % self._size] for column in self._columns)
+            for offset in range(self._count)
+        ]
+
+
+class _Aggregator:
+    """Min/max/mean of the samples falling in consecutive fixed buckets."""
+
+    def __init__(self, period: int, size: int) -> None:
+        """Initialize the aggregator."""
+        self.period = period
+        self.buckets = _Ring(size, 4)  # start, min, max, mean
+        self._start: float | None = None
+        self._min = self._max = self._sum = 0.0
+        self._count = 0
+
+    def add(self, timestamp: float, value: float) -> tuple[float, ...] | None:
+        """Add a sample; return the bucket it closed, if any."""
+        start = timestamp - timestamp % self.period
+        closed = None
+        if start != self._start:
+            if self._count:
+                closed = (self._start, self._min, self._max, self._sum / self._count)
+                self.buckets.append(*closed)
+            self._start = start
+            self._min = self._max = self._sum = value
+            self._count = 1
+            return closed
+        if value < self._min:
+            self._min = value
+        elif value > self._max:
+            self._max = value
+        self._sum += value
+        self._count += 1
+        return None
+
+
+class PointSeries:
+    """Raw samples and aggregated buckets of one point."""
+
+    def __init__(self) -> None:
+        """Initialize the series."""
+        self.raw = _Ring(RAW_SAMPLES, 2)  # timestamp, value
+        self.aggregators = {
+            resolution: _Aggregator(period, size)
+            for resolution, (period, size) in RESOLUTIONS.items()
+        }
+
+    def add(self, timestamp: float, value: float) -> tuple[float, ...] | None:
+        """Add a sample; return the hourly bucket it closed, if any."""
+        self.raw.append(timestamp, value)
+        closed = None
+        for resolution, aggregator in self.aggregators.items():
+            bucket = aggregator.add(timestamp, value)
+            if resolution == "1h":
+                closed = bucket
+        return closed
+
+    def samples(self, resolution: str) -> list[dict[str, float]]:
+        """Return the raw samples or the closed buckets of a resolution."""
+        if resolution == "raw":
+            return [
+                {"timestamp": timestamp, "value": value}
+                for timestamp, value in self.raw.rows()
+            ]
+        return [
+            {"start": start, "min": minimum, "max": maximum, "mean": mean}
+            for start, minimum, maximum, mean in self.aggregators[resolution].buckets.rows()
+        ]
+
+
+class TimeSeries:
+    """Time series of the numeric points of one inverter."""
+
+    def __init__(self) -> None:
+        """Initialize the time series."""
+        self.points: dict[str, PointSeries] = {}
+
+    def add(
+        self, timestamp: float, values: Iterable[tuple[str, float]]
+    ) -> list[tuple[str, tuple[float, ...]]]:
+        """Add one sample per point; return the hourly buckets that closed."""
+        points = self.points
+        closed = []
+        for key, value in values:
+            if (series := points.get(key)) is None:
+                series = points[key] = PointSeries()
+            if (bucket := series.add(timestamp, value)) is not None:
+                closed.append((key, bucket))
+        return closed
+
+    def retain(self, keys: Iterable[str]) -> None:
+        """Drop the series of the points not in keys."""
+        keep = set(keys)
+        for key in [key for key in self.points if key not in keep]:
+            del self.points[key]
+
+    def samples(self, key: str, resolution: str) -> list[dict[str, Any]]:
+        """Return the samples of a point at a resolution."""
+        if (series := self.points.get(key)) is None:
+            return []
+        return series.samples(resolution)